@@ -0,0 +1,207 @@
+"""
+Mide el procesado incremental de logs de accesos (services/access_log.py).
+
+1. Throughput: genera un log combined sintético de --gigabytes GB y lo pasa
+   entero por AccessLogProcessor en bloques de --chunk-mb MB; comprueba
+   líneas, códigos de estado y bytes contra lo generado. Como referencia,
+   el parser anterior (split por línea) sobre los primeros 200 MB.
+2. Muestreo periódico: simula --interval segundos de tráfico a --rps
+   peticiones por segundo entre muestras y compara una muestra incremental
+   (LocalAccessLog y RemoteAccessLog por SSH contra benchmarks.fake_sftp)
+   con el tail -n 100 de antes, en tiempo y en bytes transferidos.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_access_log --gigabytes 2 --rps 200 --interval 30
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from benchmarks.fake_sftp import FakeSSHServer
+from services.access_log import AccessLogProcessor, LocalAccessLog
+from services.hosting_stats import HostingStatsCollector
+from services.ssh_pool import SSHConnectionManager
+
+PLACEHOLDER = b"00/Xxx/0000:00:00:00 +0000"
+PATHS = ["/", "/index.html", "/static/app.js", "/static/app.css", "/Build/game.wasm.br",
+         "/Build/game.data.br", "/api/health"] + [f"/api/experiences/{i}" for i in range(300)]
+AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+
+def log_time(seconds: int) -> bytes:
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%d/%b/%Y:%H:%M:%S +0000").encode()
+
+def make_blocks(lines_per_second: int, count: int = 64):
+    """Bloques de un segundo de log con la fecha por rellenar, y sus totales"""
+    rng = random.Random(0)
+    blocks = []
+    for _ in range(count):
+        lines, status, served = [], Counter(), 0
+        for i in range(lines_per_second):
+            code = rng.choice((200, 200, 200, 200, 206, 304, 404, 500))
+            size = 0 if code == 304 else rng.randint(200, 200000)
+            served += size
+            status[str(code)] += 1
+            lines.append(
+                f'10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)} - - '
+                f'[{PLACEHOLDER.decode()}] "GET {rng.choice(PATHS)}?v={rng.randint(0, 99999)} HTTP/1.1" '
+                f'{code} {size if size else "-"} "https://radhikatmosphere.com/" "{AGENT}"\n'
+            )
+        blocks.append(("".join(lines).encode(), status, served))
+    return blocks
+
+def write_log(path: str, gigabytes: float, lines_per_second: int, start: int):
+    blocks = make_blocks(lines_per_second)
+    target = int(gigabytes * 1024 ** 3)
+    written, seconds, lines = 0, 0, 0
+    status, served = Counter(), 0
+    with open(path, "wb") as f:
+        while written < target:
+            data, block_status, block_served = blocks[seconds % len(blocks)]
+            f.write(data.replace(PLACEHOLDER, log_time(start + seconds)))
+            written += len(data)
+            seconds += 1
+            lines += lines_per_second
+            status.update(block_status)
+            served += block_served
+    return {"bytes": written, "lines": lines, "seconds": seconds, "status": status, "served": served}
+
+def old_parse(lines) -> int:
+    # El parser de parse_stats antes de este cambio, sin agregados por tiempo ni rutas
+    total_bytes = 0
+    for line in lines:
+        parts = line.split('"')
+        if len(parts) < 3:
+            continue
+        fields = parts[2].split()
+        if len(fields) < 2 or not fields[0].isdigit():
+            continue
+        if fields[1].isdigit():
+            total_bytes += int(fields[1])
+    return total_bytes
+
+def throughput(path: str, expected: dict, chunk_mb: int) -> None:
+    processor = AccessLogProcessor()
+    chunk = chunk_mb * 1024 ** 2
+    start = time.perf_counter()
+    offset = 0
+    with open(path, "rb") as f:
+        # Como LocalAccessLog: se avanza solo por líneas completas
+        while True:
+            f.seek(offset)
+            data = f.read(chunk)
+            if not data:
+                break
+            offset += processor.feed(data, final=len(data) < chunk)
+    elapsed = time.perf_counter() - start
+    snapshot = processor.snapshot()
+    totals = snapshot["totals"]
+    mb = expected["bytes"] / 1024 ** 2
+    print(f"{mb / 1024:.2f} GB, {expected['lines']:,} líneas ({expected['seconds']:,} s de log) en {elapsed:.1f} s: "
+          f"{mb / elapsed:.0f} MB/s, {expected['lines'] / elapsed / 1e6:.2f} M líneas/s; "
+          f"RSS máximo {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    classes = Counter()
+    for code, count in expected["status"].items():
+        classes[f"{code[0]}xx"] += count
+    ok = (totals["lines"] == totals["requests"] == expected["lines"] and totals["bytes"] == expected["served"]
+          and totals["parse_errors"] == 0 and all(totals["status"][k] == classes[k] for k in totals["status"]))
+    print(f"  comprobación: {'ok' if ok else 'DISTINTO'} (líneas {totals['lines']:,}, bytes {totals['bytes']:,}, "
+          f"errores de parseo {totals['parse_errors']}); ventana: {snapshot['rps']} rps, "
+          f"top {snapshot['top_paths'][0]}")
+
+    with open(path, "rb") as f:
+        sample = f.read(200 * 1024 ** 2)
+    start = time.perf_counter()
+    old_parse(sample.decode(errors="replace").splitlines())
+    elapsed = time.perf_counter() - start
+    print(f"  parser anterior (decodificar y split por línea, solo estados y bytes): "
+          f"{len(sample) / 1024 ** 2 / elapsed:.0f} MB/s")
+
+def periodic(tmp: str, rps: int, interval: int) -> None:
+    path = os.path.join(tmp, "periodic.log")
+    start = int(time.time()) - 3600
+    write_log(path, 0.05, rps, start)
+    blocks = make_blocks(rps, 8)
+    clock = [start + int(os.path.getsize(path) // len(blocks[0][0]))]
+
+    def traffic():
+        with open(path, "ab") as f:
+            for _ in range(interval):
+                f.write(blocks[clock[0] % len(blocks)][0].replace(PLACEHOLDER, log_time(clock[0])))
+                clock[0] += 1
+
+    local = LocalAccessLog(path)
+    local.poll()
+    times = []
+    for _ in range(5):
+        traffic()
+        started = time.perf_counter()
+        local.poll()
+        times.append((time.perf_counter() - started) * 1000)
+    print(f"LocalAccessLog: {rps * interval:,} líneas nuevas por muestra en {min(times):.1f} ms")
+
+    server = FakeSSHServer()
+    server.start()
+    ssh = SSHConnectionManager("127.0.0.1", server.port, "bench", password="bench")
+    os.environ["HOSTING_ACCESS_LOG"] = path
+    os.environ["HOSTING_STATS_DB"] = os.path.join(tmp, "hosting_stats.db")
+    collector = HostingStatsCollector(ssh)
+    try:
+        async def run():
+            await collector.collect()
+            times, transferred = [], []
+            for _ in range(5):
+                traffic()
+                before = collector.access_log.transferred_bytes
+                started = time.perf_counter()
+                sample = await collector.collect()
+                times.append((time.perf_counter() - started) * 1000)
+                transferred.append(collector.access_log.transferred_bytes - before)
+            return sample, min(times), sum(transferred) / len(transferred)
+
+        sample, collect_ms, transferred = asyncio.run(run())
+        started = time.perf_counter()
+        for _ in range(5):
+            status, tail, _ = ssh.exec(f"tail -n 100 {path}")
+        tail_ms = (time.perf_counter() - started) / 5 * 1000
+        print(f"RemoteAccessLog por SSH: muestra completa en {collect_ms:.1f} ms, {transferred / 1024:.0f} KB "
+              f"transferidos ({rps * interval:,} líneas), {sample['access']['rps']} rps en la ventana")
+        print(f"tail -n 100 de antes: {tail_ms:.1f} ms, {len(tail) / 1024:.0f} KB, solo 100 líneas "
+              f"({100 / (rps * interval):.1%} del tráfico del intervalo)")
+    finally:
+        ssh.close()
+        server.stop()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--gigabytes", type=float, default=2)
+    parser.add_argument("--lines-per-second", type=int, default=300)
+    parser.add_argument("--chunk-mb", type=int, default=16)
+    parser.add_argument("--rps", type=int, default=200)
+    parser.add_argument("--interval", type=int, default=30)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, "access.log")
+        started = time.perf_counter()
+        expected = write_log(path, args.gigabytes, args.lines_per_second, int(time.time()) - 86400 * 30)
+        print(f"log sintético generado en {time.perf_counter() - started:.1f} s")
+        # Medir desde la caché de páginas, como un log que se acaba de escribir
+        subprocess.run(["cat", path], stdout=subprocess.DEVNULL, check=True)
+        throughput(path, expected, args.chunk_mb)
+        os.remove(path)
+        print()
+        periodic(tmp, args.rps, args.interval)
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compara el tiempo total de enviar un lote de PDFs a NIM de forma secuencial
+frente al envío con concurrencia acotada de ConversionJobManager.submit_batch.
+
+Usa benchmarks.fake_nim en el mismo proceso con latencia y fallos inyectados.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_batch_submission --pdfs 50 --latency-ms 200
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from aiohttp import web
+
+from benchmarks import fake_nim
+
+PORT = 9102
+
+async def run(concurrency: int, pdfs: int, size: int, db_path: str) -> dict:
+    os.environ["NIM_URL"] = f"http://127.0.0.1:{PORT}"
+    os.environ["NIM_BATCH_SIZE"] = str(concurrency)
+    os.environ["NIM_RETRY_BASE_DELAY"] = "0.05"
+    from services.conversion_jobs import BatchItem, ConversionJobManager, ConversionJobStore
+    from services.nim_service import NIMService
+
+    manager = ConversionJobManager(NIMService(), ConversionJobStore(db_path))
+    items = []
+    for i in range(pdfs):
+        content = os.urandom(size)
+        items.append(BatchItem(f"doc-{i}.pdf", lambda content=content: content, size))
+
+    start = time.perf_counter()
+    result = await manager.submit_batch(items)
+    elapsed = time.perf_counter() - start
+    await manager.nim_service.close()
+    return {"concurrency": concurrency, "elapsed_s": elapsed, **{k: result[k] for k in ("succeeded", "failed")}}
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdfs", type=int, default=50)
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--concurrency", default="1,4,8,16")
+    args = parser.parse_args()
+
+    runner = web.AppRunner(fake_nim.make_app(args.latency_ms, failure_rate=args.failure_rate))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+
+    print(f"{'concurrencia':>12} {'tiempo s':>9} {'aceptados':>10} {'fallidos':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for concurrency in map(int, args.concurrency.split(",")):
+            r = await run(concurrency, args.pdfs, args.size_kb * 1024, os.path.join(tmp, f"jobs-{concurrency}.db"))
+            print(f"{r['concurrency']:>12} {r['elapsed_s']:>9.2f} {r['succeeded']:>10} {r['failed']:>9}")
+    await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(main())
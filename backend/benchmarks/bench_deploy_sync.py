@@ -0,0 +1,134 @@
+"""
+Compara el despliegue heredado (sftp.put secuencial de todo el árbol en
+cada despliegue) con DeploySync (manifiesto de hashes, subida en paralelo
+de lo que cambió y cambio atómico de release) sobre un build WebGL
+sintético.
+
+Usa benchmarks.fake_sftp con latencia inyectada por operación SFTP.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_deploy_sync --files 300 --latency-ms 5
+"""
+import argparse
+import filecmp
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks.fake_sftp import FakeSSHServer
+from services.deploy_sync import MANIFEST_NAME, DeploySync
+from services.ssh_pool import SSHConnectionManager
+
+def legacy_upload_directory(sftp, local_path, remote_path):
+    """Copia del _upload_directory original"""
+    for item in os.listdir(local_path):
+        local_item = os.path.join(local_path, item)
+        remote_item = f"{remote_path}/{item}"
+        if os.path.isfile(local_item):
+            sftp.put(local_item, remote_item)
+        elif os.path.isdir(local_item):
+            try:
+                sftp.stat(remote_item)
+            except IOError:
+                sftp.mkdir(remote_item)
+            legacy_upload_directory(sftp, local_item, remote_item)
+
+def make_build(root: str, files: int, rng: random.Random) -> None:
+    """Build WebGL sintético: unos pocos archivos grandes y muchos pequeños"""
+    os.makedirs(os.path.join(root, "Build"))
+    for name, size in (("game.data", 40), ("game.wasm", 12), ("game.framework.js", 2)):
+        with open(os.path.join(root, "Build", name), "wb") as f:
+            f.write(os.urandom(size * 1024 ** 2))
+    for i in range(files):
+        directory = os.path.join(root, "StreamingAssets", f"bundle-{i % 20}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"asset-{i}.bin"), "wb") as f:
+            f.write(os.urandom(rng.randint(1, 64) * 1024))
+    with open(os.path.join(root, "index.html"), "w") as f:
+        f.write("<html></html>")
+
+def mutate(root: str, fraction: float, rng: random.Random) -> None:
+    """Modifica, añade y borra una fracción de los assets pequeños"""
+    assets = []
+    for dirpath, _, names in os.walk(os.path.join(root, "StreamingAssets")):
+        assets += [os.path.join(dirpath, n) for n in names]
+    for path in rng.sample(assets, int(len(assets) * fraction)):
+        with open(path, "wb") as f:
+            f.write(os.urandom(rng.randint(1, 64) * 1024))
+    for path in rng.sample(assets, 3):
+        if os.path.exists(path):
+            os.remove(path)
+    with open(os.path.join(root, "StreamingAssets", "bundle-new.bin"), "wb") as f:
+        f.write(os.urandom(4096))
+
+def same_tree(a: str, b: str) -> bool:
+    comparison = filecmp.dircmp(a, b, ignore=[MANIFEST_NAME])
+    if comparison.left_only or comparison.right_only or comparison.diff_files or comparison.funny_files:
+        return False
+    _, mismatch, errors = filecmp.cmpfiles(a, b, comparison.common_files, shallow=False)
+    return not mismatch and not errors and all(
+        same_tree(os.path.join(a, d), os.path.join(b, d)) for d in comparison.common_dirs
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--changed", type=float, default=0.05)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    server = FakeSSHServer(latency_ms=args.latency_ms)
+    server.start()
+    tmp = tempfile.mkdtemp()
+    try:
+        build = os.path.join(tmp, "build")
+        make_build(build, args.files, rng)
+        ssh = server.client()
+
+        legacy_root = os.path.join(tmp, "legacy", "unity")
+        os.makedirs(legacy_root)
+        sftp = ssh.open_sftp()
+        start = time.perf_counter()
+        legacy_upload_directory(sftp, build, legacy_root)
+        legacy_full = time.perf_counter() - start
+        start = time.perf_counter()
+        legacy_upload_directory(sftp, build, legacy_root)
+        legacy_again = time.perf_counter() - start
+        sftp.close()
+
+        remote = os.path.join(tmp, "public_html", "unity")
+        os.makedirs(os.path.dirname(remote))
+        manager = SSHConnectionManager("127.0.0.1", server.port, "test", password="test")
+        sync = DeploySync(manager, channels=args.channels)
+        rows = [("heredado, primer despliegue", legacy_full, None), ("heredado, sin cambios", legacy_again, None)]
+        r = sync.sync(build, remote)
+        rows.append(("sync, primer despliegue", r["elapsed_s"], r))
+        mutate(build, args.changed, rng)
+        r = sync.sync(build, remote)
+        rows.append((f"sync, {args.changed:.0%} cambiado", r["elapsed_s"], r))
+        assert same_tree(build, remote), "el árbol remoto no coincide con el local"
+        r = sync.sync(build, remote)
+        rows.append(("sync, sin cambios", r["elapsed_s"], r))
+        assert same_tree(build, remote)
+        releases = os.listdir(f"{remote}.releases")
+        ssh.close()
+        manager.close()
+
+        print(f"{'escenario':>28} {'tiempo s':>9} {'subidos':>8} {'borrados':>9} {'MB subidos':>11}")
+        for name, elapsed, r in rows:
+            if r is None:
+                print(f"{name:>28} {elapsed:>9.2f} {'todos':>8} {'-':>9} {'-':>11}")
+            else:
+                print(f"{name:>28} {elapsed:>9.2f} {r['uploaded']:>8} {r['deleted']:>9} "
+                      f"{r['bytes_uploaded'] / 1024 ** 2:>11.1f}")
+        print(f"releases conservadas: {len(releases)}; destino -> {os.readlink(remote)}")
+    finally:
+        server.stop()
+        shutil.rmtree(tmp)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Mide throughput y latencia p99 de /ai/inference con distintos tamaños de lote
+y ventanas de espera.
+
+Uso (desde backend/):
+    MODELS_PATH=/ruta/modelos python -m benchmarks.bench_inference_batching --model-id tiny
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from services.inference_batcher import InferenceBatcher
+from services.nvidia_ngc_service import NvidiaService
+
+async def run_setting(service: NvidiaService, model_id: str, batch_size: int, wait_ms: float,
+                      requests: int, concurrency: int):
+    service.batcher = InferenceBatcher(service._generate_batch, batch_size, wait_ms)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await service.run_inference(model_id, {"text": f"hola mundo {i}"})
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "batch_size": batch_size,
+        "wait_ms": wait_ms,
+        "req_per_s": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "avg_batch": service.batcher.stats()["avg_batch_size"]
+    }
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-id", required=True)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch-sizes", default="1,4,8,16")
+    parser.add_argument("--waits-ms", default="0,5,20")
+    args = parser.parse_args()
+
+    service = NvidiaService()
+    # Calentar el registro para no medir la carga del modelo
+    await service.run_inference(args.model_id, {"text": "calentamiento"})
+
+    print(f"{'lote':>5} {'espera':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'lote medio':>11}")
+    for batch_size in map(int, args.batch_sizes.split(",")):
+        for wait_ms in map(float, args.waits_ms.split(",")):
+            r = await run_setting(service, args.model_id, batch_size, wait_ms,
+                                  args.requests, args.concurrency)
+            print(f"{r['batch_size']:>5} {r['wait_ms']:>7.1f} {r['req_per_s']:>9.1f} "
+                  f"{r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['avg_batch']:>11.2f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
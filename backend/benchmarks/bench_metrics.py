@@ -0,0 +1,193 @@
+"""
+Mide el coste de la instrumentación de /metrics y comprueba que los
+valores se agregan bien entre workers.
+
+1. Sobrecoste por petición: llama a la aplicación ASGI de main.py
+   directamente (sin red ni cliente HTTP, para que el ruido no tape la
+   diferencia) con las métricas desactivadas, activas en un proceso y
+   activas en modo multiproceso (PROMETHEUS_MULTIPROC_DIR), sobre una ruta
+   fija, una con parámetros y una URL sin ruta (recorre toda la tabla).
+2. Coste de un bloque track() de las fases de integraciones.
+3. Agregación: arranca main:app con uvicorn --workers N en modo
+   multiproceso, reparte peticiones entre workers con conexiones nuevas y
+   comprueba que /metrics devuelve el total del nodo desde cualquier worker.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_metrics --requests 20000 --workers 4
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+OVERHEAD = r"""
+import asyncio, json, os, sys, time
+os.environ["RENDER_JOBS_DB"] = os.path.join(sys.argv[3], "render_jobs.db")
+import main
+from services import metrics
+
+requests, rounds = int(sys.argv[1]), int(sys.argv[2])
+app = main.app
+
+async def call(method, path):
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+             "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": b"", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1),
+             "server": ("bench", 80)}
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        pass
+    await app(scope, receive, send)
+
+async def run():
+    results = {}
+    for label, method, path in (("ruta fija", "GET", "/"),
+                                ("ruta con parámetros", "DELETE", "/video/render/abc"),
+                                ("sin ruta (404)", "GET", "/no/existe")):
+        for _ in range(500):
+            await call(method, path)
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(requests):
+                await call(method, path)
+            samples.append((time.perf_counter() - start) / requests * 1e6)
+        # El mínimo de varias rondas: el ruido del sistema solo suma tiempo
+        results[label] = min(samples)
+
+    n = 200000
+    start = time.perf_counter()
+    for _ in range(n):
+        with metrics.track("nvidia", "generate"):
+            pass
+    results["track"] = (time.perf_counter() - start) / n * 1e9
+
+    if metrics.ENABLED:
+        # Las operaciones que la instrumentación hace en cada petición
+        latency = metrics.HTTP_LATENCY.labels("GET", "/bench")
+        requests_total = metrics.HTTP_REQUESTS.labels("GET", "/bench", "200")
+        in_flight = metrics.HTTP_IN_FLIGHT.labels("GET", "/bench")
+        start = time.perf_counter()
+        for _ in range(n):
+            in_flight.inc()
+            latency.observe(0.001)
+            requests_total.inc()
+            in_flight.dec()
+        results["request_ops"] = (time.perf_counter() - start) / n * 1e9
+    print(json.dumps(results))
+
+asyncio.run(run())
+"""
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def overhead(mode: str, requests: int, rounds: int, tmp: str) -> dict:
+    env = dict(os.environ, METRICS_ENABLED="false" if mode == "desactivadas" else "true",
+               SERVICE_WARMUP="", RENDER_QUEUE_TICK="3600")
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    if mode == "multiproceso":
+        env["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(tmp, f"overhead-{mode}")
+        os.makedirs(env["PROMETHEUS_MULTIPROC_DIR"])
+    output = subprocess.run(
+        [sys.executable, "-c", OVERHEAD, str(requests), str(rounds), tmp],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def metric_value(text: str, name: str, labels: str) -> float:
+    match = re.search(rf"^{re.escape(name)}\{{{re.escape(labels)}\}} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else 0.0
+
+def aggregation(workers: int, requests: int, tmp: str) -> None:
+    metrics_dir = os.path.join(tmp, "multiproc")
+    os.makedirs(metrics_dir)
+    port = free_port()
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=metrics_dir, SERVICE_WARMUP="",
+               RENDER_JOBS_DB=os.path.join(tmp, "render_jobs.db"))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--workers", str(workers),
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        env=env
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 120
+        pids = set()
+        warmup = 0
+        # Esperar a que arranquen todos los workers
+        while len(pids) < workers and time.monotonic() < deadline:
+            try:
+                pids.add(httpx.get(f"{url}/health", headers={"Connection": "close"}).json()["pid"])
+                warmup += 1
+            except httpx.HTTPError:
+                time.sleep(0.2)
+
+        served = {}
+        start = time.perf_counter()
+        for _ in range(requests):
+            # Conexión nueva en cada petición: el kernel reparte entre workers
+            pid = httpx.get(f"{url}/health", headers={"Connection": "close"}).json()["pid"]
+            served[pid] = served.get(pid, 0) + 1
+        elapsed = time.perf_counter() - start
+
+        counted = []
+        render_ms = []
+        for _ in range(2 * workers):
+            started = time.perf_counter()
+            text = httpx.get(f"{url}/metrics", headers={"Connection": "close"}).text
+            render_ms.append((time.perf_counter() - started) * 1000)
+            counted.append(metric_value(text, "http_requests_total", 'method="GET",route="/health",status="200"'))
+
+        print(f"{workers} workers uvicorn, {requests} peticiones /health en {elapsed:.1f} s; "
+              f"reparto por worker: {sorted(served.values())}")
+        print(f"/health contadas por /metrics en {len(counted)} consultas: {sorted(set(counted))}; "
+              f"enviadas {requests + warmup} ({warmup} durante el arranque)")
+        print(f"/metrics con {len(os.listdir(metrics_dir))} archivos de métricas: "
+              f"p50 {statistics.median(render_ms):.1f} ms")
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--aggregation-requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        results = {mode: overhead(mode, args.requests, args.rounds, tmp)
+                   for mode in ("desactivadas", "un proceso", "multiproceso")}
+        base = results["desactivadas"]
+        print(f"{'µs por petición (ASGI directo)':>30} {'desactivadas':>13} {'un proceso':>11} "
+              f"{'multiproceso':>13} {'sobrecoste':>11}")
+        for label in ("ruta fija", "ruta con parámetros", "sin ruta (404)"):
+            values = [results[mode][label] for mode in ("desactivadas", "un proceso", "multiproceso")]
+            print(f"{label:>30} {values[0]:>13.1f} {values[1]:>11.1f} {values[2]:>13.1f} "
+                  f"{values[2] - base[label]:>+10.1f}")
+        print(f"operaciones de métricas por petición: {results['un proceso']['request_ops'] / 1000:.1f} µs "
+              f"en un proceso, {results['multiproceso']['request_ops'] / 1000:.1f} µs en multiproceso")
+        print(f"track() por fase: {results['un proceso']['track'] / 1000:.1f} µs en un proceso, "
+              f"{results['multiproceso']['track'] / 1000:.1f} µs en multiproceso")
+        print()
+        aggregation(args.workers, args.aggregation_requests, tmp)
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == "__main__":
+    main()
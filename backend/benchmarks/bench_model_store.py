@@ -0,0 +1,139 @@
+"""
+Mide la memoria y el tiempo de carga de un modelo en N workers a la vez,
+en frío (archivo fuera de la caché de páginas) y en caliente:
+
+- pickle: el model.bin de download_model con torch.load, una copia
+  privada de los pesos en cada proceso (comportamiento anterior)
+- copia: from_pretrained sobre el safetensors convertido
+- mmap: model_store.load_mapped_model sobre el safetensors convertido
+- base: solo imports y un worker sin modelo, para separar lo que ocupan
+  torch y transformers de lo que ocupan los pesos
+
+Genera un GPT-2 sintético, lo guarda como model.bin y lo convierte con
+convert_checkpoint. Cada worker carga el modelo, hace una pasada hacia
+delante (que toca todos los pesos) y, cuando todos han cargado, informa
+de RSS, memoria privada y compartida y PSS (smaps_rollup); la suma de PSS
+es la memoria real que ocupan entre todos.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_model_store --workers 1 4 9 --layers 4 --hidden 512
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+WORKER = r"""
+import json, sys, time
+started = time.perf_counter()
+import torch
+from transformers import AutoConfig, AutoModelForCausalLM
+from services.model_store import load_mapped_model
+imported = time.perf_counter()
+mode, model_dir = sys.argv[1], sys.argv[2]
+model = None
+if mode == "mmap":
+    model = load_mapped_model(model_dir)
+elif mode == "copia":
+    model = AutoModelForCausalLM.from_pretrained(model_dir)
+elif mode == "pickle":
+    model = AutoModelForCausalLM.from_config(AutoConfig.from_pretrained(model_dir))
+    model.load_state_dict(torch.load(f"{model_dir}/model.bin", map_location="cpu", weights_only=True))
+if model is not None:
+    model.eval()
+    with torch.no_grad():
+        model(torch.tensor([[1, 2, 3, 4]]))
+loaded = time.perf_counter()
+print(json.dumps({"load_ms": (loaded - imported) * 1000}), flush=True)
+sys.stdin.readline()
+memory = {}
+with open("/proc/self/smaps_rollup") as f:
+    for line in f:
+        fields = line.split()
+        if fields[0] in ("Rss:", "Pss:", "Private_Clean:", "Private_Dirty:", "Shared_Clean:"):
+            memory[fields[0][:-1]] = int(fields[1]) / 1024
+print(json.dumps(memory), flush=True)
+"""
+
+def evict(model_dir: str) -> None:
+    """Saca los archivos del modelo de la caché de páginas (arranque en frío)"""
+    for name in os.listdir(model_dir):
+        with open(os.path.join(model_dir, name), "rb") as f:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+def run_workers(mode: str, model_dir: str, workers: int) -> dict:
+    processes = [
+        subprocess.Popen([sys.executable, "-c", WORKER, mode, model_dir],
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+                         env=dict(os.environ, TRANSFORMERS_VERBOSITY="error"))
+        for _ in range(workers)
+    ]
+    loads = [json.loads(p.stdout.readline())["load_ms"] for p in processes]
+    memory = []
+    for p in processes:
+        p.stdin.write("\n")
+        p.stdin.flush()
+        memory.append(json.loads(p.stdout.readline()))
+        p.wait()
+    return {
+        "load_ms": statistics.median(loads),
+        "rss": statistics.mean(m["Rss"] for m in memory),
+        "private": statistics.mean(m["Private_Clean"] + m["Private_Dirty"] for m in memory),
+        "shared": statistics.mean(m["Shared_Clean"] for m in memory),
+        "pss_total": sum(m["Pss"] for m in memory)
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 9])
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--hidden", type=int, default=512)
+    parser.add_argument("--vocab", type=int, default=16000)
+    args = parser.parse_args()
+
+    import torch
+    from transformers import GPT2Config, GPT2LMHeadModel
+    from services.model_store import SAFETENSORS_NAME, convert_checkpoint
+
+    tmp = tempfile.mkdtemp()
+    try:
+        model_dir = os.path.join(tmp, "modelo")
+        legacy_dir = os.path.join(tmp, "pickle")
+        config = GPT2Config(n_layer=args.layers, n_embd=args.hidden, n_head=8, vocab_size=args.vocab,
+                            bos_token_id=0, eos_token_id=0)
+        model = GPT2LMHeadModel(config)
+        model.config.save_pretrained(model_dir)
+        torch.save(model.state_dict(), os.path.join(model_dir, "model.bin"))
+        del model
+        # El checkpoint sin convertir se conserva aparte para la carga anterior
+        shutil.copytree(model_dir, legacy_dir)
+        size = os.path.getsize(os.path.join(model_dir, "model.bin")) / 1024 ** 2
+        start = time.perf_counter()
+        convert_checkpoint(model_dir)
+        converted = time.perf_counter() - start
+        print(f"model.bin {size:.0f} MB -> {SAFETENSORS_NAME} "
+              f"{os.path.getsize(os.path.join(model_dir, SAFETENSORS_NAME)) / 1024 ** 2:.0f} MB "
+              f"en {converted:.2f} s (una vez por nodo)")
+
+        header = (f"{'carga':>6} {'workers':>8} {'caché':>8} {'carga p50 ms':>13} {'RSS/worker MB':>14} "
+                  f"{'privada/worker MB':>18} {'compartida/worker MB':>21} {'PSS total MB':>13}")
+        print(header)
+        for workers in args.workers:
+            for mode in ("base", "pickle", "copia", "mmap"):
+                for cache in (("-",) if mode == "base" else ("frío", "caliente")):
+                    directory = legacy_dir if mode == "pickle" else model_dir
+                    if cache == "frío":
+                        evict(directory)
+                    r = run_workers(mode, directory, workers)
+                    print(f"{mode:>6} {workers:>8} {cache:>8} {r['load_ms']:>13.0f} {r['rss']:>14.0f} "
+                          f"{r['private']:>18.0f} {r['shared']:>21.0f} {r['pss_total']:>13.0f}")
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == "__main__":
+    main()
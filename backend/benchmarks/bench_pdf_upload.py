@@ -0,0 +1,99 @@
+"""
+Compara la memoria pico del camino de subida de /convert con el PDF
+bufferizado (lectura completa + archivo temporal) frente al envío por
+streaming a NIM.
+
+Cada modo se ejecuta en un proceso propio contra benchmarks.fake_nim y se
+informa el RSS máximo del proceso.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_pdf_upload --uploads 20 --size-mb 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from fastapi import UploadFile
+
+PORT = 9101
+
+def spooled_upload(size: int) -> UploadFile:
+    """Reproduce el UploadFile que construye Starlette (en disco a partir de 1 MB)"""
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 ** 2)
+    block = os.urandom(1024 ** 2)
+    for _ in range(size // len(block)):
+        spool.write(block)
+    spool.seek(0)
+    return UploadFile(file=spool, filename="bench.pdf", size=size)
+
+async def run_mode(mode: str, uploads: int, size: int) -> dict:
+    os.environ["NIM_URL"] = f"http://127.0.0.1:{PORT}"
+    from services.nim_service import NIMService
+    from services.upload_stream import iter_upload_chunks
+
+    nim_service = NIMService()
+    await nim_service.start()
+    files = [spooled_upload(size) for _ in range(uploads)]
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    async def buffered(file: UploadFile):
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as temp_file:
+            content = await file.read()
+            temp_file.write(content)
+            await nim_service.start_conversion(content)
+
+    async def streamed(file: UploadFile):
+        await nim_service.start_conversion(iter_upload_chunks(file, max_bytes=size))
+
+    handler = buffered if mode == "buffered" else streamed
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(file) for file in files))
+    elapsed = time.perf_counter() - start
+    await nim_service.close()
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "mode": mode,
+        "uploads": uploads,
+        "size_mb": size / 1024 ** 2,
+        "baseline_rss_mb": baseline_kb / 1024,
+        "peak_rss_mb": peak_kb / 1024,
+        "elapsed_s": elapsed
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--mode", choices=["buffered", "streamed"])
+    args = parser.parse_args()
+    size = args.size_mb * 1024 ** 2
+
+    if args.mode:
+        print(json.dumps(asyncio.run(run_mode(args.mode, args.uploads, size))))
+        return
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_nim", "--port", str(PORT)]
+    )
+    try:
+        time.sleep(1.5)
+        print(f"{'modo':>9} {'RSS base MB':>12} {'RSS pico MB':>12} {'tiempo s':>9}")
+        for mode in ("buffered", "streamed"):
+            output = subprocess.check_output([
+                sys.executable, "-m", "benchmarks.bench_pdf_upload",
+                "--mode", mode, "--uploads", str(args.uploads), "--size-mb", str(args.size_mb)
+            ])
+            r = json.loads(output)
+            print(f"{r['mode']:>9} {r['baseline_rss_mb']:>12.1f} {r['peak_rss_mb']:>12.1f} {r['elapsed_s']:>9.2f}")
+    finally:
+        server.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Compara el render_video original (inicia el render y sondea
+IsRenderingInProgress dentro de la petición) con la cola de renderizado
+de DaVinciService: latencia de respuesta, renders completados o fallidos
+con peticiones concurrentes, orden por prioridad, eventos de progreso y
+recuperación de la cola tras reiniciar el backend.
+
+Usa el DaVinciResolveScript simulado de benchmarks/fake_resolve.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_render_queue --jobs 8 --render-seconds 0.5
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "fake_resolve"))
+
+async def legacy_render(project_manager, project_id, render_preset):
+    """Copia del render_video original (con el import de asyncio que le faltaba)"""
+    project = project_manager.LoadProject(project_id)
+    if not project:
+        raise Exception(f"No se pudo cargar el proyecto {project_id}")
+    project.SetRenderSettings({
+        "SelectAllFrames": True,
+        "TargetDir": "./output",
+        "CustomName": f"{project_id}_render",
+        "RenderPreset": render_preset
+    })
+    project.StartRendering()
+    while project.IsRenderingInProgress():
+        await asyncio.sleep(1)
+    return {"project_id": project_id, "status": "success"}
+
+class LegacyProject:
+    """Adapta StartRendering() sin argumentos de la API original al simulador"""
+
+    def __init__(self, project):
+        self.project = project
+
+    def __getattr__(self, name):
+        return getattr(self.project, name)
+
+    def StartRendering(self):
+        return self.project.StartRendering(self.project.AddRenderJob())
+
+async def run_legacy(jobs):
+    import DaVinciResolveScript as dvr
+    manager = dvr.scriptapp("Resolve").GetProjectManager()
+    load = manager.LoadProject
+    manager.LoadProject = lambda name: (lambda p: LegacyProject(p) if p else None)(load(name))
+
+    async def request(project_id):
+        start = time.perf_counter()
+        try:
+            await legacy_render(manager, project_id, "H.264 Master")
+            ok = True
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(request(f"proyecto-{i}") for i in range(jobs)))
+    return results, time.perf_counter() - start
+
+async def run_queue(jobs, rng):
+    from services.davinci_service import DaVinciService
+    service = DaVinciService()
+    await service.start()
+    submitted = []
+    latencies = []
+    start = time.perf_counter()
+    for i in range(jobs):
+        t = time.perf_counter()
+        job = await service.render_video(f"proyecto-{i}", "H.264 Master", priority=rng.choice([0, 0, 5, 10]))
+        latencies.append(time.perf_counter() - t)
+        submitted.append(job)
+
+    events = {job["job_id"]: 0 for job in submitted}
+
+    async def follow(job_id):
+        last = None
+        while True:
+            job = service.get_render_job(job_id)
+            if (job["status"], job["progress"]) != last:
+                last = (job["status"], job["progress"])
+                events[job_id] += 1
+            if job["status"] in ("completed", "failed", "cancelled"):
+                return job
+            await service.renders.wait_for_change(job_id, timeout=1.0)
+
+    finished = await asyncio.gather(*(follow(job["job_id"]) for job in submitted))
+    makespan = time.perf_counter() - start
+    await service.close()
+    return service, submitted, finished, latencies, events, makespan
+
+async def run_restart(jobs, render_seconds):
+    from services.davinci_service import DaVinciService
+    service = DaVinciService()
+    await service.start()
+    ids = [(await service.render_video(f"reinicio-{i}", "H.264 Master"))["job_id"] for i in range(jobs)]
+    await asyncio.sleep(render_seconds * 1.5)
+    await service.close()
+    before = service.renders.store.counts()
+
+    # Un proceso nuevo con la misma base de datos retoma la cola
+    service = DaVinciService()
+    await service.start()
+    while any(service.get_render_job(i)["status"] not in ("completed", "failed") for i in ids):
+        await asyncio.sleep(0.05)
+    await service.close()
+    return before, [service.get_render_job(i)["status"] for i in ids]
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+async def main_async(args):
+    rng = random.Random(3)
+    legacy, legacy_total = await run_legacy(args.jobs)
+    ok = [latency for latency, success in legacy if success]
+    print(f"original, {args.jobs} peticiones concurrentes: {len(ok)} renders correctos, "
+          f"{args.jobs - len(ok)} fallidos (Resolve ocupado); respuesta p50 "
+          f"{percentile([l for l, _ in legacy], 50):.2f} s, máx {max(l for l, _ in legacy):.2f} s; "
+          f"total {legacy_total:.2f} s")
+
+    service, submitted, finished, latencies, events, makespan = await run_queue(args.jobs, rng)
+    completed = [job for job in finished if job["status"] == "completed"]
+    order = sorted(completed, key=lambda job: job["started_at"])
+    priorities = [job["priority"] for job in order]
+    print(f"cola, {args.jobs} trabajos: {len(completed)} completados; respuesta p50 "
+          f"{percentile(latencies, 50) * 1000:.1f} ms, máx {max(latencies) * 1000:.1f} ms; total {makespan:.2f} s")
+    print(f"  prioridades en orden de ejecución: {priorities}")
+    print(f"  eventos de progreso por trabajo: {min(events.values())}-{max(events.values())}; "
+          f"llamadas a Resolve desde otro hilo: {service._resolve.foreign_calls}")
+
+    before, after = await run_restart(args.jobs, args.render_seconds)
+    print(f"reinicio a mitad de cola: antes de parar {before}; tras reanudar "
+          f"{sum(1 for s in after if s == 'completed')}/{len(after)} completados")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--render-seconds", type=float, default=0.5)
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    args = parser.parse_args()
+    os.environ["FAKE_RESOLVE_RENDER_SECONDS"] = str(args.render_seconds)
+    os.environ["RENDER_POLL_INTERVAL"] = str(args.poll_interval)
+    os.environ["RENDER_JOBS_DB"] = os.path.join(tempfile.mkdtemp(), "render_jobs.db")
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
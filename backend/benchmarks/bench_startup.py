@@ -0,0 +1,96 @@
+"""
+Mide el arranque de un worker de la API con la inicialización original
+(todos los servicios construidos al importar main, con sus imports de
+torch/transformers/Resolve) frente a la diferida del ServiceRegistry:
+tiempo hasta poder servir peticiones y RSS por worker, arrancando a la
+vez tantos workers como gunicorn (cpu_count * 2 + 1).
+
+El original importa GeminiService de un módulo que no existe, así que
+tal cual no arranca; la variante "original" de este benchmark omite solo
+ese servicio. DaVinciResolveScript se toma de benchmarks/fake_resolve.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_startup --workers 9
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+WORKER = r"""
+import asyncio, json, os, sys, time
+started = time.perf_counter()
+sys.path.insert(0, os.path.join("benchmarks", "fake_resolve"))
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+if sys.argv[1] == "eager":
+    # Orden y efectos del main.py original (sin GeminiService)
+    from fastapi import FastAPI
+    from services.davinci_service import DaVinciService
+    from services.unity_service import UnityService
+    from services.nvidia_ngc_service import NvidiaService
+    from services.hostinger_service import HostingerService
+    app = FastAPI()
+    services = [DaVinciService(), UnityService(), NvidiaService(), HostingerService()]
+    ready_ms = (time.perf_counter() - started) * 1000
+    ready_rss = rss_mb()
+    settled_rss = ready_rss
+else:
+    import main
+    async def boot():
+        for handler in main.app.router.on_startup:
+            await handler()
+        ready = (time.perf_counter() - started) * 1000, rss_mb()
+        # Esperar a que termine el calentamiento en segundo plano
+        while any(not main.services.services[n].ready for n in main.services.warmup if n in main.services.services):
+            await asyncio.sleep(0.01)
+        return ready
+    (ready_ms, ready_rss) = asyncio.run(boot())
+    settled_rss = rss_mb()
+print(json.dumps({"ready_ms": ready_ms, "rss_mb": ready_rss, "settled_rss_mb": settled_rss,
+                  "torch": "torch" in sys.modules}))
+"""
+
+def boot_workers(mode: str, workers: int, env: dict) -> dict:
+    start = time.perf_counter()
+    processes = [
+        subprocess.Popen([sys.executable, "-c", WORKER, mode], stdout=subprocess.PIPE, env=env)
+        for _ in range(workers)
+    ]
+    results = [json.loads(p.communicate()[0]) for p in processes]
+    wall = time.perf_counter() - start
+    return {
+        "wall_s": wall,
+        "ready_ms": statistics.median(r["ready_ms"] for r in results),
+        "rss_mb": statistics.mean(r["rss_mb"] for r in results),
+        "settled_rss_mb": statistics.mean(r["settled_rss_mb"] for r in results),
+        "torch": any(r["torch"] for r in results)
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count() * 2 + 1)
+    args = parser.parse_args()
+
+    env = dict(os.environ, RENDER_JOBS_DB=os.path.join(tempfile.mkdtemp(), "render_jobs.db"))
+    print(f"{'variante':>10} {'workers':>8} {'listo p50 ms':>13} {'todos listos s':>15} "
+          f"{'RSS/worker MB':>14} {'RSS total MB':>13} {'torch':>6}")
+    for mode in ("eager", "lazy"):
+        for workers in sorted({1, args.workers}):
+            r = boot_workers(mode, workers, env)
+            print(f"{'original' if mode == 'eager' else 'diferida':>10} {workers:>8} {r['ready_ms']:>13.0f} "
+                  f"{r['wall_s']:>15.2f} {r['settled_rss_mb']:>14.0f} {r['settled_rss_mb'] * workers:>13.0f} "
+                  f"{'sí' if r['torch'] else 'no':>6}")
+
+if __name__ == "__main__":
+    main()
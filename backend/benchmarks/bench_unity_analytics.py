@@ -0,0 +1,171 @@
+"""
+Mide la ingesta y las consultas de analíticas de Unity.
+
+1. Ingesta en el almacén: lotes de --batch eventos de una sesión (el caso
+   de un cliente WebGL) y lotes con session_id por evento.
+2. Ingesta por HTTP: POST /unity/analytics/{id}/events contra la
+   aplicación ASGI de main.py, sin red, incluyendo el parseo del JSON.
+3. Consulta de un mes: genera --days días de --events-per-day eventos y
+   mide get_analytics la primera vez (lee todas las columnas), en un
+   proceso nuevo con los resúmenes ya guardados en disco, en caliente y
+   tras añadir eventos al día en curso; comprueba los totales contra una
+   agregación directa sobre todos los eventos.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_unity_analytics --events 500000 --days 30 --events-per-day 300000
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+def ingest_store(store, events: int, batch: int, per_event_sessions: bool) -> float:
+    now = time.time()
+    batches = []
+    for b in range(events // batch):
+        session = f"sesion-{b % 5000}"
+        batches.append([
+            {"type": "interaction" if i % 4 else "view", "timestamp": now - (batch - i) * 0.5,
+             **({"session_id": session} if per_event_sessions else {})}
+            for i in range(batch)
+        ])
+    start = time.perf_counter()
+    for b, items in enumerate(batches):
+        store.append("bench-ingesta", items, None if per_event_sessions else f"sesion-{b % 5000}", now=now)
+    return len(batches) * batch / (time.perf_counter() - start)
+
+def ingest_http(events: int, batch: int) -> float:
+    import main
+
+    now = time.time()
+    body = json.dumps({"session_id": "sesion-http", "events": [
+        {"type": "interaction", "timestamp": now - i * 0.5} for i in range(batch)
+    ]}).encode()
+    path = "/unity/analytics/bench-http/events"
+    status = []
+
+    async def call():
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+                 "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+                 "query_string": b"", "client": ("127.0.0.1", 1), "server": ("bench", 80),
+                 "headers": [(b"host", b"bench"), (b"content-type", b"application/json"),
+                             (b"content-length", str(len(body)).encode())]}
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+
+        await main.app(scope, receive, send)
+
+    async def run():
+        for _ in range(20):
+            await call()
+        start = time.perf_counter()
+        for _ in range(events // batch):
+            await call()
+        return (events // batch) * batch / (time.perf_counter() - start)
+
+    rate = asyncio.run(run())
+    assert set(status) == {202}, set(status)
+    return rate
+
+def write_month(store, experience_id: str, days: int, events_per_day: int, sessions_per_day: int,
+                rng: np.random.Generator):
+    """Escribe los días directamente como columnas; devuelve todos los eventos para comprobar"""
+    today = int(time.time() // 86400)
+    written = []
+    for day in range(today - days + 1, today + 1):
+        # Sesiones de entre segundos y ~1 h repartidas por el día
+        session_ids = rng.integers(1, 2 ** 63, sessions_per_day, dtype=np.uint64)
+        starts = day * 86400 + rng.uniform(0, 86400 - 3600, sessions_per_day)
+        lengths = rng.exponential(300, sessions_per_day).clip(1, 3600)
+        which = rng.integers(0, sessions_per_day, events_per_day)
+        ts = starts[which] + rng.uniform(0, 1, events_per_day) * lengths[which]
+        types = rng.choice(np.array([0, 1, 1, 1, 2], dtype=np.uint8), events_per_day)
+        columns = {"ts": ts, "session": session_ids[which], "type": types}
+        store._write(day, experience_id, columns)
+        written.append(columns)
+    return written
+
+def expected(written) -> dict:
+    ts = np.concatenate([c["ts"] for c in written])
+    sessions = np.concatenate([c["session"] for c in written])
+    types = np.concatenate([c["type"] for c in written])
+    ids, inverse = np.unique(sessions, return_inverse=True)
+    first = np.full(len(ids), np.inf)
+    last = np.full(len(ids), -np.inf)
+    np.minimum.at(first, inverse, ts)
+    np.maximum.at(last, inverse, ts)
+    return {"events": len(ts), "views": int((types == 0).sum()), "interactions": int((types == 1).sum()),
+            "sessions": len(ids), "p50": round(float(np.percentile(last - first, 50)), 3)}
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=500000)
+    parser.add_argument("--http-events", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--events-per-day", type=int, default=300000)
+    parser.add_argument("--sessions-per-day", type=int, default=20000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["UNITY_ANALYTICS_PATH"] = os.path.join(tmp, "analytics")
+    os.environ["RENDER_JOBS_DB"] = os.path.join(tmp, "render_jobs.db")
+    os.environ["RENDER_QUEUE_TICK"] = "3600"
+    from services.unity_analytics import UnityAnalyticsStore
+
+    try:
+        store = UnityAnalyticsStore()
+        print(f"ingesta en el almacén, lotes de {args.batch}:")
+        print(f"  sesión por lote   {ingest_store(store, args.events, args.batch, False):>10,.0f} eventos/s")
+        print(f"  sesión por evento {ingest_store(store, args.events, args.batch, True):>10,.0f} eventos/s")
+        print(f"ingesta por HTTP (ASGI directo, JSON), lotes de {args.batch}:")
+        print(f"  {ingest_http(args.http_events, args.batch):>28,.0f} eventos/s")
+
+        rng = np.random.default_rng(0)
+        start = time.perf_counter()
+        written = write_month(store, "bench-mes", args.days, args.events_per_day, args.sessions_per_day, rng)
+        rows = args.days * args.events_per_day
+        print(f"\n{rows:,} eventos en {args.days} días escritos en {time.perf_counter() - start:.1f} s "
+              f"({rows * 17 / 1e6:.0f} MB en disco)")
+
+        first, first_ms = timed(UnityAnalyticsStore().get_analytics, "bench-mes", args.days)
+        # Un worker nuevo: sin nada en memoria, con los resúmenes en disco
+        cold_store = UnityAnalyticsStore()
+        cold, cold_ms = timed(cold_store.get_analytics, "bench-mes", args.days)
+        warm, warm_ms = timed(cold_store.get_analytics, "bench-mes", args.days)
+        # Un cliente sigue enviando eventos al día en curso
+        now = time.time()
+        store.append("bench-mes", [{"type": "interaction", "timestamp": now - i} for i in range(args.batch)],
+                     "sesion-nueva", now=now)
+        grown, grown_ms = timed(cold_store.get_analytics, "bench-mes", args.days)
+
+        print(f"get_analytics de {args.days} días: primera vez {first_ms:.0f} ms, worker nuevo {cold_ms:.0f} ms, "
+              f"en caliente {warm_ms:.1f} ms, con el día en curso creciendo {grown_ms:.1f} ms")
+        assert first == cold
+        check = expected(written)
+        got = {key: cold[key] for key in ("events", "views", "interactions", "sessions")}
+        got["p50"] = cold["session_duration"]["p50"]
+        print(f"resultado: {json.dumps(cold)}")
+        print(f"comprobación contra agregación directa: {'ok' if got == check else f'DISTINTO {got} != {check}'}; "
+              f"tras añadir {args.batch}: eventos +{grown['events'] - warm['events']}, "
+              f"sesiones +{grown['sessions'] - warm['sessions']}")
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Prueba de carga del hub pub/sub de Unity: miles de clientes WebSocket
+locales suscritos a unas pocas experiencias reciben difusiones publicadas
+por HTTP. Informa percentiles de latencia de entrega, memoria del servidor
+por conexión y clientes lentos desconectados.
+
+El servidor (uvicorn con UnityBroadcastHub) corre en un proceso aparte.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_unity_hub --clients 2000 --experiences 10 --messages 50
+"""
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import time
+
+import aiohttp
+import websockets
+
+PORT = 9104
+
+def rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+def make_app():
+    from fastapi import FastAPI, WebSocket
+    from services.unity_hub import UnityBroadcastHub
+
+    app = FastAPI()
+    hub = UnityBroadcastHub()
+
+    @app.websocket("/unity/ws/{experience_id}")
+    async def subscribe(websocket: WebSocket, experience_id: str):
+        await hub.serve(websocket, experience_id)
+
+    @app.post("/publish/{experience_id}")
+    async def publish(experience_id: str, seq: int, payload_bytes: int = 256):
+        queued = hub.publish(experience_id, {
+            "type": "update_experience",
+            "experience_id": experience_id,
+            "seq": seq,
+            "sent_at": time.monotonic(),
+            "data": {"blob": "x" * payload_bytes}
+        })
+        return {"queued": queued}
+
+    @app.get("/stats")
+    async def stats():
+        return {**hub.stats(), "rss_bytes": rss_bytes(os.getpid())}
+
+    return app
+
+def serve():
+    import uvicorn
+    uvicorn.run(make_app(), host="127.0.0.1", port=PORT, log_level="warning", ws_max_queue=32)
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--slow-clients", type=int, default=20, help="clientes que nunca leen")
+    parser.add_argument("--experiences", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=50, help="difusiones por experiencia")
+    parser.add_argument("--payload-bytes", type=int, default=256)
+    parser.add_argument("--interval-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    server = multiprocessing.get_context("spawn").Process(target=serve, daemon=True)
+    server.start()
+    async with aiohttp.ClientSession() as http:
+        for _ in range(100):
+            try:
+                async with http.get(f"http://127.0.0.1:{PORT}/stats") as r:
+                    base = await r.json()
+                break
+            except aiohttp.ClientError:
+                await asyncio.sleep(0.1)
+
+        latencies = []
+        expected = args.clients * args.messages
+        done = asyncio.Event()
+
+        async def client(i: int):
+            url = f"ws://127.0.0.1:{PORT}/unity/ws/exp-{i % args.experiences}"
+            async with websockets.connect(url, ping_interval=None, max_queue=None) as ws:
+                await ready.wait()
+                async for raw in ws:
+                    latencies.append(time.monotonic() - json.loads(raw)["sent_at"])
+                    if len(latencies) >= expected:
+                        done.set()
+
+        async def slow_client(i: int):
+            # Handshake a mano y después nunca leer, con un buffer de recepción
+            # mínimo: el cliente websockets vacía el socket aunque no se lea
+            sock = socket.socket()
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+            sock.setblocking(False)
+            await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", PORT))
+            reader, writer = await asyncio.open_connection(sock=sock)
+            key = base64.b64encode(os.urandom(16)).decode()
+            writer.write((
+                f"GET /unity/ws/exp-{i % args.experiences} HTTP/1.1\r\nHost: 127.0.0.1\r\n"
+                f"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+            ).encode())
+            await reader.readuntil(b"\r\n\r\n")
+            try:
+                await done.wait()
+            finally:
+                writer.close()
+
+        ready = asyncio.Event()
+        tasks = [asyncio.ensure_future(client(i)) for i in range(args.clients)]
+        tasks += [asyncio.ensure_future(slow_client(i)) for i in range(args.slow_clients)]
+        connected = base["clients"]
+        while connected < args.clients + args.slow_clients:
+            await asyncio.sleep(0.5)
+            async with http.get(f"http://127.0.0.1:{PORT}/stats") as r:
+                stats = await r.json()
+            connected = stats["clients"]
+        per_connection = (stats["rss_bytes"] - base["rss_bytes"]) / connected
+        ready.set()
+
+        start = time.perf_counter()
+        for seq in range(args.messages):
+            for e in range(args.experiences):
+                await http.post(
+                    f"http://127.0.0.1:{PORT}/publish/exp-{e}",
+                    params={"seq": seq, "payload_bytes": args.payload_bytes}
+                )
+            await asyncio.sleep(args.interval_ms / 1000)
+        try:
+            await asyncio.wait_for(done.wait(), 60)
+        except asyncio.TimeoutError:
+            pass
+        elapsed = time.perf_counter() - start
+        async with http.get(f"http://127.0.0.1:{PORT}/stats") as r:
+            stats = await r.json()
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    server.terminate()
+
+    ms = [v * 1000 for v in latencies]
+    print(f"clientes: {args.clients} (+{args.slow_clients} lentos), experiencias: {args.experiences}")
+    print(f"entregas: {len(ms)}/{expected} en {elapsed:.2f} s ({len(ms) / elapsed:.0f} msg/s)")
+    print(
+        f"latencia ms  p50 {percentile(ms, 50):.1f}  p95 {percentile(ms, 95):.1f}  "
+        f"p99 {percentile(ms, 99):.1f}  max {max(ms):.1f}  media {statistics.mean(ms):.1f}"
+    )
+    print(f"memoria servidor por conexión: {per_connection / 1024:.1f} KiB")
+    print(f"clientes lentos desconectados: {stats['dropped_clients']}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""
+Mide mensajes y bytes enviados a Unity con una carga sintética de
+actualizaciones de alta frecuencia: envío directo del dict completo por
+llamada frente a agrupación por ventana, deltas y MessagePack.
+
+Levanta un servidor WebSocket local que cuenta frames y bytes recibidos.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_unity_updates --experiences 20 --rate 200 --seconds 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+import websockets
+
+PORT = 9103
+
+MODES = {
+    # nombre: (ventana ms, deltas, codificación)
+    "directo": (None, False, "json"),
+    "ventana": (20, False, "json"),
+    "ventana+delta": (20, True, "json"),
+    "ventana+delta+msgpack": (20, True, "msgpack"),
+}
+
+class Counter:
+    frames = 0
+    bytes = 0
+
+# Versión de cada experiencia, que lleva Unity (ver UnityUpdateCoalescer)
+versions = {}
+
+async def handler(ws):
+    from services.unity_connection import decode_message, encode_message
+    async for raw in ws:
+        Counter.frames += 1
+        Counter.bytes += len(raw) if isinstance(raw, bytes) else len(raw.encode())
+        message = decode_message(raw)
+        experience_id = message["experience_id"]
+        if message["type"] == "update_experience_delta" and message["base_version"] != versions.get(experience_id):
+            reply = {"status": "resync", "request_id": message["request_id"]}
+        else:
+            versions[experience_id] = versions.get(experience_id, 0) + 1
+            reply = {"status": "ok", "request_id": message["request_id"], "version": versions[experience_id]}
+        await ws.send(encode_message(reply, "msgpack" if isinstance(raw, bytes) else "json"))
+
+def initial_state(keys: int) -> dict:
+    state = {f"object_{i}": {"x": 0.0, "y": 0.0, "z": 0.0, "visible": True} for i in range(keys)}
+    state["scene"] = "lobby"
+    return state
+
+async def run(mode: str, experiences: int, keys: int, rate: float, seconds: float) -> dict:
+    window_ms, deltas, encoding = MODES[mode]
+    os.environ["UNITY_WS_ENCODING"] = encoding
+    from services.unity_connection import UnityConnectionPool
+    from services.unity_updates import UnityUpdateCoalescer
+
+    pool = UnityConnectionPool(f"ws://127.0.0.1:{PORT}")
+    if window_ms is None:
+        async def submit(experience_id, data):
+            return await pool.request({"type": "update_experience", "experience_id": experience_id, "data": data})
+    else:
+        submit = UnityUpdateCoalescer(pool.request, window_ms=window_ms, deltas=deltas).submit
+
+    Counter.frames = Counter.bytes = 0
+    rng = random.Random(42)
+    calls = []
+
+    async def client(experience_id: str):
+        state = initial_state(keys)
+        for _ in range(int(rate * seconds)):
+            # Cada llamada manda el estado completo con 1-3 objetos movidos
+            for name in rng.sample(range(keys), rng.randint(1, 3)):
+                obj = dict(state[f"object_{name}"])
+                obj["x"] = round(obj["x"] + rng.uniform(-1, 1), 3)
+                state[f"object_{name}"] = obj
+            calls.append(asyncio.ensure_future(submit(experience_id, dict(state))))
+            await asyncio.sleep(1 / rate)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(f"exp-{i}") for i in range(experiences)))
+    await asyncio.gather(*calls)
+    elapsed = time.perf_counter() - start
+    await pool.close()
+    return {"mode": mode, "calls": len(calls), "frames": Counter.frames, "bytes": Counter.bytes, "elapsed_s": elapsed}
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--experiences", type=int, default=20)
+    parser.add_argument("--keys", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=200, help="actualizaciones/s por experiencia")
+    parser.add_argument("--seconds", type=float, default=2)
+    args = parser.parse_args()
+
+    server = await websockets.serve(handler, "127.0.0.1", PORT, max_size=None)
+    baseline = None
+    print(f"{'modo':>22} {'llamadas':>9} {'mensajes':>9} {'bytes':>12} {'% mensajes':>11} {'% bytes':>8}")
+    for mode in MODES:
+        r = await run(mode, args.experiences, args.keys, args.rate, args.seconds)
+        baseline = baseline or r
+        print(
+            f"{r['mode']:>22} {r['calls']:>9} {r['frames']:>9} {r['bytes']:>12} "
+            f"{100 * r['frames'] / baseline['frames']:>10.1f}% {100 * r['bytes'] / baseline['bytes']:>7.1f}%"
+        )
+    server.close()
+    await server.wait_closed()
+
+if __name__ == "__main__":
+    asyncio.run(main())
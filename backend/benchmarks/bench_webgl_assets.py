@@ -0,0 +1,147 @@
+"""
+Mide el efecto de prepare_webgl_build (variantes .br/.gz precomprimidas y
+nombres con hash) sobre un build WebGL sintético: bytes totales, tiempo de
+preparación en 1 y N procesos, tiempo de subida con DeploySync frente al
+build sin procesar (primer despliegue y redespliegue tras recompilar el
+.wasm), tiempo de descarga estimado para un cliente y la CPU que costaría
+comprimir en cada petición.
+
+Usa benchmarks.fake_sftp con latencia y ancho de banda limitado.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_webgl_assets --wasm-mb 8 --data-mb 16 --upload-mbps 100
+"""
+import argparse
+import gzip
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.fake_sftp import FakeSSHServer
+from services.deploy_sync import DeploySync
+from services.ssh_pool import SSHConnectionManager
+from services.webgl_assets import COMPRESSIBLE, brotli, prepare_webgl_build
+
+def code_like(size: int, rng: np.random.Generator) -> bytes:
+    """Bytes con la redundancia típica de wasm/js: palabras de un vocabulario reducido"""
+    vocabulary = rng.integers(0, 256, size=(4096, 4), dtype=np.uint8)
+    words = np.minimum(rng.zipf(1.3, size=size // 4), 4096) - 1
+    return vocabulary[words].tobytes()
+
+def make_build(root: str, wasm_mb: float, data_mb: float, rng: np.random.Generator) -> None:
+    """Estructura de un build WebGL de Unity sin compresión propia"""
+    os.makedirs(os.path.join(root, "Build"))
+    mb = 1024 ** 2
+    files = {
+        "Build/game.wasm": code_like(int(wasm_mb * mb), rng),
+        # Mitad escena/metadatos (comprimible), mitad texturas ya comprimidas
+        "Build/game.data": code_like(int(data_mb * mb / 2), rng) + rng.bytes(int(data_mb * mb / 2)),
+        "Build/game.framework.js": code_like(mb, rng),
+        "Build/game.loader.js": code_like(48 * 1024, rng),
+        "TemplateData/style.css": b"body { margin: 0 }\n" * 200,
+        "TemplateData/logo.png": rng.bytes(20 * 1024),
+    }
+    for relative, data in files.items():
+        path = os.path.join(root, *relative.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    with open(os.path.join(root, "index.html"), "w") as f:
+        f.write(
+            '<link rel="stylesheet" href="TemplateData/style.css">'
+            '<script src="Build/game.loader.js"></script><script>'
+            'createUnityInstance(canvas, {dataUrl: "Build/game.data", '
+            'frameworkUrl: "Build/game.framework.js", codeUrl: "Build/game.wasm"})'
+            '</script>'
+        )
+
+def tree_bytes(root: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(dirpath, name))
+        for dirpath, _, names in os.walk(root) for name in names
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--wasm-mb", type=float, default=8)
+    parser.add_argument("--data-mb", type=float, default=16)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--upload-mbps", type=float, default=100)
+    parser.add_argument("--client-mbps", type=float, default=20)
+    parser.add_argument("--brotli-quality", type=int, default=9)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    server = FakeSSHServer(latency_ms=args.latency_ms, bandwidth_mbps=args.upload_mbps)
+    server.start()
+    tmp = tempfile.mkdtemp()
+    try:
+        build = os.path.join(tmp, "build")
+        make_build(build, args.wasm_mb, args.data_mb, rng)
+        workers = os.cpu_count() or 1
+
+        timings = {}
+        for n in sorted({1, workers}):
+            dist = os.path.join(tmp, f"dist-{n}")
+            start = time.perf_counter()
+            manifest = prepare_webgl_build(build, dist, workers=n, brotli_quality=args.brotli_quality)
+            timings[n] = time.perf_counter() - start
+        dist = os.path.join(tmp, f"dist-{workers}")
+        start = time.perf_counter()
+        prepare_webgl_build(build, dist, workers=workers, brotli_quality=args.brotli_quality)
+        cached = time.perf_counter() - start
+
+        # CPU que gastaría el servidor comprimiendo con gzip nivel 6 en cada petición
+        start = time.perf_counter()
+        for dirpath, _, names in os.walk(build):
+            for name in names:
+                if os.path.splitext(name)[1] in COMPRESSIBLE:
+                    with open(os.path.join(dirpath, name), "rb") as f:
+                        gzip.compress(f.read(), compresslevel=6)
+        on_the_fly = time.perf_counter() - start
+
+        manager = SSHConnectionManager("127.0.0.1", server.port, "test", password="test")
+        targets = {}
+        rows = []
+        for label, source in (("build sin procesar", build), ("build preparado", dist)):
+            targets[label] = os.path.join(tmp, "public_html", label.replace(" ", "-"), "unity")
+            os.makedirs(os.path.dirname(targets[label]))
+            rows.append((f"{label}, primer despliegue", DeploySync(manager).sync(source, targets[label])))
+
+        # Recompilar: cambia el .wasm y con él su hash y sus variantes
+        with open(os.path.join(build, "Build", "game.wasm"), "wb") as f:
+            f.write(code_like(int(args.wasm_mb * 1024 ** 2), rng))
+        start = time.perf_counter()
+        prepare_webgl_build(build, dist, workers=workers, brotli_quality=args.brotli_quality)
+        rebuild = time.perf_counter() - start
+        for label, source in (("build sin procesar", build), ("build preparado", dist)):
+            rows.append((f"{label}, redespliegue .wasm", DeploySync(manager).sync(source, targets[label])))
+        manager.close()
+
+        mb = 1024 ** 2
+        raw = manifest["total_bytes"]
+        client = lambda size: size * 8 / (args.client_mbps * 1e6)
+        print(f"build: {len(manifest['files'])} archivos, {raw / mb:.1f} MB sin comprimir; "
+              f"brotli {'sí' if brotli is not None else 'no instalado'}")
+        print(f"{'variante':>12} {'MB':>7} {'ratio':>6} {f'descarga a {args.client_mbps:g} Mbps s':>24}")
+        for name, size in (("sin comprimir", raw), ("gzip", manifest["gzip_bytes"]), ("brotli", manifest["brotli_bytes"])):
+            print(f"{name:>12} {size / mb:>7.1f} {raw / size:>6.2f} {client(size):>24.1f}")
+        print()
+        for n, elapsed in timings.items():
+            print(f"preparación con {n} proceso(s): {elapsed:.2f} s")
+        print(f"preparación sin cambios (caché): {cached:.2f} s; tras recompilar el .wasm: {rebuild:.2f} s")
+        print(f"gzip nivel 6 al vuelo de todo el build (por cada cliente nuevo): {on_the_fly:.2f} s de CPU")
+        print(f"directorio preparado: {tree_bytes(dist) / mb:.1f} MB")
+        print()
+        print(f"{'subida a ' + format(args.upload_mbps, 'g') + ' Mbps':>42} {'tiempo s':>9} {'subidos':>8} {'MB subidos':>11}")
+        for label, r in rows:
+            print(f"{label:>42} {r['elapsed_s']:>9.2f} {r['uploaded']:>8} {r['bytes_uploaded'] / mb:>11.1f}")
+    finally:
+        server.stop()
+        shutil.rmtree(tmp)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Modelo causal diminuto para benchmarks de NvidiaService, sin descargas.
+
+Crea en un directorio un GPT-2 con pesos aleatorios (safetensors), su
+config.json, un generation_config.json que acota la generación y un
+tokenizer WordLevel construido localmente: la misma estructura que deja
+download_model tras convertir el checkpoint, de modo que el servicio lo
+carga por el camino normal (mapeado en memoria).
+
+Uso (desde backend/):
+    python -m benchmarks.fake_model /tmp/modelos/tiny --layers 2 --hidden 64
+"""
+import argparse
+import os
+
+WORDS = (
+    "hola mundo experiencia unity video render modelo texto escena luz cámara "
+    "sonido usuario evento datos red nodo tiempo color forma sombra agua fuego"
+).split()
+
+def make_tiny_model(model_dir: str, layers: int = 2, hidden: int = 64, heads: int = 2,
+                    max_new_tokens: int = 16) -> str:
+    """Escribe el modelo en model_dir y devuelve la ruta"""
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import GenerationConfig, GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+
+    vocab = {"<unk>": 0, "<eos>": 1, **{word: i + 2 for i, word in enumerate(WORDS)}}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, unk_token="<unk>", eos_token="<eos>", bos_token="<eos>"
+    ).save_pretrained(model_dir)
+
+    torch.manual_seed(0)
+    config = GPT2Config(n_layer=layers, n_embd=hidden, n_head=heads, n_positions=128,
+                        vocab_size=len(vocab), bos_token_id=1, eos_token_id=1)
+    GPT2LMHeadModel(config).save_pretrained(model_dir)
+    # Generación determinista y de longitud fija: el coste por petición es estable
+    GenerationConfig(max_new_tokens=max_new_tokens, min_new_tokens=max_new_tokens, do_sample=False,
+                     bos_token_id=1, eos_token_id=1, pad_token_id=1).save_pretrained(model_dir)
+    return model_dir
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model_dir")
+    parser.add_argument("--layers", type=int, default=2)
+    parser.add_argument("--hidden", type=int, default=64)
+    parser.add_argument("--max-new-tokens", type=int, default=16)
+    args = parser.parse_args()
+    os.makedirs(args.model_dir, exist_ok=True)
+    print(make_tiny_model(args.model_dir, args.layers, args.hidden, max_new_tokens=args.max_new_tokens))
@@ -0,0 +1,91 @@
+"""
+Servidor NIM simulado para benchmarks locales.
+
+Implementa /upload, /convert, /status/{id}, /voices y /history. La subida
+se consume por bloques y se descarta, de modo que el servidor no influye en
+la memoria medida en el cliente. La latencia de cada llamada se puede
+inyectar con --latency-ms y una fracción de subidas puede fallar con 503
+(--failure-rate) para ejercitar los reintentos.
+
+Uso (desde backend/):
+    python -m benchmarks.fake_nim --port 9100 --latency-ms 50
+"""
+import argparse
+import asyncio
+import itertools
+import random
+
+from aiohttp import web
+
+def make_app(latency_ms: float = 0, polls_to_complete: int = 2, failure_rate: float = 0) -> web.Application:
+    conversions = {}
+    ids = itertools.count()
+    latency = latency_ms / 1000
+
+    async def delay():
+        if latency:
+            await asyncio.sleep(latency)
+
+    async def upload(request: web.Request) -> web.Response:
+        size = 0
+        async for chunk in request.content.iter_chunked(1024 ** 2):
+            size += len(chunk)
+        await delay()
+        if random.random() < failure_rate:
+            return web.json_response({"detail": "no disponible"}, status=503)
+        return web.json_response({"file_id": f"file-{next(ids)}", "size": size})
+
+    async def convert(request: web.Request) -> web.Response:
+        payload = await request.json()
+        await delay()
+        conversion_id = f"conv-{next(ids)}"
+        conversions[conversion_id] = {"polls": 0, "payload": payload}
+        return web.json_response({"conversion_id": conversion_id})
+
+    async def status(request: web.Request) -> web.Response:
+        await delay()
+        conversion = conversions.get(request.match_info["conversion_id"])
+        if conversion is None:
+            return web.json_response({"detail": "no encontrado"}, status=404)
+        conversion["polls"] += 1
+        if conversion["polls"] < polls_to_complete:
+            return web.json_response({"status": "processing"})
+        return web.json_response({
+            "status": "completed",
+            "audio_url": f"https://nim.local/audio/{request.match_info['conversion_id']}.mp3",
+            "duration": 120.0,
+            "word_count": 1500
+        })
+
+    async def voices(request: web.Request) -> web.Response:
+        await delay()
+        return web.json_response([
+            {"id": "default", "name": "Default"},
+            {"id": "es-female-1", "name": "Lucía"}
+        ])
+
+    async def history(request: web.Request) -> web.Response:
+        await delay()
+        return web.json_response([])
+
+    app = web.Application(client_max_size=0)
+    app.router.add_post("/upload", upload)
+    app.router.add_post("/convert", convert)
+    app.router.add_get("/status/{conversion_id}", status)
+    app.router.add_get("/voices", voices)
+    app.router.add_get("/history", history)
+    return app
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--polls-to-complete", type=int, default=2)
+    parser.add_argument("--failure-rate", type=float, default=0)
+    args = parser.parse_args()
+    web.run_app(
+        make_app(args.latency_ms, args.polls_to_complete, args.failure_rate),
+        host="127.0.0.1",
+        port=args.port,
+        print=None
+    )
@@ -0,0 +1,154 @@
+"""
+Sustituto de DaVinciResolveScript para pruebas y benchmarks, sin Resolve.
+
+Simula el subconjunto de la API de scripting que usa DaVinciService:
+proyectos, timeline, presets y trabajos de renderizado cuyo porcentaje
+avanza con el reloj. Cada render tarda FAKE_RESOLVE_RENDER_SECONDS (2 por
+defecto). Como Resolve, solo admite un renderizado a la vez (el render
+sigue aunque el proceso que lo lanzó termine) y cada handle cuenta las
+llamadas que recibe desde un hilo distinto al que lo creó.
+
+Uso (desde backend/):
+    sys.path.insert(0, "benchmarks/fake_resolve")
+    from services.davinci_service import DaVinciService
+"""
+import os
+import threading
+import time
+import uuid
+
+class _Timeline:
+    def __init__(self, name):
+        self.name = name
+
+    def GetName(self):
+        return self.name
+
+    def GetDuration(self):
+        return 1440
+
+    def GetSetting(self, name):
+        return "24"
+
+class _Project:
+    def __init__(self, app, name):
+        self.app = app
+        self.name = name
+        self.settings = {}
+        self.jobs = {}
+
+    def GetName(self):
+        return self.name
+
+    def GetCurrentTimeline(self):
+        return _Timeline(f"{self.name} timeline")
+
+    def GetTimelineCount(self):
+        return 1
+
+    def GetSetting(self, name):
+        return {"timelineFrameRate": "24", "timelineResolutionWidth": "1920",
+                "timelineResolutionHeight": "1080"}.get(name)
+
+    def LoadRenderPreset(self, name):
+        self.app.check_thread()
+        return bool(name)
+
+    def SetRenderSettings(self, settings):
+        self.app.check_thread()
+        self.settings.update(settings)
+        return True
+
+    def AddRenderJob(self):
+        self.app.check_thread()
+        job_id = uuid.uuid4().hex
+        self.jobs[job_id] = {"started": None, "stopped": False}
+        return job_id
+
+    def DeleteRenderJob(self, job_id):
+        return self.jobs.pop(job_id, None) is not None
+
+    def StartRendering(self, job_id):
+        self.app.check_thread()
+        if self.app.rendering is not None:
+            return False
+        self.jobs[job_id]["started"] = time.monotonic()
+        self.app.rendering = (self, job_id)
+        self.app.renders += 1
+        return True
+
+    def StopRendering(self):
+        self.app.check_thread()
+        if self.app.rendering is not None:
+            project, job_id = self.app.rendering
+            project.jobs[job_id]["stopped"] = True
+            self.app.rendering = None
+
+    def IsRenderingInProgress(self):
+        if self.app.rendering is not None:
+            project, job_id = self.app.rendering
+            # Actualiza el estado si el render ya terminó
+            project.GetRenderJobStatus(job_id)
+        return self.app.rendering is not None
+
+    def GetRenderJobStatus(self, job_id):
+        self.app.check_thread()
+        job = self.jobs.get(job_id)
+        if job is None or job["started"] is None:
+            return {"JobStatus": "Ready", "CompletionPercentage": 0}
+        if job["stopped"]:
+            return {"JobStatus": "Cancelled", "CompletionPercentage": 0}
+        elapsed = time.monotonic() - job["started"]
+        if elapsed >= self.app.render_seconds:
+            if self.app.rendering == (self, job_id):
+                self.app.rendering = None
+            return {"JobStatus": "Complete", "CompletionPercentage": 100,
+                    "TimeTakenToRenderInMs": int(elapsed * 1000)}
+        return {"JobStatus": "Rendering", "CompletionPercentage": int(100 * elapsed / self.app.render_seconds)}
+
+class _ProjectManager:
+    def __init__(self, app):
+        self.app = app
+
+    def LoadProject(self, name):
+        self.app.check_thread()
+        if self.app.rendering is not None:
+            return None
+        self.app.current = _Project(self.app, name)
+        return self.app.current
+
+    def GetCurrentProject(self):
+        return self.app.current
+
+class _State:
+    """Estado de la aplicación Resolve, común a todos los handles del proceso"""
+
+    rendering = None
+    current = None
+    renders = 0
+
+class _Resolve:
+    def __init__(self):
+        self.render_seconds = float(os.getenv("FAKE_RESOLVE_RENDER_SECONDS", "2"))
+        self.thread = threading.get_ident()
+        self.foreign_calls = 0
+
+    def __getattr__(self, name):
+        return getattr(_State, name)
+
+    def __setattr__(self, name, value):
+        if hasattr(_State, name):
+            setattr(_State, name, value)
+        else:
+            super().__setattr__(name, value)
+
+    def check_thread(self):
+        if threading.get_ident() != self.thread:
+            self.foreign_calls += 1
+
+    def GetProjectManager(self):
+        return _ProjectManager(self)
+
+def scriptapp(name):
+    """Handle nuevo ligado al hilo que lo crea; el estado de Resolve es compartido"""
+    return _Resolve()
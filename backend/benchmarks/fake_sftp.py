@@ -0,0 +1,204 @@
+"""
+Servidor SSH/SFTP de prueba basado en paramiko, sin contenedores.
+
+Acepta cualquier usuario y credencial, sirve SFTP sobre el sistema de
+archivos local (las rutas remotas son rutas locales reales, así que las
+pruebas deben usar directorios temporales) y ejecuta exec_command con el
+shell local. Opcionalmente añade latencia por operación y limita el ancho
+de banda de escritura. Solo para pruebas y benchmarks: escucha en 127.0.0.1.
+
+Uso:
+    server = FakeSSHServer(latency_ms=5, bandwidth_mbps=100)
+    server.start()
+    ssh = server.client()
+    ...
+    server.stop()
+"""
+import os
+import socket
+import subprocess
+import threading
+import time
+
+import paramiko
+from paramiko import SFTPAttributes, SFTPHandle, SFTPServer, SFTPServerInterface
+from paramiko.sftp import SFTP_OK
+
+class _Link:
+    """Enlace compartido por todas las escrituras de un servidor: reserva turnos en serie"""
+
+    def __init__(self, seconds_per_byte: float):
+        self.seconds_per_byte = seconds_per_byte
+        self.free_at = 0.0
+        self.lock = threading.Lock()
+
+    def transfer(self, size: int) -> None:
+        if not self.seconds_per_byte:
+            return
+        with self.lock:
+            self.free_at = max(self.free_at, time.monotonic()) + size * self.seconds_per_byte
+            done = self.free_at
+        time.sleep(max(0.0, done - time.monotonic()))
+
+class _Handle(SFTPHandle):
+    link = None
+
+    def write(self, offset, data):
+        if self.link is not None:
+            self.link.transfer(len(data))
+        return super().write(offset, data)
+
+    def stat(self):
+        try:
+            return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    def chattr(self, attr):
+        return SFTP_OK
+
+class _LocalSFTP(SFTPServerInterface):
+    """SFTP sobre el sistema de archivos local con una latencia opcional por operación"""
+
+    latency = 0.0
+    link = None
+
+    def _delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _call(self, fn, *args):
+        self._delay()
+        try:
+            return fn(*args)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    def list_folder(self, path):
+        def listing(path):
+            return [
+                SFTPAttributes.from_stat(os.lstat(os.path.join(path, name)), name)
+                for name in os.listdir(path)
+            ]
+        return self._call(listing, path)
+
+    def stat(self, path):
+        return self._call(lambda p: SFTPAttributes.from_stat(os.stat(p)), path)
+
+    def lstat(self, path):
+        return self._call(lambda p: SFTPAttributes.from_stat(os.lstat(p)), path)
+
+    def open(self, path, flags, attr):
+        def do_open(path):
+            fd = os.open(path, flags | getattr(os, "O_BINARY", 0), 0o644)
+            if flags & os.O_WRONLY:
+                mode = "ab" if flags & os.O_APPEND else "wb"
+            elif flags & os.O_RDWR:
+                mode = "a+b" if flags & os.O_APPEND else "r+b"
+            else:
+                mode = "rb"
+            f = os.fdopen(fd, mode)
+            handle = _Handle(flags)
+            handle.link = self.link
+            handle.filename = path
+            handle.readfile = f
+            handle.writefile = f
+            return handle
+        return self._call(do_open, path)
+
+    def remove(self, path):
+        return self._call(lambda p: os.remove(p) or SFTP_OK, path)
+
+    def rename(self, oldpath, newpath):
+        return self._call(lambda a, b: os.rename(a, b) or SFTP_OK, oldpath, newpath)
+
+    def posix_rename(self, oldpath, newpath):
+        return self._call(lambda a, b: os.replace(a, b) or SFTP_OK, oldpath, newpath)
+
+    def mkdir(self, path, attr):
+        return self._call(lambda p: os.mkdir(p) or SFTP_OK, path)
+
+    def rmdir(self, path):
+        return self._call(lambda p: os.rmdir(p) or SFTP_OK, path)
+
+    def chattr(self, path, attr):
+        return SFTP_OK
+
+    def symlink(self, target_path, path):
+        return self._call(lambda t, p: os.symlink(t, p) or SFTP_OK, target_path, path)
+
+    def readlink(self, path):
+        return self._call(os.readlink, path)
+
+class _Server(paramiko.ServerInterface):
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return "password,publickey"
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED if kind == "session" else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(target=self._run, args=(channel, command.decode()), daemon=True).start()
+        return True
+
+    def _run(self, channel, command):
+        result = subprocess.run(command, shell=True, capture_output=True)
+        channel.sendall(result.stdout)
+        channel.sendall_stderr(result.stderr)
+        channel.send_exit_status(result.returncode)
+        channel.close()
+
+class FakeSSHServer:
+    """Servidor SSH/SFTP local en un hilo"""
+
+    def __init__(self, port: int = 0, latency_ms: float = 0, bandwidth_mbps: float = 0):
+        self.port = port
+        self.latency = latency_ms / 1000
+        self.link = _Link(8 / (bandwidth_mbps * 1e6) if bandwidth_mbps else 0.0)
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.connections = 0
+        self._sock = None
+        self._transports = []
+
+    def start(self) -> None:
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(("127.0.0.1", self.port))
+        self._sock.listen(64)
+        self.port = self._sock.getsockname()[1]
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self) -> None:
+        sftp_class = type("LatencySFTP", (_LocalSFTP,), {
+            "latency": self.latency,
+            "link": self.link
+        })
+        while True:
+            try:
+                client, _ = self._sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            transport = paramiko.Transport(client)
+            transport.add_server_key(self.host_key)
+            transport.set_subsystem_handler("sftp", SFTPServer, sftp_class)
+            transport.start_server(server=_Server())
+            self._transports.append(transport)
+
+    def client(self) -> paramiko.SSHClient:
+        ssh = paramiko.SSHClient()
+        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        ssh.connect("127.0.0.1", port=self.port, username="test", password="test",
+                    look_for_keys=False, allow_agent=False)
+        return ssh
+
+    def stop(self) -> None:
+        self._sock.close()
+        for transport in self._transports:
+            transport.close()
@@ -0,0 +1,51 @@
+"""
+Servidor WebSocket que simula el endpoint de Unity para benchmarks locales.
+
+Responde a cada mensaje con {"status": "ok", "request_id": ...} en la
+misma codificación en que lo recibe (texto JSON o MessagePack binario),
+como espera UnityConnectionPool. La latencia de cada respuesta se puede
+inyectar con --latency-ms.
+
+Uso (desde backend/):
+    python -m benchmarks.fake_unity --port 8765 --latency-ms 5
+"""
+import argparse
+import asyncio
+
+import websockets
+
+from services.unity_connection import decode_message, encode_message
+
+def make_handler(latency_ms: float = 0):
+    latency = latency_ms / 1000
+
+    async def reply(ws, raw):
+        message = decode_message(raw)
+        if latency:
+            await asyncio.sleep(latency)
+        response = {"status": "ok", "request_id": message.get("request_id")}
+        await ws.send(encode_message(response, "msgpack" if isinstance(raw, bytes) else "json"))
+
+    async def handler(ws):
+        # Respuestas concurrentes: una petición lenta no retiene a las demás
+        tasks = set()
+        try:
+            async for raw in ws:
+                task = asyncio.create_task(reply(ws, raw))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except websockets.ConnectionClosed:
+            pass
+
+    return handler
+
+async def serve(port: int, latency_ms: float = 0) -> None:
+    async with websockets.serve(make_handler(latency_ms), "127.0.0.1", port, max_size=None):
+        await asyncio.Future()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+    asyncio.run(serve(args.port, args.latency_ms))
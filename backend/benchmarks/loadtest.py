@@ -0,0 +1,372 @@
+"""
+Prueba de carga de la aplicación completa (main.py) sin servicios externos.
+
+Arranca main:app con uvicorn contra sustitutos locales de cada integración:
+
+- NVIDIA: modelo causal diminuto generado con benchmarks.fake_model
+- Unity: servidor WebSocket de benchmarks.fake_unity
+- DaVinci Resolve: módulo benchmarks/fake_resolve/DaVinciResolveScript.py
+- Hostinger: servidor SSH/SFTP en proceso de benchmarks.fake_sftp
+- NIM: servidor HTTP de benchmarks.fake_nim. Las rutas /pdf-to-podcast
+  requieren los módulos de autenticación (auth, models), que no forman
+  parte del backend, así que NIMService se ejercita directamente desde
+  este proceso
+
+Para cada escenario y nivel de concurrencia mantiene N clientes en bucle
+cerrado durante --seconds segundos y mide peticiones por segundo,
+latencias p50/p95/p99, códigos de estado y RSS máximo del servidor (suma
+del árbol de procesos). También anota la latencia de la primera petición
+de cada escenario (carga del modelo, conexiones...).
+
+Los resultados se guardan como JSON con claves ordenadas en
+benchmarks/results/<commit>.json, de modo que se pueden comparar con
+git diff o con --compare:
+
+Uso (desde backend/):
+    python -m benchmarks.loadtest --concurrency 1 8 32 --seconds 3
+    python -m benchmarks.loadtest --only inferencia unity_update --workers 2
+    python -m benchmarks.loadtest --compare benchmarks/results/a1b2c3d.json benchmarks/results/e4f5a6b.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import paramiko
+
+from benchmarks.fake_model import make_tiny_model
+from benchmarks.fake_sftp import FakeSSHServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+# nombre: (método, ruta, cuerpo JSON) en función del número de petición
+Request = Tuple[str, str, Optional[Dict[str, Any]]]
+HTTP_SCENARIOS: Dict[str, Callable[[int, Dict[str, Any]], Request]] = {
+    "raiz": lambda i, ctx: ("GET", "/", None),
+    "health": lambda i, ctx: ("GET", "/health", None),
+    "metrics": lambda i, ctx: ("GET", "/metrics", None),
+    "inferencia": lambda i, ctx: ("POST", "/ai/inference?model_id=tiny", {"text": "hola mundo unity"}),
+    "unity_update": lambda i, ctx: ("POST", f"/unity/update?experience_id=exp-{i % 16}", {"frame": i, "x": i * 0.5}),
+    "unity_connections": lambda i, ctx: ("GET", "/unity/connections", None),
+    "unity_eventos": lambda i, ctx: ("POST", f"/unity/analytics/exp-{i % 16}/events", {
+        "session_id": f"sesion-{i % 500}",
+        "events": [{"type": "interaction" if j else "view"} for j in range(50)]
+    }),
+    "unity_analiticas": lambda i, ctx: ("GET", f"/unity/analytics/exp-{i % 16}", None),
+    "video_edit": lambda i, ctx: ("POST", "/video/edit?project_id=bench", None),
+    "render_encolar": lambda i, ctx: ("POST", f"/video/render?project_id=p{i}&render_preset=H.264", None),
+    "render_estado": lambda i, ctx: ("GET", f"/video/render/{ctx['render_job_id']}", None),
+    "hosting_status": lambda i, ctx: ("GET", "/hosting/status", None),
+}
+SERVICE_SCENARIOS = ("nim_conversion",)
+SCENARIOS = list(HTTP_SCENARIOS) + list(SERVICE_SCENARIOS)
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_port(port: int, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"El puerto {port} no responde")
+
+def tree_rss_mb(pid: int) -> float:
+    """RSS del proceso y todos sus descendientes"""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError, StopIteration):
+            continue
+    return total / 1024
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] if ordered else 0.0
+
+def git_revision() -> str:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR,
+                               capture_output=True, text=True).stdout.strip()
+        return f"{revision}-cambios" if dirty else revision
+    except (OSError, subprocess.CalledProcessError):
+        return "sin-git"
+
+class Environment:
+    """Sustitutos de las integraciones y el servidor uvicorn que los usa"""
+
+    def __init__(self, workers: int, unity_latency_ms: float, nim_latency_ms: float, ssh_latency_ms: float,
+                 render_seconds: float):
+        self.workers = workers
+        self.unity_latency_ms = unity_latency_ms
+        self.nim_latency_ms = nim_latency_ms
+        self.ssh_latency_ms = ssh_latency_ms
+        self.render_seconds = render_seconds
+        self.tmp = tempfile.mkdtemp(prefix="loadtest-")
+        self.processes: List[subprocess.Popen] = []
+        self.ssh_server: Optional[FakeSSHServer] = None
+        self.server: Optional[subprocess.Popen] = None
+        self.url = ""
+        self.nim_url = ""
+
+    def _spawn(self, args: List[str], env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+        process = subprocess.Popen([sys.executable, *args], cwd=BACKEND_DIR, env=env)
+        self.processes.append(process)
+        return process
+
+    def start(self) -> None:
+        models_path = os.path.join(self.tmp, "models")
+        make_tiny_model(os.path.join(models_path, "tiny"))
+
+        unity_port = free_port()
+        self._spawn(["-m", "benchmarks.fake_unity", "--port", str(unity_port),
+                     "--latency-ms", str(self.unity_latency_ms)])
+        nim_port = free_port()
+        self._spawn(["-m", "benchmarks.fake_nim", "--port", str(nim_port),
+                     "--latency-ms", str(self.nim_latency_ms), "--polls-to-complete", "1"])
+        self.nim_url = f"http://127.0.0.1:{nim_port}"
+
+        self.ssh_server = FakeSSHServer(latency_ms=self.ssh_latency_ms)
+        self.ssh_server.start()
+        key_path = os.path.join(self.tmp, "id_rsa")
+        paramiko.RSAKey.generate(2048).write_private_key_file(key_path)
+        access_log = os.path.join(self.tmp, "access.log")
+        with open(access_log, "w") as f:
+            f.writelines(f'127.0.0.1 - - [01/Jan/2026:00:00:00 +0000] "GET /unity/ HTTP/1.1" 200 {i}\n'
+                         for i in range(1000))
+
+        port = free_port()
+        env = dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join(filter(None, [
+                os.path.join(BACKEND_DIR, "benchmarks", "fake_resolve"), BACKEND_DIR, os.getenv("PYTHONPATH")
+            ])),
+            MODELS_PATH=models_path,
+            UNITY_WS_HOST="127.0.0.1",
+            UNITY_WS_PORT=str(unity_port),
+            RENDER_JOBS_DB=os.path.join(self.tmp, "render_jobs.db"),
+            UNITY_ANALYTICS_PATH=os.path.join(self.tmp, "unity_analytics"),
+            RENDER_OUTPUT_PATH=os.path.join(self.tmp, "render"),
+            FAKE_RESOLVE_RENDER_SECONDS=str(self.render_seconds),
+            RENDER_POLL_INTERVAL="0.05",
+            HOSTINGER_SSH_HOST="127.0.0.1",
+            HOSTINGER_SSH_PORT=str(self.ssh_server.port),
+            HOSTINGER_SSH_USERNAME="bench",
+            HOSTINGER_SSH_KEY_PATH=key_path,
+            HOSTING_ACCESS_LOG=access_log,
+            HOSTING_STATS_DB=os.path.join(self.tmp, "hosting_stats.db"),
+            TRANSFORMERS_VERBOSITY="error",
+            HF_HUB_OFFLINE="1"
+        )
+        if self.workers > 1:
+            env["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(self.tmp, "metrics")
+            os.makedirs(env["PROMETHEUS_MULTIPROC_DIR"])
+        self.server = self._spawn(
+            ["-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(self.workers),
+             "--log-level", "warning", "--no-access-log"],
+            env
+        )
+        for fake_port in (unity_port, nim_port, port):
+            wait_port(fake_port)
+        self.url = f"http://127.0.0.1:{port}"
+
+    def stop(self) -> None:
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if self.ssh_server is not None:
+            self.ssh_server.stop()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+class Scenario:
+    """Una operación que se repite en bucle: devuelve el código de estado"""
+
+    def __init__(self, name: str, env: Environment, client: httpx.AsyncClient, context: Dict[str, Any]):
+        self.name = name
+        self.client = client
+        self.context = context
+        self.nim = None
+        if name == "nim_conversion":
+            os.environ["NIM_URL"] = env.nim_url
+            from services.nim_service import NIMService
+            self.nim = NIMService()
+
+    async def call(self, i: int) -> int:
+        if self.nim is not None:
+            # Subida de un PDF pequeño, inicio de la conversión y una consulta de estado
+            conversion_id = await self.nim.start_conversion(b"%PDF-1.4\n" + b"0" * 32 * 1024)
+            status = await self.nim.get_conversion_status(conversion_id)
+            return 200 if status["status"] == "completed" else 500
+        method, path, body = HTTP_SCENARIOS[self.name](i, self.context)
+        response = await self.client.request(method, path, json=body)
+        await response.aread()
+        return response.status_code
+
+    async def close(self) -> None:
+        if self.nim is not None:
+            await self.nim.close()
+
+async def run_level(scenario: Scenario, concurrency: int, seconds: float, server_pid: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = iter(range(10 ** 9))
+    deadline = time.perf_counter() + seconds
+    peak_rss = tree_rss_mb(server_pid)
+
+    async def client():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = str(await scenario.call(next(counter)))
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while True:
+            await asyncio.sleep(0.2)
+            peak_rss = max(peak_rss, tree_rss_mb(server_pid))
+
+    sampler = asyncio.create_task(sample_rss())
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "requests": len(latencies),
+        "rps": round(ok / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "statuses": statuses,
+        "rss_mb": round(peak_rss, 1)
+    }
+
+async def run_suite(args) -> Dict[str, Any]:
+    env = Environment(args.workers, args.unity_latency_ms, args.nim_latency_ms, args.ssh_latency_ms,
+                      args.render_seconds)
+    try:
+        env.start()
+        limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+        async with httpx.AsyncClient(base_url=env.url, limits=limits, timeout=120) as client:
+            context: Dict[str, Any] = {}
+            response = await client.post("/video/render?project_id=estado&render_preset=H.264")
+            context["render_job_id"] = response.json()["job_id"]
+
+            results: Dict[str, Any] = {}
+            first_request_ms: Dict[str, float] = {}
+            for name in args.only or SCENARIOS:
+                scenario = Scenario(name, env, client, context)
+                try:
+                    started = time.perf_counter()
+                    status = await scenario.call(0)
+                    first_request_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+                    results[name] = {}
+                    for concurrency in args.concurrency:
+                        level = await run_level(scenario, concurrency, args.seconds, env.server.pid)
+                        results[name][str(concurrency)] = level
+                        print(f"{name:>18} c={concurrency:<4} {level['rps']:>8.1f} req/s  p50 {level['p50_ms']:>8.2f}  "
+                              f"p95 {level['p95_ms']:>8.2f}  p99 {level['p99_ms']:>8.2f} ms  "
+                              f"RSS {level['rss_mb']:>7.1f} MB  {level['statuses']}"
+                              + ("" if status < 400 else f"  (primera petición: {status})"), flush=True)
+                finally:
+                    await scenario.close()
+        return {"results": results, "first_request_ms": first_request_ms}
+    finally:
+        env.stop()
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old['meta']['revision']} -> {new['meta']['revision']}")
+    print(f"{'escenario':>18} {'c':>4} {'req/s':>18} {'p50 ms':>18} {'p99 ms':>18} {'RSS MB':>16}")
+
+    def change(key: str, a: Dict[str, Any], b: Dict[str, Any]) -> str:
+        before, after = a[key], b[key]
+        delta = f"{(after - before) / before * 100:+.0f}%" if before else "n/a"
+        return f"{after:>10.1f} {delta:>7}"
+
+    for name, levels in new["results"].items():
+        for concurrency, level in levels.items():
+            previous = old["results"].get(name, {}).get(concurrency)
+            if previous is None:
+                print(f"{name:>18} {concurrency:>4} {'(nuevo)':>18}")
+                continue
+            print(f"{name:>18} {concurrency:>4} {change('rps', previous, level):>18} "
+                  f"{change('p50_ms', previous, level):>18} {change('p99_ms', previous, level):>18} "
+                  f"{change('rss_mb', previous, level):>16}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--only", nargs="+", choices=SCENARIOS)
+    parser.add_argument("--unity-latency-ms", type=float, default=2)
+    parser.add_argument("--nim-latency-ms", type=float, default=20)
+    parser.add_argument("--ssh-latency-ms", type=float, default=5)
+    parser.add_argument("--render-seconds", type=float, default=0.2)
+    parser.add_argument("--output", help="por defecto benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DESPUES"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    revision = git_revision()
+    report = asyncio.run(run_suite(args))
+    report["meta"] = {
+        "revision": revision,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "workers": args.workers,
+        "seconds": args.seconds,
+        "latencies_ms": {"unity": args.unity_latency_ms, "nim": args.nim_latency_ms, "ssh": args.ssh_latency_ms},
+        "render_seconds": args.render_seconds
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+        f.write("\n")
+    print("primera petición (ms): " + ", ".join(f"{k} {v}" for k, v in report["first_request_ms"].items()))
+    print(f"resultados en {output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,27 @@
-from fastapi import FastAPI, HTTPException
+import time
+
+# Referencia para medir el arranque del worker frente a STARTUP_BUDGET_MS
+BOOT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 import uvicorn
 import os
+import json
+import asyncio
+import logging
+from typing import Optional
+
+from services.render_jobs import RENDER_TERMINAL_STATUSES, public_render_job
+from services.unity_connection import UnityBackpressure
+from services.unity_hub import UnityBroadcastHub
+from services.model_executor import ExecutorQueueFull
+from services.service_registry import ServiceRegistry, ServiceUnavailable
+from services import metrics
 
-from services.davinci_service import DaVinciService
-from services.unity_service import UnityService
-from services.nvidia_ngc_service import NvidiaService
-from services.gemini_service import GeminiService
-from services.hostinger_service import HostingerService
+logger = logging.getLogger(__name__)
 
 # Cargar variables de entorno
 load_dotenv()
@@ -28,43 +41,275 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Inicializar servicios
-davinci_service = DaVinciService()
-unity_service = UnityService()
-nvidia_service = NvidiaService()
-gemini_service = GeminiService()
-hostinger_service = HostingerService()
+# Latencia, peticiones en curso y códigos de estado por ruta para /metrics
+if metrics.ENABLED:
+    app.router.route_class = metrics.InstrumentedRoute
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Los servicios se construyen en el primer uso: cada integración importa sus
+# dependencias (torch, transformers, Resolve...) solo cuando se necesita y un
+# fallo en una no impide arrancar ni usar las demás
+def create_davinci_service():
+    from services.davinci_service import DaVinciService
+    return DaVinciService()
+
+def create_unity_service():
+    from services.unity_service import UnityService
+    return UnityService()
+
+def create_nvidia_service():
+    from services.nvidia_ngc_service import NvidiaService
+    return NvidiaService()
+
+def create_gemini_service():
+    from services.gemini_service import GeminiService
+    return GeminiService()
+
+def create_hostinger_service():
+    from services.hostinger_service import HostingerService
+    return HostingerService()
+
+async def start_davinci_service(service):
+    await service.start()
+
+async def start_hostinger_service(service):
+    service.start()
+
+services = ServiceRegistry()
+services.register("davinci", create_davinci_service, on_ready=start_davinci_service)
+services.register("unity", create_unity_service)
+services.register("nvidia", create_nvidia_service)
+services.register("gemini", create_gemini_service)
+services.register("hostinger", create_hostinger_service, on_ready=start_hostinger_service)
+unity_hub = UnityBroadcastHub()
+startup_ms = None
+
+# Conversión de PDF a podcast con NIM. El router depende de los módulos de
+# autenticación (auth, models); si no están instalados se desactiva sin
+# impedir el arranque del resto de la API
+try:
+    from routes import pdf_to_podcast
+except ImportError as e:
+    pdf_to_podcast = None
+    logger.warning(f"Rutas de PDF a podcast desactivadas: {e}")
+else:
+    app.include_router(pdf_to_podcast.router)
+
+@app.on_event("startup")
+async def start_services():
+    global startup_ms
+    # Los servicios con trabajo en segundo plano (cola de renderizado,
+    # métricas del hosting) se inicializan sin bloquear el arranque
+    services.start_warmup()
+    await unity_hub.start()
+    if pdf_to_podcast is not None:
+        await pdf_to_podcast.start_nim_session()
+    startup_ms = round((time.perf_counter() - BOOT_STARTED) * 1000, 1)
+    budget = float(os.getenv("STARTUP_BUDGET_MS", "2000"))
+    if startup_ms > budget:
+        logger.warning(f"Arranque del worker en {startup_ms} ms, por encima del presupuesto de {budget:.0f} ms")
+    else:
+        logger.info(f"Arranque del worker en {startup_ms} ms")
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    if pdf_to_podcast is not None:
+        await pdf_to_podcast.close_nim_session()
+    await services.close()
+    await unity_hub.close()
+
+@app.exception_handler(ServiceUnavailable)
+async def service_unavailable_handler(request: Request, exc: ServiceUnavailable):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
 
 @app.get("/")
 async def root():
     return {"message": "Bienvenido a la API de la Plataforma Integral Omniverse"}
 
+@app.get("/health")
+async def health(probe: bool = False):
+    return {
+        **await services.health(probe),
+        "startup_ms": startup_ms,
+        "pid": os.getpid()
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=404, detail="Métricas desactivadas")
+    # En modo multiproceso se leen los archivos de todos los workers
+    body, content_type = await asyncio.to_thread(metrics.render_metrics)
+    return Response(content=body, media_type=content_type)
+
 @app.post("/video/edit")
 async def edit_video(project_id: str):
+    davinci_service = await services.get("davinci")
     try:
         result = await davinci_service.edit_video(project_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/video/render", status_code=202)
+async def render_video(project_id: str, render_preset: str, priority: int = 0):
+    davinci_service = await services.get("davinci")
+    try:
+        return await davinci_service.render_video(project_id, render_preset, priority)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/video/render")
+async def list_render_jobs(active_only: bool = True):
+    davinci_service = await services.get("davinci")
+    jobs = davinci_service.renders.list_jobs(active_only)
+    return {
+        "jobs": [public_render_job(job) for job in jobs],
+        "queue": davinci_service.renders.stats()
+    }
+
+@app.get("/video/render/{job_id}")
+async def get_render_job(job_id: str):
+    davinci_service = await services.get("davinci")
+    job = davinci_service.get_render_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo de renderizado no encontrado")
+    return job
+
+@app.get("/video/render/{job_id}/events")
+async def stream_render_job(job_id: str):
+    davinci_service = await services.get("davinci")
+    if davinci_service.get_render_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Trabajo de renderizado no encontrado")
+
+    async def event_source():
+        last_state = None
+        while True:
+            job = davinci_service.get_render_job(job_id)
+            state = (job["status"], job["progress"], job["position"])
+            if state != last_state:
+                last_state = state
+                name = "progress" if job["status"] == "rendering" else job["status"]
+                yield f"event: {name}\ndata: {json.dumps(job)}\n\n"
+            if job["status"] in RENDER_TERMINAL_STATUSES:
+                break
+            await davinci_service.renders.wait_for_change(job_id, timeout=1.0)
+
+    return StreamingResponse(event_source(), media_type="text/event-stream")
+
+@app.delete("/video/render/{job_id}")
+async def cancel_render_job(job_id: str):
+    davinci_service = await services.get("davinci")
+    status = davinci_service.renders.cancel(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Trabajo de renderizado no encontrado")
+    return {"job_id": job_id, "status": status}
+
 @app.post("/unity/update")
 async def update_unity_experience(experience_id: str, data: dict):
+    # Los clientes WebGL suscritos reciben la actualización aunque Unity tarde
+    unity_hub.publish(experience_id, {
+        "type": "update_experience",
+        "experience_id": experience_id,
+        "data": data
+    })
+    unity_service = await services.get("unity")
     try:
         result = await unity_service.update_experience(experience_id, data)
         return result
+    except UnityBackpressure as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.websocket("/unity/ws/{experience_id}")
+async def subscribe_unity_experience(websocket: WebSocket, experience_id: str):
+    await unity_hub.serve(websocket, experience_id)
+
+@app.get("/unity/connections")
+async def get_unity_connections():
+    unity_service = await services.get("unity")
+    return {**unity_service.get_connection_stats(), "hub": unity_hub.stats()}
+
+@app.post("/unity/analytics/{experience_id}/events", status_code=202)
+async def record_unity_events(experience_id: str, batch: dict):
+    unity_service = await services.get("unity")
+    try:
+        return await unity_service.record_events(
+            experience_id, batch.get("events", []), batch.get("session_id")
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/unity/analytics/{experience_id}")
+async def get_unity_analytics(experience_id: str, days: int = 30, end: Optional[str] = None):
+    unity_service = await services.get("unity")
+    try:
+        return await unity_service.get_analytics(experience_id, days, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/ai/inference")
 async def run_ai_inference(model_id: str, input_data: dict):
+    nvidia_service = await services.get("nvidia")
     try:
         result = await nvidia_service.run_inference(model_id, input_data)
         return result
+    except ExecutorQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/ai/inference/stream")
+async def stream_ai_inference(model_id: str, input_data: dict):
+    nvidia_service = await services.get("nvidia")
+    try:
+        events = await nvidia_service.stream_inference(model_id, input_data)
+    except ExecutorQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_source():
+        try:
+            async for event in events:
+                name = "done" if event.get("done") else "token"
+                yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(event_source(), media_type="text/event-stream")
+
+@app.get("/ai/models/cache")
+async def get_model_cache_stats():
+    nvidia_service = await services.get("nvidia")
+    return nvidia_service.get_cache_stats()
+
 @app.post("/text/generate")
 async def generate_text(prompt: str):
+    gemini_service = await services.get("gemini")
     try:
         result = await gemini_service.generate_text(prompt)
         return result
@@ -73,11 +318,17 @@ async def generate_text(prompt: str):
 
 @app.get("/hosting/status")
 async def get_hosting_status():
+    hostinger_service = await services.get("hostinger")
     try:
         result = await hostinger_service.get_status()
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/hosting/status/history")
+async def get_hosting_status_history(limit: int = 60):
+    hostinger_service = await services.get("hostinger")
+    return hostinger_service.get_status_history(limit)
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
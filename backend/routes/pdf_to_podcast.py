@@ -1,14 +1,59 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from fastapi.responses import JSONResponse
-from typing import List, Dict
-import tempfile
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Dict, Optional
+from datetime import datetime
+import zipfile
+import json
 import os
-from ..services.nim_service import NIMService
-from ..auth.auth import get_current_user
-from ..models.user import User
+from services.nim_service import NIMService
+from services.upload_stream import (
+    UploadTooLarge,
+    hash_upload,
+    hash_zip_member,
+    iter_upload_chunks,
+    iter_zip_member_chunks,
+    max_upload_bytes,
+    zip_pdf_members
+)
+from services.conversion_cache import conversion_cache_key
+from services.conversion_jobs import (
+    BatchItem,
+    ConversionJobManager,
+    TERMINAL_STATUSES,
+    public_job,
+    validate_webhook_url
+)
+from services import metrics
+from auth.auth import get_current_user
+from models.user import User
 
-router = APIRouter()
+# El prefijo va en el router para que la plantilla de cada ruta lo incluya
+# (etiqueta route de /metrics)
+router = APIRouter(prefix="/pdf-to-podcast", tags=["pdf-to-podcast"])
+if metrics.ENABLED:
+    router.route_class = metrics.InstrumentedRoute
 nim_service = NIMService()
+conversion_jobs = ConversionJobManager(nim_service)
+
+async def start_nim_session():
+    """Sesión NIM compartida, sondeo de trabajos y recuperación de subidas interrumpidas"""
+    await nim_service.start()
+    await conversion_jobs.start()
+
+async def close_nim_session():
+    await conversion_jobs.stop()
+    await nim_service.close()
+
+def check_webhook_url(webhook_url: Optional[str]) -> None:
+    """400 si webhook_url no es una URL pública http(s)"""
+    if webhook_url:
+        try:
+            validate_webhook_url(webhook_url)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=str(e)
+            )
 
 @router.post("/convert")
 async def convert_pdf_to_podcast(
@@ -16,50 +61,242 @@ async def convert_pdf_to_podcast(
     voice_id: str = "default",
     speaking_rate: float = 1.0,
     pitch: float = 1.0,
+    webhook_url: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
     """
-    Convierte un archivo PDF a podcast
+    Encola la conversión de un archivo PDF a podcast
+
+    El PDF se reenvía a NIM por bloques a medida que se lee, sin copiarlo
+    entero en memoria ni en un archivo temporal. Devuelve el id del trabajo
+    sin esperar a la conversión; el estado se consulta en /jobs/{job_id},
+    se sigue por SSE en /jobs/{job_id}/events o se recibe en webhook_url al
+    terminar.
     """
     if not file.filename.endswith('.pdf'):
         raise HTTPException(
             status_code=400,
             detail="El archivo debe ser un PDF"
         )
+    check_webhook_url(webhook_url)
+
+    max_bytes = max_upload_bytes()
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=str(UploadTooLarge(max_bytes))
+        )
 
     try:
-        # Guardar el archivo temporalmente
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
-
-        # Convertir el PDF
-        result = await nim_service.convert_pdf_to_podcast(
-            pdf_content=content,
+        # Identificar el contenido para reutilizar conversiones idénticas
+        pdf_digest, pdf_bytes = await hash_upload(file, max_bytes)
+
+        # Registrar el trabajo de conversión
+        job = await conversion_jobs.submit(
+            pdf_content=iter_upload_chunks(file, max_bytes),
             voice_id=voice_id,
             speaking_rate=speaking_rate,
-            pitch=pitch
+            pitch=pitch,
+            user_id=getattr(current_user, "id", None),
+            webhook_url=webhook_url,
+            cache_key=conversion_cache_key(pdf_digest, voice_id, speaking_rate, pitch),
+            pdf_bytes=pdf_bytes
         )
 
-        # Limpiar el archivo temporal
-        os.unlink(temp_path)
-
         return JSONResponse(
+            status_code=202,
             content={
-                "status": "success",
-                "data": result
+                "status": "accepted",
+                "data": public_job(job)
             }
         )
 
+    except UploadTooLarge as e:
+        raise HTTPException(
+            status_code=413,
+            detail=str(e)
+        )
     except Exception as e:
-        if os.path.exists(temp_path):
-            os.unlink(temp_path)
         raise HTTPException(
             status_code=500,
             detail=str(e)
         )
 
+@router.post("/convert/batch")
+async def convert_pdf_batch(
+    files: List[UploadFile] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    voice_id: str = "default",
+    speaking_rate: float = 1.0,
+    pitch: float = 1.0,
+    webhook_url: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Encola la conversión de varios PDFs a podcast
+
+    Acepta varios archivos en el campo files y/o un ZIP en archive. Los PDFs
+    se envían a NIM con concurrencia NIM_BATCH_SIZE y reintentos por
+    elemento; la respuesta indica el trabajo o el error de cada uno.
+    """
+    check_webhook_url(webhook_url)
+    max_bytes = max_upload_bytes()
+    max_files = int(os.getenv("PDF_BATCH_MAX_FILES", "100"))
+    items: List[BatchItem] = []
+
+    def upload_source(upload: UploadFile):
+        async def chunks():
+            await upload.seek(0)
+            async for chunk in iter_upload_chunks(upload, max_bytes):
+                yield chunk
+        return chunks
+
+    def zip_source(zip_archive: zipfile.ZipFile, name: str):
+        return lambda: iter_zip_member_chunks(zip_archive, name)
+
+    zip_archive = None
+    members: List[zipfile.ZipInfo] = []
+    if archive is not None:
+        try:
+            zip_archive = zipfile.ZipFile(archive.file)
+        except zipfile.BadZipFile:
+            raise HTTPException(
+                status_code=400,
+                detail="El archivo debe ser un ZIP válido"
+            )
+        members = zip_pdf_members(zip_archive)
+
+    # Contar antes de leer nada: el límite debe cortar un ZIP con miles de
+    # entradas sin descomprimirlas ni calcular su hash
+    if not files and not members:
+        raise HTTPException(
+            status_code=400,
+            detail="El lote no contiene PDFs"
+        )
+    if len(files or []) + len(members) > max_files:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El lote supera el máximo de {max_files} archivos"
+        )
+
+    for upload in files or []:
+        if not upload.filename.endswith('.pdf'):
+            items.append(BatchItem(upload.filename, None, 0, error="El archivo debe ser un PDF"))
+            continue
+        try:
+            pdf_digest, pdf_bytes = await hash_upload(upload, max_bytes)
+        except UploadTooLarge as e:
+            items.append(BatchItem(upload.filename, None, 0, error=str(e)))
+            continue
+        items.append(BatchItem(
+            upload.filename,
+            upload_source(upload),
+            pdf_bytes,
+            cache_key=conversion_cache_key(pdf_digest, voice_id, speaking_rate, pitch)
+        ))
+
+    for info in members:
+        if info.file_size > max_bytes:
+            items.append(BatchItem(info.filename, None, 0, error=str(UploadTooLarge(max_bytes))))
+            continue
+        pdf_digest, pdf_bytes = await hash_zip_member(zip_archive, info.filename)
+        items.append(BatchItem(
+            info.filename,
+            zip_source(zip_archive, info.filename),
+            pdf_bytes,
+            cache_key=conversion_cache_key(pdf_digest, voice_id, speaking_rate, pitch)
+        ))
+
+    try:
+        result = await conversion_jobs.submit_batch(
+            items,
+            voice_id=voice_id,
+            speaking_rate=speaking_rate,
+            pitch=pitch,
+            user_id=getattr(current_user, "id", None),
+            webhook_url=webhook_url
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=str(e)
+        )
+
+    return JSONResponse(
+        status_code=202 if result["failed"] == 0 else 207,
+        content={
+            "status": "accepted" if result["failed"] == 0 else "partial",
+            "data": result
+        }
+    )
+
+async def get_user_job(job_id: str, current_user: User) -> Dict:
+    """
+    Trabajo de conversión del usuario; 404 si no existe o es de otro usuario
+    """
+    job = await conversion_jobs.get_job(job_id)
+    user_id = getattr(current_user, "id", None)
+    # La columna user_id es TEXT: SQLite guarda los ids numéricos como texto
+    if job is None or job["user_id"] != (None if user_id is None else str(user_id)):
+        raise HTTPException(
+            status_code=404,
+            detail="Trabajo de conversión no encontrado"
+        )
+    return job
+
+@router.get("/jobs/{job_id}")
+async def get_conversion_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Obtiene el estado de un trabajo de conversión
+    """
+    job = await get_user_job(job_id, current_user)
+    return JSONResponse(
+        content={
+            "status": "success",
+            "data": public_job(job)
+        }
+    )
+
+@router.get("/jobs/{job_id}/events")
+async def stream_conversion_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Emite por SSE cada cambio de estado de un trabajo hasta que termina
+    """
+    await get_user_job(job_id, current_user)
+
+    async def event_source():
+        last_update = None
+        while True:
+            job = await conversion_jobs.get_job(job_id)
+            if job["updated_at"] != last_update:
+                last_update = job["updated_at"]
+                yield f"event: {job['status']}\ndata: {json.dumps(public_job(job))}\n\n"
+            if job["status"] in TERMINAL_STATUSES:
+                break
+            await conversion_jobs.wait_for_change(job_id, timeout=1.0)
+
+    return StreamingResponse(event_source(), media_type="text/event-stream")
+
+@router.get("/cache/stats")
+async def get_conversion_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Obtiene las métricas de la caché de conversiones
+    """
+    return JSONResponse(
+        content={
+            "status": "success",
+            "data": await conversion_jobs.cache_stats()
+        }
+    )
+
 @router.get("/voices")
 async def get_available_voices(
     current_user: User = Depends(get_current_user)
@@ -83,13 +320,28 @@ async def get_available_voices(
 
 @router.get("/history")
 async def get_conversion_history(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    status: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=500),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Obtiene el historial de conversiones
+    Obtiene el historial de conversiones del usuario
+
+    Se responde desde el almacén local de trabajos, filtrable por fecha
+    (since/until, ISO 8601) y estado, y paginado.
     """
     try:
-        history = await nim_service.get_conversion_history()
+        history = await conversion_jobs.get_history(
+            getattr(current_user, "id", None),
+            since=since.timestamp() if since else None,
+            until=until.timestamp() if until else None,
+            status=status,
+            page=page,
+            page_size=page_size
+        )
         return JSONResponse(
             content={
                 "status": "success",
@@ -100,4 +352,4 @@ async def get_conversion_history(
         raise HTTPException(
             status_code=500,
             detail=str(e)
-        ) 
\ No newline at end of file
+        )
@@ -0,0 +1,446 @@
+import os
+import re
+import time
+import shlex
+import calendar
+import logging
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Formatos reconocidos. Las expresiones empiezan por un literal ("[" o '"')
+# para que re salte directamente a la siguiente coincidencia: recorrer un
+# bloque con findall es varias veces más rápido que partir línea a línea.
+# La fecha de Apache y de gunicorn (%t) siempre ocupa 26 caracteres.
+#
+# combined: Apache (LogFormat combined o common) y el accesslog de gunicorn
+# con su access_log_format por defecto:
+#   1.2.3.4 - - [10/Oct/2025:13:55:36 +0000] "GET /ruta?q=1 HTTP/1.1" 200 1234 "referer" "agente"
+# uvicorn: lo que escriben los UvicornWorker de gunicorn en el accesslog, sin
+# fecha ni bytes (se usa la hora de lectura):
+#   1.2.3.4:5678 - "GET /ruta HTTP/1.1" 200
+LOG_FORMATS = {
+    "combined": re.compile(rb'\[([^\]\n]{26})\] "\w* ?([^ ?"\n]*)[^"\n]*" (\d{3}) (\d*)'),
+    "uvicorn": re.compile(rb'"[A-Z]+ ([^ ?"\n]*)[^"\n]*" (\d{3})[ \t\r]*$', re.M)
+}
+
+_MONTHS = {name.encode(): i for i, name in enumerate(
+    ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), start=1
+)}
+
+def parse_log_time(value: bytes) -> Optional[int]:
+    """[10/Oct/2025:13:55:36 +0200] -> segundos epoch; None si no se puede leer"""
+    try:
+        seconds = calendar.timegm((int(value[7:11]), _MONTHS[value[3:6]], int(value[0:2]),
+                                   int(value[12:14]), int(value[15:17]), int(value[18:20])))
+        offset = (int(value[22:24]) * 60 + int(value[24:26])) * 60
+        return seconds - offset if value[21:22] == b"+" else seconds + offset
+    except (KeyError, ValueError, IndexError):
+        return None
+
+def detect_format(data: bytes) -> Optional[str]:
+    """Formato de la primera línea completa que lo identifique"""
+    for line in data.split(b"\n", 20)[:20]:
+        for name, pattern in LOG_FORMATS.items():
+            if pattern.search(line):
+                return name
+    return None
+
+class _Bucket:
+    __slots__ = ("requests", "bytes", "status", "paths")
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.status: Counter = Counter()
+        self.paths: Counter = Counter()
+
+class AccessLogProcessor:
+    """
+    Agregados móviles de un log de accesos que se va leyendo por bloques.
+
+    feed() recibe los bytes nuevos del log, parsea las líneas completas y
+    devuelve cuántos bytes ha consumido (hasta el último salto de línea), de
+    modo que quien lee el archivo avanza su offset solo por líneas enteras.
+    Las peticiones se agrupan en cubos de HOSTING_ACCESS_BUCKET segundos por
+    la fecha del propio log y se conservan los de los últimos
+    HOSTING_ACCESS_WINDOW segundos: peticiones por segundo, códigos de
+    estado, rutas más pedidas (sin query string) y bytes servidos.
+    """
+
+    def __init__(self, window: Optional[float] = None, bucket_seconds: Optional[int] = None,
+                 top_paths: Optional[int] = None, log_format: Optional[str] = None):
+        self.window = window or float(os.getenv("HOSTING_ACCESS_WINDOW", "300"))
+        self.bucket_seconds = bucket_seconds or int(os.getenv("HOSTING_ACCESS_BUCKET", "10"))
+        self.top_paths = top_paths or int(os.getenv("HOSTING_ACCESS_TOP_PATHS", "10"))
+        if log_format is not None and log_format not in LOG_FORMATS:
+            raise ValueError(f"Formato de log desconocido: {log_format}")
+        self.format = log_format
+        self._buckets: Dict[int, _Bucket] = {}
+        self._times: Dict[bytes, Optional[int]] = {}
+        self.newest: Optional[int] = None
+        self.first_seen: Optional[int] = None
+        self.lines = 0
+        self.requests = 0
+        self.bytes = 0
+        self.status: Counter = Counter()
+        self.parse_errors = 0
+
+    def feed(self, data: bytes, final: bool = False, now: Optional[float] = None) -> int:
+        """
+        Procesa las líneas completas de data
+
+        Args:
+            data: Bytes leídos del log
+            final: Procesar también la última línea aunque no acabe en salto
+                de línea (final de un archivo rotado)
+            now: Hora de las líneas sin fecha (formato uvicorn)
+
+        Returns:
+            Bytes consumidos
+        """
+        end = len(data) if final else data.rfind(b"\n") + 1
+        if end <= 0:
+            return 0
+        # Se trabaja hasta end sin copiar el bloque (pueden ser varios MB)
+        lines = data.count(b"\n", 0, end) + (0 if data[end - 1:end] == b"\n" else 1)
+        if self.format is None:
+            self.format = detect_format(data[:min(end, 65536)])
+            if self.format is None:
+                self.parse_errors += lines
+                self.lines += lines
+                return end
+
+        if self.format == "combined":
+            matched = self._add_combined(LOG_FORMATS["combined"].findall(data, 0, end))
+        else:
+            matched = self._add_untimed(LOG_FORMATS["uvicorn"].findall(data, 0, end), now)
+        self.lines += lines
+        self.parse_errors += max(0, lines - matched)
+        self._expire()
+        return end
+
+    def _log_time(self, value: bytes) -> Optional[int]:
+        seconds = self._times.get(value, -1)
+        if seconds == -1:
+            if len(self._times) >= 4096:
+                self._times.clear()
+            seconds = self._times[value] = parse_log_time(value)
+        return seconds
+
+    def _bucket(self, seconds: int) -> Optional[_Bucket]:
+        if self.first_seen is None:
+            self.first_seen = seconds
+        if self.newest is None or seconds > self.newest:
+            self.newest = seconds
+        start = seconds - seconds % self.bucket_seconds
+        if start < self.newest - self.window:
+            # Demasiado antigua para la ventana: solo cuenta en los totales
+            return None
+        bucket = self._buckets.get(start)
+        if bucket is None:
+            bucket = self._buckets[start] = _Bucket()
+        return bucket
+
+    def _add_combined(self, rows: List[Tuple[bytes, bytes, bytes, bytes]]) -> int:
+        matched = 0
+        # Las líneas de un mismo segundo van seguidas: un grupo por segundo
+        for stamp, group in groupby(rows, itemgetter(0)):
+            seconds = self._log_time(stamp)
+            if seconds is None:
+                continue
+            _, paths, codes, sizes = zip(*group)
+            # "-" (sin cuerpo) no entra en el grupo de dígitos y queda vacío
+            served = sum(map(int, filter(None, sizes)))
+            self._count(seconds, len(codes), served, Counter(codes), paths)
+            matched += len(codes)
+        return matched
+
+    def _add_untimed(self, rows: List[Tuple[bytes, bytes]], now: Optional[float]) -> int:
+        if rows:
+            paths, codes = zip(*rows)
+            self._count(int(time.time() if now is None else now), len(rows), 0, Counter(codes), paths)
+        return len(rows)
+
+    def _count(self, seconds: int, requests: int, served: int, status: Counter, paths) -> None:
+        self.requests += requests
+        self.bytes += served
+        self.status.update(status)
+        bucket = self._bucket(seconds)
+        if bucket is not None:
+            bucket.requests += requests
+            bucket.bytes += served
+            bucket.status.update(status)
+            bucket.paths.update(paths)
+
+    def _expire(self) -> None:
+        if self.newest is None:
+            return
+        oldest = self.newest - self.window
+        for start in [start for start in self._buckets if start < oldest - self.bucket_seconds]:
+            del self._buckets[start]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Agregados de la ventana móvil y totales desde el arranque"""
+        buckets = sorted(self._buckets.items())
+        if self.newest is not None:
+            oldest = self.newest - self.window
+            buckets = [(start, b) for start, b in buckets if start + self.bucket_seconds > oldest]
+        requests = sum(b.requests for _, b in buckets)
+        status: Counter = Counter()
+        paths: Counter = Counter()
+        for _, b in buckets:
+            status.update(b.status)
+            paths.update(b.paths)
+        # Al arrancar la ventana aún no está llena
+        span = min(self.window, (self.newest - self.first_seen + 1) if self.newest is not None else 0)
+        return {
+            "format": self.format,
+            "window_s": self.window,
+            "requests": requests,
+            "rps": round(requests / max(span, 1), 3),
+            "bytes": sum(b.bytes for _, b in buckets),
+            "status": _status_classes(status),
+            "status_codes": {code.decode(): count for code, count in sorted(status.items())},
+            "top_paths": [
+                {"path": path.decode(errors="replace"), "requests": count}
+                for path, count in paths.most_common(self.top_paths)
+            ],
+            "series": [
+                {"t": start, "requests": b.requests, "bytes": b.bytes,
+                 "errors": sum(n for code, n in b.status.items() if code[:1] == b"5")}
+                for start, b in buckets
+            ],
+            "last_log_time": self.newest,
+            "totals": {
+                "lines": self.lines,
+                "requests": self.requests,
+                "bytes": self.bytes,
+                "status": _status_classes(self.status),
+                "parse_errors": self.parse_errors
+            }
+        }
+
+def _status_classes(status: Counter) -> Dict[str, int]:
+    classes = {"2xx": 0, "3xx": 0, "4xx": 0, "5xx": 0}
+    for code, count in status.items():
+        key = f"{code[:1].decode()}xx"
+        if key in classes:
+            classes[key] += count
+    return classes
+
+class LocalAccessLog:
+    """
+    Lectura incremental de un log de accesos local (el accesslog de gunicorn)
+
+    Recuerda el inodo y el offset leídos. Si el archivo se rota por
+    renombrado, termina de leer el anterior por el descriptor aún abierto y
+    sigue con el nuevo desde el principio; si se trunca (copytruncate),
+    vuelve al principio. La primera vez empieza por los últimos
+    backfill_bytes y, si va más de max_bytes por detrás, salta hasta los
+    últimos max_bytes para que los agregados sean recientes.
+
+    cursor() y resume() permiten que otro proceso siga donde lo dejó este
+    (el worker que recolecta en HostingStatsCollector) sin volver a leer
+    ni a rellenar lo ya contado.
+    """
+
+    def __init__(self, path: str, processor: Optional[AccessLogProcessor] = None,
+                 max_bytes: Optional[int] = None, backfill_bytes: Optional[int] = None):
+        self.path = path
+        self.processor = processor or AccessLogProcessor()
+        self.max_bytes = max_bytes or int(os.getenv("HOSTING_ACCESS_MAX_BYTES", str(16 * 1024 ** 2)))
+        self.backfill_bytes = backfill_bytes if backfill_bytes is not None else int(
+            os.getenv("HOSTING_ACCESS_BACKFILL_BYTES", str(1024 ** 2))
+        )
+        self._file = None
+        self._inode: Optional[int] = None
+        self._resume: Optional[Tuple[int, int]] = None
+        self.offset = 0
+        self.rotations = 0
+        self.skipped_bytes = 0
+
+    def cursor(self) -> Dict[str, Any]:
+        """Inodo y offset leídos, para resume() en otro proceso"""
+        return {"path": self.path, "inode": self._inode, "offset": self.offset}
+
+    def resume(self, cursor: Dict[str, Any]) -> None:
+        """Sigue desde un cursor() si el archivo no ha cambiado al abrirlo"""
+        if self._file is None and cursor.get("path") == self.path and cursor.get("inode"):
+            self._resume = (cursor["inode"], cursor["offset"])
+
+    def _open(self, start_at_end: bool) -> bool:
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        st = os.fstat(f.fileno())
+        self._file, self._inode = f, st.st_ino
+        resume, self._resume = self._resume, None
+        if start_at_end and resume and resume[0] == st.st_ino and resume[1] <= st.st_size:
+            # El cursor apunta al final de una línea completa
+            self.offset = resume[1]
+            return True
+        self.offset = max(0, st.st_size - self.backfill_bytes) if start_at_end else 0
+        if self.offset:
+            self._skip_partial_line()
+        return True
+
+    def _skip_partial_line(self) -> None:
+        # Empezar a mitad de archivo deja una línea cortada
+        self._file.seek(self.offset - 1)
+        if self._file.read(1) != b"\n":
+            self.offset += len(self._file.readline())
+
+    def _read_to(self, limit: Optional[int], final: bool) -> int:
+        self._file.seek(self.offset)
+        data = self._file.read(limit if limit is not None else -1)
+        consumed = self.processor.feed(data, final=final)
+        self.offset += consumed
+        return consumed
+
+    def poll(self) -> Dict[str, Any]:
+        """Lee lo nuevo desde la última llamada y devuelve los agregados"""
+        if self._file is None and not self._open(start_at_end=True):
+            return {"path": self.path, "available": False, **self.processor.snapshot()}
+
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            st = None
+        if st is None or st.st_ino != self._inode:
+            # Rotado: lo que quede del archivo anterior y después el nuevo
+            self._read_to(None, final=True)
+            self._file.close()
+            self._file = None
+            if st is not None and self._open(start_at_end=False):
+                self.rotations += 1
+        elif st.st_size < self.offset:
+            self.offset = 0
+            self.rotations += 1
+
+        if self._file is not None:
+            size = os.fstat(self._file.fileno()).st_size
+            if size - self.offset > self.max_bytes:
+                skip_to = size - self.max_bytes
+                self.skipped_bytes += skip_to - self.offset
+                self.offset = skip_to
+                self._skip_partial_line()
+            self._read_to(size - self.offset, final=False)
+
+        return {
+            "path": self.path,
+            "available": self._file is not None,
+            "offset": self.offset,
+            "rotations": self.rotations,
+            "skipped_bytes": self.skipped_bytes,
+            **self.processor.snapshot()
+        }
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class RemoteAccessLog:
+    """
+    Lectura incremental de un log de accesos remoto por SSH
+
+    command() devuelve un fragmento de shell que, en la misma ejecución que
+    el resto de métricas, imprime solo los bytes nuevos desde el inodo y el
+    offset recordados (con la cola del archivo rotado, <log>.1, si ha
+    cambiado el inodo), precedidos de una cabecera "tipo inodo inicio
+    longitud". consume() recibe esa salida y avanza el cursor por líneas
+    completas; la misma lógica de arranque y de salto que LocalAccessLog,
+    y también cursor() y resume() para pasar el cursor a otro proceso.
+    """
+
+    def __init__(self, path: str, processor: Optional[AccessLogProcessor] = None,
+                 max_bytes: Optional[int] = None, backfill_bytes: Optional[int] = None):
+        self.path = path
+        self.processor = processor or AccessLogProcessor()
+        self.max_bytes = max_bytes or int(os.getenv("HOSTING_ACCESS_MAX_BYTES", str(16 * 1024 ** 2)))
+        self.backfill_bytes = backfill_bytes if backfill_bytes is not None else int(
+            os.getenv("HOSTING_ACCESS_BACKFILL_BYTES", str(1024 ** 2))
+        )
+        self.inode: Optional[int] = None
+        self.offset = 0
+        self.rotations = 0
+        self.skipped_bytes = 0
+        self.transferred_bytes = 0
+
+    def cursor(self) -> Dict[str, Any]:
+        """Inodo y offset leídos, para resume() en otro proceso"""
+        return {"path": self.path, "inode": self.inode, "offset": self.offset}
+
+    def resume(self, cursor: Dict[str, Any]) -> None:
+        """Sigue desde un cursor(); command() comprueba el inodo en el servidor"""
+        if cursor.get("path") == self.path and cursor.get("inode"):
+            self.inode, self.offset = cursor["inode"], cursor["offset"]
+
+    def command(self) -> str:
+        return "; ".join([
+            f"f={shlex.quote(self.path)}; ino={self.inode or 0}; off={self.offset}; max={self.max_bytes}",
+            "set -- $(stat -Lc '%i %s' \"$f\" 2>/dev/null) 0 0; cur=$1; size=$2",
+            f"if [ \"$ino\" = 0 ]; then off=$(( size > {self.backfill_bytes} ? size - {self.backfill_bytes} : 0 ))",
+            "elif [ \"$cur\" != \"$ino\" ]; then "
+            "set -- $(stat -Lc '%i %s' \"$f.1\" 2>/dev/null) 0 0; "
+            "if [ \"$1\" = \"$ino\" ] && [ \"$2\" -gt \"$off\" ]; then "
+            "n=$(( $2 - off < max ? $2 - off : max )); echo \"rotated $1 $off $n\"; "
+            "tail -c +$((off + 1)) \"$f.1\" | head -c \"$n\"; fi; off=0",
+            "elif [ \"$size\" -lt \"$off\" ]; then off=0; fi",
+            "if [ $(( size - off )) -gt \"$max\" ]; then off=$(( size - max )); fi",
+            "echo \"current $cur $off $(( size - off ))\"",
+            "tail -c +$((off + 1)) \"$f\" | head -c $(( size - off ))"
+        ])
+
+    def consume(self, payload: bytes) -> Dict[str, Any]:
+        """Procesa la salida de command() y devuelve los agregados"""
+        self.transferred_bytes += len(payload)
+        available = False
+        position = 0
+        while position < len(payload):
+            newline = payload.find(b"\n", position)
+            if newline < 0:
+                break
+            header = payload[position:newline].split()
+            position = newline + 1
+            if len(header) != 4 or not all(field.isdigit() for field in header[1:]):
+                continue
+            kind, inode, start, length = header[0], int(header[1]), int(header[2]), int(header[3])
+            data = payload[position:position + length]
+            position += length
+
+            if kind == b"rotated":
+                self.processor.feed(data, final=True)
+                self.rotations += 1
+                continue
+            if inode == 0:
+                # El log no existe (todavía o tras rotar sin recrearlo)
+                self.inode, self.offset = None, 0
+                continue
+
+            available = True
+            skipped = 0
+            if start > 0 and (inode != self.inode or start != self.offset):
+                if inode == self.inode and start > self.offset:
+                    self.skipped_bytes += start - self.offset
+                # Empezar a mitad de archivo deja una línea cortada
+                skipped = data.find(b"\n") + 1
+            elif inode == self.inode and start < self.offset:
+                self.rotations += 1
+            consumed = self.processor.feed(data[skipped:])
+            self.inode, self.offset = inode, start + skipped + consumed
+
+        return {
+            "path": self.path,
+            "available": available,
+            "offset": self.offset,
+            "rotations": self.rotations,
+            "skipped_bytes": self.skipped_bytes,
+            "transferred_bytes": self.transferred_bytes,
+            **self.processor.snapshot()
+        }
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+def conversion_cache_key(pdf_digest: str, voice_id: str, speaking_rate: float, pitch: float) -> str:
+    """Clave del resultado: hash del PDF más los parámetros de conversión"""
+    material = json.dumps([pdf_digest, voice_id, float(speaking_rate), float(pitch)])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+class ConversionResultCache:
+    """
+    Caché direccionada por contenido de resultados de conversión.
+
+    Guarda audio_url/duration/word_count por clave en SQLite, compartida por
+    todos los workers del nodo, con TTL y desalojo de las entradas menos
+    usadas cuando se supera el número máximo de entradas. Los contadores de
+    stats() también se guardan ahí, así que suman lo de todos los workers.
+    """
+
+    COUNTERS = ("hits", "misses", "coalesced", "evictions", "bytes_saved")
+
+    def __init__(
+        self,
+        db_path: str,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None
+    ):
+        self.ttl = ttl if ttl is not None else float(os.getenv("CONVERSION_CACHE_TTL", str(7 * 24 * 3600)))
+        self.max_entries = max_entries if max_entries is not None else int(
+            os.getenv("CONVERSION_CACHE_MAX_ENTRIES", "10000")
+        )
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS conversion_cache (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                pdf_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_hit_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS conversion_cache_lru ON conversion_cache (last_hit_at)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS conversion_cache_counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
+
+    def _count(self, **increments: int) -> None:
+        """Suma increments a los contadores compartidos; llamar con self._lock"""
+        self._conn.executemany(
+            """INSERT INTO conversion_cache_counters (name, value) VALUES (?, ?)
+               ON CONFLICT (name) DO UPDATE SET value = value + excluded.value""",
+            [(name, value) for name, value in increments.items() if value]
+        )
+
+    def get(self, key: str, pdf_bytes: int) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve el resultado en caché o None si no existe o expiró
+
+        Args:
+            key: Clave de conversion_cache_key
+            pdf_bytes: Tamaño del PDF, para contabilizar los bytes ahorrados
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, created_at FROM conversion_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM conversion_cache WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._count(misses=1)
+                return None
+            self._conn.execute(
+                "UPDATE conversion_cache SET last_hit_at = ? WHERE key = ?",
+                (now, key)
+            )
+            self._count(hits=1, bytes_saved=pdf_bytes)
+        return json.loads(row[0])
+
+    def record_coalesced(self, pdf_bytes: int) -> None:
+        """Contabiliza una subida idéntica unida a una conversión en curso"""
+        with self._lock:
+            self._count(coalesced=1, bytes_saved=pdf_bytes)
+
+    def put(self, key: str, result: Dict[str, Any], pdf_bytes: int) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO conversion_cache
+                   (key, result, pdf_bytes, created_at, last_hit_at) VALUES (?, ?, ?, ?, ?)""",
+                (key, json.dumps(result), pdf_bytes, now, now)
+            )
+            self._conn.execute(
+                "DELETE FROM conversion_cache WHERE created_at < ?",
+                (now - self.ttl,)
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM conversion_cache").fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    """DELETE FROM conversion_cache WHERE key IN (
+                           SELECT key FROM conversion_cache ORDER BY last_hit_at LIMIT ?
+                       )""",
+                    (excess,)
+                )
+                self._count(evictions=excess)
+
+    def stats(self) -> Dict[str, Any]:
+        """Tasa de aciertos y bytes de PDF que no hubo que reenviar a NIM"""
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM conversion_cache").fetchone()
+            counters = dict(self._conn.execute("SELECT name, value FROM conversion_cache_counters"))
+        counts = {name: counters.get(name, 0) for name in self.COUNTERS}
+        lookups = counts["hits"] + counts["misses"]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            **counts,
+            "hit_rate": counts["hits"] / lookups if lookups else 0.0
+        }
@@ -0,0 +1,723 @@
+import os
+import json
+import time
+import uuid
+import socket
+import random
+import sqlite3
+import asyncio
+import logging
+import ipaddress
+import threading
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, Callable, Dict, List, Optional, Set, Tuple, Union
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+from fastapi import HTTPException
+
+from .conversion_cache import ConversionResultCache
+from .nim_service import NIMService
+from .upload_stream import UploadTooLarge
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+PdfContent = Union[bytes, AsyncIterable[bytes]]
+
+def _is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global
+
+def _allow_private_webhooks() -> bool:
+    return os.getenv("NIM_WEBHOOK_ALLOW_PRIVATE", "false").lower() == "true"
+
+def validate_webhook_url(url: str) -> None:
+    """
+    Comprueba que webhook_url sea una URL http(s) a la que el servidor puede
+    enviar el resultado
+
+    Sin NIM_WEBHOOK_ALLOW_PRIVATE se rechazan las direcciones IP que no son
+    públicas (loopback, red privada, link-local...) para que un cliente no
+    use el webhook contra servicios internos. Los nombres de host se
+    comprueban al enviar, al resolverlos (ver _PublicResolver).
+
+    Raises:
+        ValueError: si la URL no es válida
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("webhook_url debe ser una URL http o https")
+    if _allow_private_webhooks():
+        return
+    if parts.hostname == "localhost" or parts.hostname.endswith(".localhost"):
+        raise ValueError("webhook_url no puede apuntar a una dirección local")
+    try:
+        public = _is_public_address(parts.hostname)
+    except ValueError:
+        return
+    if not public:
+        raise ValueError("webhook_url no puede apuntar a una dirección local o privada")
+
+class _PublicResolver(AbstractResolver):
+    """
+    Resolver de aiohttp que descarta las direcciones no públicas
+
+    Se comprueba la dirección a la que realmente se conecta, así un nombre
+    que resuelve a una IP interna (o cambia de IP tras validarlo) no sirve
+    para alcanzar servicios internos.
+    """
+
+    def __init__(self):
+        self._resolver = aiohttp.DefaultResolver()
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> List[Dict[str, Any]]:
+        hosts = await self._resolver.resolve(host, port, family)
+        public = [entry for entry in hosts if _is_public_address(entry["host"])]
+        if not public:
+            raise OSError(f"{host} no resuelve a ninguna dirección pública")
+        return public
+
+    async def close(self) -> None:
+        await self._resolver.close()
+
+@dataclass
+class BatchItem:
+    """PDF de un lote: open_content devuelve un flujo nuevo en cada intento"""
+
+    filename: str
+    open_content: Callable[[], PdfContent]
+    pdf_bytes: int
+    cache_key: Optional[str] = None
+    error: Optional[str] = None
+
+class ConversionJobStore:
+    """
+    Almacén SQLite de trabajos de conversión PDF a podcast.
+
+    Permite que el estado de los trabajos sobreviva a reinicios del worker y
+    que varios workers de gunicorn repartan el sondeo sin duplicarlo. Cada
+    petición tiene su propia fila; las que se unen a una conversión idéntica
+    en curso apuntan con leader_id a la fila que la sube y la sondea.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("CONVERSION_JOBS_DB", "data/conversion_jobs.db")
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT,
+                status TEXT NOT NULL,
+                conversion_id TEXT,
+                params TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                webhook_url TEXT,
+                poll_interval REAL NOT NULL,
+                next_poll_at REAL NOT NULL,
+                poll_errors INTEGER NOT NULL DEFAULT 0,
+                cache_key TEXT,
+                pdf_bytes INTEGER,
+                leader_id TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._migrate()
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, next_poll_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_cache_key ON jobs (cache_key, status)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_history ON jobs (user_id, created_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_leader ON jobs (leader_id)"
+        )
+
+    def _migrate(self) -> None:
+        """Añade las columnas nuevas a bases de datos creadas por versiones anteriores"""
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for name, definition in (("cache_key", "TEXT"), ("pdf_bytes", "INTEGER"),
+                                 ("leader_id", "TEXT")):
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+
+    def create(self, user_id: Optional[str], params: Dict[str, Any],
+               webhook_url: Optional[str], poll_interval: float,
+               cache_key: Optional[str] = None, pdf_bytes: Optional[int] = None,
+               status: str = "uploading", result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO jobs (id, user_id, status, params, result, webhook_url, poll_interval,
+                                     next_poll_at, cache_key, pdf_bytes, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (job_id, user_id, status, json.dumps(params), json.dumps(result) if result else None,
+                 webhook_url, poll_interval, now, cache_key, pdf_bytes, now, now)
+            )
+        return self.get(job_id)
+
+    def create_or_join(self, user_id: Optional[str], params: Dict[str, Any],
+                       webhook_url: Optional[str], poll_interval: float,
+                       cache_key: str, pdf_bytes: int) -> Tuple[Dict[str, Any], bool]:
+        """
+        Crea el trabajo de quien llama y lo une a la conversión en curso con
+        la misma cache_key, si la hay
+
+        El trabajo unido conserva su user_id y webhook_url y sigue el estado
+        de la conversión compartida (ver update_followers). La comprobación y
+        la inserción van en una transacción para que dos workers no lancen la
+        misma conversión a la vez.
+
+        Returns:
+            (trabajo, True si lanza una conversión nueva)
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                leader = self._conn.execute(
+                    """SELECT id, status, conversion_id FROM jobs WHERE cache_key = ?
+                       AND status IN ('uploading', 'processing') AND leader_id IS NULL
+                       ORDER BY created_at LIMIT 1""",
+                    (cache_key,)
+                ).fetchone()
+                now = time.time()
+                self._conn.execute(
+                    """INSERT INTO jobs (id, user_id, status, conversion_id, params, webhook_url,
+                                         poll_interval, next_poll_at, cache_key, pdf_bytes, leader_id,
+                                         created_at, updated_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (job_id, user_id, leader["status"] if leader else "uploading",
+                     leader["conversion_id"] if leader else None, json.dumps(params), webhook_url,
+                     poll_interval, now, cache_key, pdf_bytes, leader["id"] if leader else None, now, now)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(job_id), leader is None
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def update(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = time.time()
+        for key in ("params", "result"):
+            if key in fields and fields[key] is not None:
+                fields[key] = json.dumps(fields[key])
+        columns = ", ".join(f"{key} = ?" for key in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ?",
+                (*fields.values(), job_id)
+            )
+
+    def update_followers(self, leader_id: str, **fields) -> List[str]:
+        """
+        Aplica fields a los trabajos sin terminar unidos a leader_id
+
+        Returns:
+            Ids de los trabajos actualizados
+        """
+        fields["updated_at"] = time.time()
+        if fields.get("result") is not None:
+            fields["result"] = json.dumps(fields["result"])
+        columns = ", ".join(f"{key} = ?" for key in fields)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [row["id"] for row in self._conn.execute(
+                    "SELECT id FROM jobs WHERE leader_id = ? AND status NOT IN ('completed', 'failed')",
+                    (leader_id,)
+                )]
+                self._conn.executemany(
+                    f"UPDATE jobs SET {columns} WHERE id = ?",
+                    [(*fields.values(), job_id) for job_id in ids]
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return ids
+
+    def list_jobs(
+        self,
+        user_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        status: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Historial de trabajos, del más reciente al más antiguo
+
+        Returns:
+            (página de trabajos, total de trabajos que cumplen el filtro)
+        """
+        conditions = []
+        values: List[Any] = []
+        for clause, value in (
+            ("user_id = ?", user_id),
+            ("created_at >= ?", since),
+            ("created_at < ?", until),
+            ("status = ?", status)
+        ):
+            if value is not None:
+                conditions.append(clause)
+                values.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            (total,) = self._conn.execute(f"SELECT COUNT(*) FROM jobs {where}", values).fetchone()
+            rows = self._conn.execute(
+                f"SELECT * FROM jobs {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (*values, limit, offset)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows], total
+
+    def claim_due(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Reserva los trabajos cuyo sondeo toca ahora
+
+        Se adelanta next_poll_at dentro de la misma transacción para que otro
+        worker no reclame los mismos trabajos.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    """SELECT * FROM jobs WHERE status = 'processing' AND next_poll_at <= ?
+                       AND leader_id IS NULL ORDER BY next_poll_at LIMIT ?""",
+                    (now, limit)
+                ).fetchall()
+                for row in rows:
+                    self._conn.execute(
+                        "UPDATE jobs SET next_poll_at = ? WHERE id = ?",
+                        (now + row["poll_interval"], row["id"])
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [self._to_dict(row) for row in rows]
+
+    def fail_interrupted_uploads(self, grace: float) -> int:
+        """
+        Marca como fallidos los trabajos cuya subida quedó a medias
+
+        Solo afecta a subidas más antiguas que grace segundos, para no tocar
+        las que otro worker sigue realizando.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                """UPDATE jobs SET status = 'failed', error = ?, updated_at = ?
+                   WHERE status = 'uploading' AND updated_at < ?""",
+                ("Subida interrumpida por reinicio del servidor", time.time(), time.time() - grace)
+            )
+            # Los trabajos unidos a una de esas subidas ya no tienen quien los termine
+            self._conn.execute(
+                """UPDATE jobs SET status = 'failed', error = ?, updated_at = ?
+                   WHERE status IN ('uploading', 'processing') AND leader_id IN
+                   (SELECT id FROM jobs WHERE status = 'failed')""",
+                ("Subida interrumpida por reinicio del servidor", time.time())
+            )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+class ConversionJobManager:
+    """
+    Gestiona conversiones PDF a podcast como trabajos asíncronos.
+
+    submit() sube el PDF a NIM mientras llega del cliente y devuelve el
+    trabajo sin esperar a la conversión. Un único bucle por worker sondea
+    todas las conversiones en curso con backoff adaptativo y notifica a los
+    suscriptores (SSE) y webhooks.
+
+    Las llamadas al almacén SQLite van a un hilo: con varios workers una
+    escritura puede esperar el bloqueo de otro hasta busy_timeout, y eso no
+    debe detener el event loop. Los webhooks se envían en tareas propias con
+    un límite de NIM_WEBHOOK_TIMEOUT segundos, para que un receptor lento
+    no retrase el sondeo del resto de trabajos.
+    """
+
+    def __init__(self, nim_service: NIMService, store: Optional[ConversionJobStore] = None,
+                 cache: Optional[ConversionResultCache] = None):
+        self.nim_service = nim_service
+        self.store = store or ConversionJobStore()
+        self.cache = cache or ConversionResultCache(self.store.db_path)
+        self.initial_interval = float(os.getenv("NIM_POLL_INITIAL_INTERVAL", "1"))
+        self.max_interval = float(os.getenv("NIM_POLL_MAX_INTERVAL", "30"))
+        self.backoff_factor = float(os.getenv("NIM_POLL_BACKOFF", "1.5"))
+        self.job_timeout = float(os.getenv("NIM_JOB_TIMEOUT", "3600"))
+        self.tick = float(os.getenv("NIM_POLL_TICK", "0.5"))
+        self.max_concurrent_polls = int(os.getenv("NIM_MAX_CONCURRENT_POLLS", "32"))
+        self.batch_retries = int(os.getenv("NIM_BATCH_RETRIES", "3"))
+        self.retry_base_delay = float(os.getenv("NIM_RETRY_BASE_DELAY", "0.5"))
+        self.webhook_timeout = float(os.getenv("NIM_WEBHOOK_TIMEOUT", "10"))
+        self._poller: Optional[asyncio.Task] = None
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._webhook_session: Optional[aiohttp.ClientSession] = None
+        self._webhooks: Set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        """Arranca el bucle de sondeo y recupera los trabajos persistidos"""
+        interrupted = await asyncio.to_thread(self.store.fail_interrupted_uploads, self.nim_service.timeout)
+        if interrupted:
+            logger.warning(f"{interrupted} trabajos de conversión interrumpidos durante la subida")
+        if self._poller is None:
+            self._poller = asyncio.create_task(self._poll_loop())
+
+    async def stop(self) -> None:
+        if self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+            self._poller = None
+        if self._webhooks:
+            # Los webhooks pendientes tienen su propio límite de tiempo
+            await asyncio.gather(*self._webhooks, return_exceptions=True)
+        if self._webhook_session is not None:
+            await self._webhook_session.close()
+            self._webhook_session = None
+
+    async def submit(
+        self,
+        pdf_content: Union[PdfContent, Callable[[], PdfContent]],
+        voice_id: str = "default",
+        speaking_rate: float = 1.0,
+        pitch: float = 1.0,
+        user_id: Optional[str] = None,
+        webhook_url: Optional[str] = None,
+        cache_key: Optional[str] = None,
+        pdf_bytes: Optional[int] = None,
+        retries: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Registra un trabajo de conversión, sube el PDF e inicia la conversión
+
+        pdf_content puede ser un iterador asíncrono de bloques, de modo que el
+        PDF se reenvía a NIM a medida que se lee sin copiarlo entero.
+
+        Con cache_key (ver conversion_cache_key) un resultado en caché se
+        devuelve como trabajo ya completado sin contactar con NIM, y una
+        subida idéntica a otra en curso crea un trabajo propio que sigue a
+        esa conversión sin volver a subir el PDF.
+
+        Con retries > 0 los fallos transitorios de la subida se reintentan
+        con backoff exponencial y jitter; pdf_content debe ser entonces una
+        función que devuelva un flujo nuevo en cada intento.
+
+        Returns:
+            Dict con el trabajo (processing, o completed si hubo acierto)
+
+        Raises:
+            Exception: si la subida falla; el trabajo queda marcado como failed
+        """
+        params = {"voice_id": voice_id, "speaking_rate": speaking_rate, "pitch": pitch}
+        if webhook_url:
+            validate_webhook_url(webhook_url)
+
+        if cache_key is None:
+            job = await asyncio.to_thread(self.store.create, user_id, params, webhook_url, self.initial_interval)
+        else:
+            cached = await asyncio.to_thread(self.cache.get, cache_key, pdf_bytes or 0)
+            if cached is not None:
+                job = await asyncio.to_thread(
+                    self.store.create, user_id, params, webhook_url, self.initial_interval,
+                    cache_key=cache_key, pdf_bytes=pdf_bytes,
+                    status="completed", result=cached
+                )
+                if webhook_url:
+                    self._schedule_webhook(job)
+                return job
+
+            job, created = await asyncio.to_thread(
+                self.store.create_or_join,
+                user_id, params, webhook_url, self.initial_interval, cache_key, pdf_bytes or 0
+            )
+            if not created:
+                await asyncio.to_thread(self.cache.record_coalesced, pdf_bytes or 0)
+                return job
+
+        await self._upload(job["id"], pdf_content, params, retries)
+        return await asyncio.to_thread(self.store.get, job["id"])
+
+    async def submit_batch(
+        self,
+        items: List[BatchItem],
+        voice_id: str = "default",
+        speaking_rate: float = 1.0,
+        pitch: float = 1.0,
+        user_id: Optional[str] = None,
+        webhook_url: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Envía un lote de PDFs a NIM con concurrencia acotada
+
+        Como mucho NIM_BATCH_SIZE subidas van en paralelo, cada una con
+        NIM_BATCH_RETRIES reintentos. El fallo de un elemento no afecta al
+        resto: el resultado enumera el trabajo o el error de cada PDF.
+
+        Returns:
+            Dict con items, succeeded y failed
+
+        Raises:
+            ValueError: si webhook_url no es válida
+        """
+        if webhook_url:
+            validate_webhook_url(webhook_url)
+        semaphore = asyncio.Semaphore(max(1, self.nim_service.batch_size))
+
+        async def submit_item(item: BatchItem) -> Dict[str, Any]:
+            if item.error:
+                return {"filename": item.filename, "status": "error", "error": item.error}
+            async with semaphore:
+                try:
+                    job = await self.submit(
+                        item.open_content,
+                        voice_id=voice_id,
+                        speaking_rate=speaking_rate,
+                        pitch=pitch,
+                        user_id=user_id,
+                        webhook_url=webhook_url,
+                        cache_key=item.cache_key,
+                        pdf_bytes=item.pdf_bytes,
+                        retries=self.batch_retries
+                    )
+                    return {"filename": item.filename, "status": "accepted", "job": public_job(job)}
+                except Exception as e:
+                    detail = e.detail if isinstance(e, HTTPException) else str(e)
+                    return {"filename": item.filename, "status": "error", "error": detail}
+
+        results = await asyncio.gather(*(submit_item(item) for item in items))
+        succeeded = sum(1 for result in results if result["status"] == "accepted")
+        return {
+            "items": results,
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded
+        }
+
+    async def cache_stats(self) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.cache.stats)
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def get_history(
+        self,
+        user_id: Optional[str],
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        status: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 50
+    ) -> Dict[str, Any]:
+        """
+        Historial paginado de conversiones desde el almacén local
+
+        Returns:
+            Dict con items, page, page_size y total
+        """
+        jobs, total = await asyncio.to_thread(
+            self.store.list_jobs,
+            user_id=user_id,
+            since=since,
+            until=until,
+            status=status,
+            limit=page_size,
+            offset=(page - 1) * page_size
+        )
+        return {
+            "items": [public_job(job) for job in jobs],
+            "page": page,
+            "page_size": page_size,
+            "total": total
+        }
+
+    async def wait_for_change(self, job_id: str, timeout: float) -> None:
+        """
+        Espera a que este worker actualice el trabajo o venza timeout
+
+        El timeout cubre los cambios hechos por otros workers, que solo se
+        observan releyendo el almacén.
+        """
+        event = self._changed.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            event.clear()
+
+    async def _upload(self, job_id: str, pdf_content: Union[PdfContent, Callable[[], PdfContent]],
+                      params: Dict[str, Any], retries: int = 0) -> None:
+        attempt = 0
+        while True:
+            content = pdf_content() if callable(pdf_content) else pdf_content
+            try:
+                conversion_id = await self.nim_service.start_conversion(content, **params)
+                break
+            except Exception as e:
+                if attempt < retries and self._is_retryable(e):
+                    # Backoff exponencial con jitter completo
+                    delay = random.uniform(0, self.retry_base_delay * 2 ** attempt)
+                    attempt += 1
+                    logger.warning(
+                        f"Reintento {attempt}/{retries} de la subida {job_id} en {delay:.2f} s: {str(e)}"
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                logger.error(f"Error al iniciar la conversión {job_id}: {str(e)}")
+                await self._finish(job_id, "failed", error=str(e))
+                raise
+        await asyncio.to_thread(
+            self.store.update,
+            job_id,
+            status="processing",
+            conversion_id=conversion_id,
+            next_poll_at=time.time() + self.initial_interval
+        )
+        self._notify(job_id)
+        followers = await asyncio.to_thread(
+            self.store.update_followers, job_id, status="processing", conversion_id=conversion_id
+        )
+        for follower_id in followers:
+            self._notify(follower_id)
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Los errores de cliente (4xx salvo 429) y el tamaño excedido no se reintentan"""
+        if isinstance(error, UploadTooLarge):
+            return False
+        if isinstance(error, HTTPException):
+            return error.status_code >= 500 or error.status_code == 429
+        return True
+
+    async def _poll_loop(self) -> None:
+        while True:
+            try:
+                jobs = await asyncio.to_thread(self.store.claim_due, self.max_concurrent_polls)
+                if jobs:
+                    await asyncio.gather(*(self._poll(job) for job in jobs))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error en el bucle de sondeo de conversiones: {str(e)}")
+            await asyncio.sleep(self.tick)
+
+    async def _poll(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        if time.time() - job["created_at"] > self.job_timeout:
+            await self._finish(job_id, "failed", error="Tiempo de espera agotado")
+            return
+
+        try:
+            status_result = await self.nim_service.get_conversion_status(job["conversion_id"])
+        except Exception as e:
+            errors = job["poll_errors"] + 1
+            if errors >= self.nim_service.max_retries:
+                await self._finish(job_id, "failed", error=f"Error al verificar el estado: {str(e)}")
+            else:
+                await asyncio.to_thread(self.store.update, job_id, poll_errors=errors)
+            return
+
+        if status_result["status"] == "completed":
+            await self._finish(job_id, "completed", result=self.nim_service.conversion_result(status_result))
+        elif status_result["status"] == "failed":
+            await self._finish(job_id, "failed", error="La conversión falló")
+        else:
+            # Backoff adaptativo con jitter para no sincronizar los sondeos
+            interval = min(job["poll_interval"] * self.backoff_factor, self.max_interval)
+            await asyncio.to_thread(
+                self.store.update,
+                job_id,
+                poll_interval=interval,
+                next_poll_at=time.time() + interval * random.uniform(0.8, 1.2),
+                poll_errors=0
+            )
+
+    async def _finish(self, job_id: str, status: str, result: Optional[Dict] = None,
+                      error: Optional[str] = None) -> None:
+        await asyncio.to_thread(self.store.update, job_id, status=status, result=result, error=error)
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job and status == "completed" and job["cache_key"]:
+            await asyncio.to_thread(self.cache.put, job["cache_key"], result, job["pdf_bytes"] or 0)
+        # Los trabajos unidos a esta conversión terminan con ella
+        followers = await asyncio.to_thread(
+            self.store.update_followers, job_id, status=status, result=result, error=error
+        )
+        for finished_id in [job_id, *followers]:
+            event = self._changed.pop(finished_id, None)
+            if event is not None:
+                event.set()
+            finished = job if finished_id == job_id else await asyncio.to_thread(self.store.get, finished_id)
+            if finished and finished["webhook_url"]:
+                self._schedule_webhook(finished)
+
+    def _notify(self, job_id: str) -> None:
+        event = self._changed.get(job_id)
+        if event is not None:
+            event.set()
+
+    def _schedule_webhook(self, job: Dict[str, Any]) -> None:
+        task = asyncio.create_task(self._send_webhook(job))
+        self._webhooks.add(task)
+        task.add_done_callback(self._webhooks.discard)
+
+    async def _send_webhook(self, job: Dict[str, Any]) -> None:
+        if self._webhook_session is None or self._webhook_session.closed:
+            connector = None if _allow_private_webhooks() else aiohttp.TCPConnector(resolver=_PublicResolver())
+            self._webhook_session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.webhook_timeout)
+            )
+        try:
+            validate_webhook_url(job["webhook_url"])
+            # Sin redirecciones: llevarían el POST a una URL sin validar
+            async with self._webhook_session.post(
+                job["webhook_url"], json=public_job(job), allow_redirects=False
+            ) as response:
+                if response.status >= 400:
+                    logger.warning(f"Webhook de {job['id']} respondió {response.status}")
+        except Exception as e:
+            logger.warning(f"Error al enviar webhook de {job['id']}: {str(e)}")
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos de un trabajo que se exponen a los clientes"""
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "params": job["params"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
@@ -1,13 +1,86 @@
 import os
-from typing import Dict, Any
-import DaVinciResolveScript as dvr
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional
+
+try:
+    import DaVinciResolveScript as dvr
+except ImportError:
+    dvr = None
+
+from .metrics import observe, track
+from .render_jobs import RenderJobManager, ResolveBusy, public_render_job
 
 class DaVinciService:
     def __init__(self):
-        self.resolve = dvr.scriptapp("Resolve")
-        self.project_manager = self.resolve.GetProjectManager()
         self.api_key = os.getenv("DAVINCI_API_KEY")
-        
+        self.output_path = os.getenv("RENDER_OUTPUT_PATH", "./output")
+        # La API de scripting de Resolve no es segura entre hilos: un único
+        # hilo crea el handle y ejecuta todas las llamadas
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="resolve")
+        self._resolve = None
+        self._project_manager = None
+        self._rendering = None
+        self.renders = RenderJobManager(self)
+
+    async def start(self):
+        """Arranca la cola de renderizado"""
+        await self.renders.start()
+
+    async def close(self):
+        await self.renders.stop()
+        self._executor.shutdown(wait=False)
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """
+        Ejecuta fn en el hilo que posee el handle de Resolve
+
+        Mide por separado la espera a que el hilo quede libre (fase "queue")
+        y la llamada, etiquetada con el nombre de fn.
+        """
+        phase = fn.__name__.strip("_")
+        submitted = time.perf_counter()
+
+        def call():
+            observe("davinci", "queue", time.perf_counter() - submitted)
+            with track("davinci", phase):
+                return fn(*args)
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    @property
+    def project_manager(self):
+        # Solo debe usarse desde el hilo de Resolve (ver run)
+        if self._project_manager is None:
+            if dvr is None:
+                raise Exception("Módulo DaVinciResolveScript no disponible")
+            self._resolve = dvr.scriptapp("Resolve")
+            if self._resolve is None:
+                raise Exception("No se pudo conectar con DaVinci Resolve")
+            self._project_manager = self._resolve.GetProjectManager()
+        return self._project_manager
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Comprueba la conexión con Resolve y el estado de la cola de renderizado"""
+        await self.run(self._connect)
+        return {"ok": True, "rendering": self._rendering is not None, "render_queue": self.renders.stats()}
+
+    def _connect(self) -> None:
+        self.project_manager
+
+    def _load_project(self, project_id: str):
+        # Cargar otro proyecto interrumpiría el renderizado en curso
+        if self._rendering is not None:
+            project, _ = self._rendering
+            if project.GetName() == project_id:
+                return project
+            raise Exception("DaVinci Resolve está renderizando otro proyecto, reintente más tarde")
+        project = self.project_manager.LoadProject(project_id)
+        if not project:
+            raise Exception(f"No se pudo cargar el proyecto {project_id}")
+        return project
+
     async def edit_video(self, project_id: str) -> Dict[str, Any]:
         """
         Edita un video usando DaVinci Resolve
@@ -19,70 +92,110 @@ class DaVinciService:
             Dict con el resultado de la edición
         """
         try:
-            # Abrir proyecto
-            project = self.project_manager.LoadProject(project_id)
-            if not project:
-                raise Exception(f"No se pudo cargar el proyecto {project_id}")
-                
-            # Obtener timeline
-            timeline = project.GetCurrentTimeline()
-            if not timeline:
-                raise Exception("No se pudo obtener el timeline actual")
-                
-            # Ejemplo de automatización de edición
-            # Aquí irían las operaciones específicas de edición
-            result = {
-                "project_id": project_id,
-                "status": "success",
-                "timeline_name": timeline.GetName(),
-                "duration": timeline.GetDuration(),
-                "frame_rate": timeline.GetSetting("frameRate")
-            }
-            
-            return result
-            
+            return await self.run(self._edit_video, project_id)
         except Exception as e:
             raise Exception(f"Error al editar video: {str(e)}")
+
+    def _edit_video(self, project_id: str) -> Dict[str, Any]:
+        # Abrir proyecto
+        project = self._load_project(project_id)
+            
+        # Obtener timeline
+        timeline = project.GetCurrentTimeline()
+        if not timeline:
+            raise Exception("No se pudo obtener el timeline actual")
             
-    async def render_video(self, project_id: str, render_preset: str) -> Dict[str, Any]:
+        # Ejemplo de automatización de edición
+        # Aquí irían las operaciones específicas de edición
+        return {
+            "project_id": project_id,
+            "status": "success",
+            "timeline_name": timeline.GetName(),
+            "duration": timeline.GetDuration(),
+            "frame_rate": timeline.GetSetting("frameRate")
+        }
+            
+    async def render_video(self, project_id: str, render_preset: str, priority: int = 0) -> Dict[str, Any]:
         """
-        Renderiza un video usando un preset específico
+        Encola el renderizado de un proyecto con un preset específico
+        
+        El trabajo se procesa en segundo plano, de uno en uno y por orden de
+        prioridad (mayor primero); su progreso se consulta con
+        get_render_job o se sigue con renders.wait_for_change.
         
         Args:
             project_id: ID del proyecto a renderizar
             render_preset: Nombre del preset de renderizado
+            priority: Prioridad del trabajo en la cola
             
         Returns:
-            Dict con el resultado del renderizado
+            Dict con el trabajo encolado
         """
         try:
-            project = self.project_manager.LoadProject(project_id)
-            if not project:
-                raise Exception(f"No se pudo cargar el proyecto {project_id}")
-                
-            # Configurar renderizado
-            project.SetRenderSettings({
-                "SelectAllFrames": True,
-                "TargetDir": os.getenv("RENDER_OUTPUT_PATH", "./output"),
-                "CustomName": f"{project_id}_render",
-                "RenderPreset": render_preset
-            })
-            
-            # Iniciar renderizado
-            project.StartRendering()
-            
-            # Esperar a que termine el renderizado
-            while project.IsRenderingInProgress():
-                await asyncio.sleep(1)
-                
-            return {
-                "project_id": project_id,
-                "status": "success",
-                "output_path": os.path.join(os.getenv("RENDER_OUTPUT_PATH", "./output"), f"{project_id}_render.mp4")
-            }
-            
+            job = await asyncio.to_thread(self.renders.submit, project_id, render_preset, priority)
+            return public_render_job(job)
         except Exception as e:
-            raise Exception(f"Error al renderizar video: {str(e)}")
+            raise Exception(f"Error al encolar el renderizado: {str(e)}")
+
+    def get_render_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.renders.get_job(job_id)
+        return public_render_job(job) if job else None
+
+    def start_render(self, project_id: str, render_preset: str) -> str:
+        """Carga el proyecto y lanza el renderizado (hilo de Resolve); devuelve el id de Resolve"""
+        # Un render lanzado por un proceso anterior sigue en curso tras un reinicio
+        current = self.project_manager.GetCurrentProject()
+        if self._rendering is None and current and current.IsRenderingInProgress():
+            raise ResolveBusy(f"DaVinci Resolve está renderizando {current.GetName()}")
+        project = self._load_project(project_id)
+        if not project.LoadRenderPreset(render_preset):
+            raise Exception(f"No se pudo cargar el preset {render_preset}")
+            
+        # Configurar renderizado
+        project.SetRenderSettings({
+            "SelectAllFrames": True,
+            "TargetDir": self.output_path,
+            "CustomName": f"{project_id}_render"
+        })
+        
+        render_id = project.AddRenderJob()
+        if not render_id:
+            raise Exception("No se pudo añadir el trabajo de renderizado")
+        if not project.StartRendering(render_id):
+            raise Exception("No se pudo iniciar el renderizado")
+        self._rendering = (project, render_id)
+        return render_id
+
+    def get_render_status(self, render_id: str) -> Dict[str, Any]:
+        """Estado y porcentaje del renderizado en curso (hilo de Resolve)"""
+        project, _ = self._rendering
+        status = project.GetRenderJobStatus(render_id) or {}
+        job_status = status.get("JobStatus", "")
+        if job_status == "Complete":
+            self._finish_render(project, render_id)
+            return {"status": "completed", "progress": 100}
+        if job_status in ("Failed", "Cancelled"):
+            self._finish_render(project, render_id)
+            return {"status": "failed", "progress": status.get("CompletionPercentage", 0),
+                    "error": status.get("Error")}
+        return {"status": "rendering", "progress": status.get("CompletionPercentage", 0)}
+
+    def stop_render(self) -> None:
+        if self._rendering is not None:
+            project, render_id = self._rendering
+            project.StopRendering()
+            self._finish_render(project, render_id)
+
+    def _finish_render(self, project, render_id: str) -> None:
+        project.DeleteRenderJob(render_id)
+        self._rendering = None
+
+    def render_result(self, project_id: str) -> Dict[str, Any]:
+        return {
+            "project_id": project_id,
+            "status": "success",
+            "output_path": os.path.join(self.output_path, f"{project_id}_render.mp4")
+        }
             
     async def get_project_info(self, project_id: str) -> Dict[str, Any]:
         """
@@ -95,23 +208,22 @@ class DaVinciService:
             Dict con la información del proyecto
         """
         try:
-            project = self.project_manager.LoadProject(project_id)
-            if not project:
-                raise Exception(f"No se pudo cargar el proyecto {project_id}")
-                
-            timeline = project.GetCurrentTimeline()
-            
-            return {
-                "project_id": project_id,
-                "name": project.GetName(),
-                "timeline_count": project.GetTimelineCount(),
-                "current_timeline": timeline.GetName() if timeline else None,
-                "frame_rate": project.GetSetting("timelineFrameRate"),
-                "resolution": {
-                    "width": project.GetSetting("timelineResolutionWidth"),
-                    "height": project.GetSetting("timelineResolutionHeight")
-                }
-            }
-            
+            return await self.run(self._get_project_info, project_id)
         except Exception as e:
-            raise Exception(f"Error al obtener información del proyecto: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"Error al obtener información del proyecto: {str(e)}")
+
+    def _get_project_info(self, project_id: str) -> Dict[str, Any]:
+        project = self._load_project(project_id)
+        timeline = project.GetCurrentTimeline()
+        
+        return {
+            "project_id": project_id,
+            "name": project.GetName(),
+            "timeline_count": project.GetTimelineCount(),
+            "current_timeline": timeline.GetName() if timeline else None,
+            "frame_rate": project.GetSetting("timelineFrameRate"),
+            "resolution": {
+                "width": project.GetSetting("timelineResolutionWidth"),
+                "height": project.GetSetting("timelineResolutionHeight")
+            }
+        }
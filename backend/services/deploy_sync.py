@@ -0,0 +1,256 @@
+import os
+import json
+import stat
+import time
+import uuid
+import shlex
+import hashlib
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import paramiko
+
+from .ssh_pool import SSHConnectionManager
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".deploy-manifest.json"
+
+def _hash_file(path: str, chunk_bytes: int = 1024 ** 2) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+def build_manifest(local_path: str, workers: int = 4) -> Dict[str, Dict[str, Any]]:
+    """
+    Calcula el manifiesto de un directorio local
+
+    Returns:
+        Dict {ruta relativa posix: {"sha256", "size"}}
+    """
+    files = {}
+    for root, dirs, names in os.walk(local_path):
+        dirs.sort()
+        for name in sorted(names):
+            if name == MANIFEST_NAME:
+                continue
+            full = os.path.join(root, name)
+            relative = os.path.relpath(full, local_path).replace(os.sep, "/")
+            files[relative] = full
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = dict(zip(files, pool.map(_hash_file, files.values())))
+    return {
+        relative: {"sha256": digests[relative], "size": os.path.getsize(full)}
+        for relative, full in files.items()
+    }
+
+def _parent_dirs(paths) -> set:
+    dirs = set()
+    for path in paths:
+        parent = posixpath.dirname(path)
+        while parent and parent not in dirs:
+            dirs.add(parent)
+            parent = posixpath.dirname(parent)
+    return dirs
+
+class DeploySync:
+    """
+    Sincronización incremental de un directorio local con el servidor.
+
+    Cada despliegue es una release nueva en <remote_path>.releases/<id>:
+    se clona la release actual con enlaces duros (cp -al), se suben en
+    paralelo solo los archivos cuyo hash cambió según el manifiesto de la
+    release anterior, se borran los que ya no existen y, al terminar, el
+    enlace simbólico <remote_path> pasa a apuntar a la release nueva con un
+    rename atómico. Si algo falla, la release a medias se elimina y el sitio
+    publicado no cambia. Se conservan DEPLOY_KEEP_RELEASES releases.
+
+    El primer despliegue sobre un directorio normal (sin manifiesto) también
+    lo clona, así que lo que el despliegue no gestiona (venv, .env, logs/)
+    sigue en la ruta publicada; el directorio original queda apartado como
+    release -legacy. Ese primer cambio de directorio a enlace solo es
+    atómico si el mv del servidor admite --exchange (coreutils 9.5+); si no,
+    son dos renames seguidos en un mismo comando y remote_path no existe
+    durante el instante entre ambos.
+    """
+
+    def __init__(
+        self,
+        ssh: SSHConnectionManager,
+        channels: Optional[int] = None,
+        keep_releases: Optional[int] = None
+    ):
+        self.ssh = ssh
+        self.channels = channels or int(os.getenv("DEPLOY_SFTP_CHANNELS", "4"))
+        self.keep_releases = keep_releases or int(os.getenv("DEPLOY_KEEP_RELEASES", "3"))
+
+    def sync(self, local_path: str, remote_path: str) -> Dict[str, Any]:
+        """
+        Publica local_path en remote_path
+
+        Returns:
+            Dict con la release publicada y el resumen de cambios
+        """
+        start = time.perf_counter()
+        remote_path = remote_path.rstrip("/")
+        releases_dir = f"{remote_path}.releases"
+        release = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        staging = f"{releases_dir}/{release}"
+
+        local_manifest = build_manifest(local_path, self.channels)
+        with self.ssh.sftp() as sftp:
+            current = self._current_release(sftp, remote_path)
+            remote_manifest = self._read_manifest(sftp, current) if current else None
+
+        self._exec(f"mkdir -p {shlex.quote(releases_dir)}")
+        if current is not None:
+            # Clonar con enlaces duros: los archivos sin cambios no se suben ni ocupan espacio
+            self._exec(f"cp -al {shlex.quote(current)} {shlex.quote(staging)}")
+        else:
+            self._exec(f"mkdir {shlex.quote(staging)}")
+
+        try:
+            summary = self._apply(local_path, staging, local_manifest, remote_manifest or {},
+                                  cloned=current is not None)
+            with self.ssh.sftp() as sftp:
+                self._write_manifest(sftp, staging, local_manifest)
+                self._swap(sftp, remote_path, releases_dir, staging)
+        except BaseException:
+            self._exec(f"rm -rf {shlex.quote(staging)}", check=False)
+            raise
+        self._prune(releases_dir, release)
+
+        return {
+            "release": release,
+            "remote_path": remote_path,
+            **summary,
+            "elapsed_s": round(time.perf_counter() - start, 3)
+        }
+
+    def _current_release(self, sftp: paramiko.SFTPClient, remote_path: str) -> Optional[str]:
+        """Release publicada, o el directorio heredado si aún no hay enlace"""
+        try:
+            attrs = sftp.lstat(remote_path)
+        except FileNotFoundError:
+            return None
+        if stat.S_ISLNK(attrs.st_mode):
+            target = sftp.readlink(remote_path)
+            return target if target.startswith("/") else posixpath.join(posixpath.dirname(remote_path), target)
+        return remote_path
+
+    def _read_manifest(self, sftp: paramiko.SFTPClient, release_dir: str) -> Optional[Dict[str, Any]]:
+        try:
+            with sftp.open(f"{release_dir}/{MANIFEST_NAME}") as f:
+                return json.loads(f.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_manifest(self, sftp: paramiko.SFTPClient, release_dir: str, manifest: Dict[str, Any]) -> None:
+        # El manifiesto clonado es un enlace duro al de la release publicada
+        tmp_file = f"{release_dir}/{MANIFEST_NAME}.deploy-tmp"
+        with sftp.open(tmp_file, "w") as f:
+            f.write(json.dumps(manifest, sort_keys=True))
+        sftp.posix_rename(tmp_file, f"{release_dir}/{MANIFEST_NAME}")
+
+    def _apply(self, local_path: str, staging: str, local_manifest: Dict[str, Any],
+               remote_manifest: Dict[str, Any], cloned: bool) -> Dict[str, Any]:
+        changed = [
+            path for path, entry in local_manifest.items()
+            if remote_manifest.get(path, {}).get("sha256") != entry["sha256"]
+        ]
+        removed = [path for path in remote_manifest if path not in local_manifest]
+
+        # Crear solo los directorios nuevos, de menos a más profundos
+        known_dirs = _parent_dirs(remote_manifest)
+        with self.ssh.sftp() as sftp:
+            for directory in sorted(_parent_dirs(changed) - known_dirs, key=lambda d: d.count("/")):
+                try:
+                    sftp.mkdir(f"{staging}/{directory}")
+                except IOError:
+                    # Clonado de un directorio sin manifiesto: puede existir ya
+                    if not cloned or not stat.S_ISDIR(sftp.stat(f"{staging}/{directory}").st_mode):
+                        raise
+
+        def upload(path: str) -> int:
+            local_file = os.path.join(local_path, *path.split("/"))
+            remote_file = f"{staging}/{path}"
+            with self.ssh.sftp() as client:
+                if cloned:
+                    # Puede ser un enlace duro a la release publicada: no escribir encima
+                    tmp_file = f"{remote_file}.deploy-tmp"
+                    client.put(local_file, tmp_file)
+                    client.posix_rename(tmp_file, remote_file)
+                else:
+                    client.put(local_file, remote_file)
+            return local_manifest[path]["size"]
+
+        with ThreadPoolExecutor(max_workers=self.channels) as pool:
+            bytes_uploaded = sum(pool.map(upload, changed))
+
+        with self.ssh.sftp() as sftp:
+            for path in removed:
+                try:
+                    sftp.remove(f"{staging}/{path}")
+                except FileNotFoundError:
+                    # Borrado a mano del servidor después del despliegue anterior
+                    pass
+            for directory in sorted(known_dirs - _parent_dirs(local_manifest), key=lambda d: -d.count("/")):
+                try:
+                    sftp.rmdir(f"{staging}/{directory}")
+                except IOError:
+                    # Contiene archivos ajenos al manifiesto (p. ej. un venv): se conserva
+                    pass
+
+        return {
+            "uploaded": len(changed),
+            "deleted": len(removed),
+            "unchanged": len(local_manifest) - len(changed),
+            "bytes_uploaded": bytes_uploaded
+        }
+
+    def _swap(self, sftp: paramiko.SFTPClient, remote_path: str, releases_dir: str, staging: str) -> None:
+        """Apunta remote_path a la release nueva con un rename atómico del enlace (ver DeploySync)"""
+        tmp_link = f"{remote_path}.deploy-link"
+        try:
+            sftp.remove(tmp_link)
+        except FileNotFoundError:
+            pass
+        sftp.symlink(staging, tmp_link)
+        try:
+            attrs = sftp.lstat(remote_path)
+        except FileNotFoundError:
+            attrs = None
+        if attrs is not None and not stat.S_ISLNK(attrs.st_mode):
+            # Primer despliegue sobre un directorio normal: apartarlo como
+            # release antigua. Un enlace no puede sustituir a un directorio
+            # con un rename; mv --exchange los intercambia de forma atómica
+            # y, si el servidor no lo admite, los dos renames van en el mismo
+            # comando para que el hueco sea mínimo
+            link, target = shlex.quote(tmp_link), shlex.quote(remote_path)
+            legacy = shlex.quote(f"{releases_dir}/{time.strftime('%Y%m%d-%H%M%S')}-legacy")
+            self._exec(
+                f"if mv --exchange -T {link} {target} 2>/dev/null; then mv -T {link} {legacy}; "
+                f"else mv -T {target} {legacy} && mv -T {link} {target}; fi"
+            )
+            return
+        sftp.posix_rename(tmp_link, remote_path)
+
+    def _prune(self, releases_dir: str, release: str) -> None:
+        with self.ssh.sftp() as sftp:
+            releases = sorted(name for name in sftp.listdir(releases_dir) if name != release)
+        for name in releases[:max(0, len(releases) - (self.keep_releases - 1))]:
+            self._exec(f"rm -rf {shlex.quote(f'{releases_dir}/{name}')}", check=False)
+
+    def _exec(self, command: str, check: bool = True) -> str:
+        status, stdout, stderr = self.ssh.exec(command)
+        if status != 0 and check:
+            raise Exception(f"Error ejecutando comando: {command}: {stderr.strip()}")
+        return stdout
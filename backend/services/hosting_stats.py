@@ -0,0 +1,348 @@
+import os
+import json
+import time
+import fcntl
+import sqlite3
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from .access_log import LocalAccessLog, RemoteAccessLog
+from .metrics import track
+from .ssh_pool import SSHConnectionManager
+
+logger = logging.getLogger(__name__)
+
+ACCESS_MARKER = "@@access"
+
+def stats_command(access_command: str) -> str:
+    """
+    Todas las métricas en una sola ejecución remota, separadas por marcadores
+
+    La sección del log de accesos (RemoteAccessLog.command) va la última:
+    son bytes del log tal cual, no líneas con marcadores.
+    """
+    return "; ".join([
+        "echo @@disk", "df -P -B1 / 2>/dev/null",
+        "echo @@memory", "free -b 2>/dev/null",
+        "echo @@load", "cat /proc/loadavg 2>/dev/null",
+        "echo @@uptime", "cat /proc/uptime 2>/dev/null",
+        f"echo {ACCESS_MARKER}", access_command,
+        "true"
+    ])
+
+def split_access(output: str) -> Tuple[str, bytes]:
+    """Separa la salida de stats_command en métricas del sistema y bytes del log de accesos"""
+    head, marker, payload = output.partition(f"{ACCESS_MARKER}\n")
+    if not marker:
+        return output, b""
+    return head, payload.encode(errors="surrogateescape")
+
+def _split_sections(output: str) -> Dict[str, List[str]]:
+    sections: Dict[str, List[str]] = {}
+    current = None
+    for line in output.splitlines():
+        if line.startswith("@@"):
+            current = sections.setdefault(line[2:].strip(), [])
+        elif current is not None and line.strip():
+            current.append(line)
+    return sections
+
+def _percent(used: int, total: int) -> float:
+    return round(100 * used / total, 1) if total else 0.0
+
+def parse_stats(output: str) -> Dict[str, Any]:
+    """
+    Convierte la salida de stats_command en campos numéricos
+
+    Las secciones que faltan o no se pueden leer quedan a None.
+    """
+    sections = _split_sections(output)
+    stats: Dict[str, Any] = {"disk": None, "memory": None, "load": None, "uptime_s": None}
+
+    disk = sections.get("disk", [])
+    if len(disk) >= 2:
+        fields = disk[-1].split()
+        total, used, available = int(fields[1]), int(fields[2]), int(fields[3])
+        stats["disk"] = {
+            "total_bytes": total,
+            "used_bytes": used,
+            "available_bytes": available,
+            "used_percent": _percent(used, total)
+        }
+
+    memory = {line.split(":")[0]: line.split()[1:] for line in sections.get("memory", []) if ":" in line}
+    if "Mem" in memory:
+        values = [int(v) for v in memory["Mem"]]
+        total, used = values[0], values[1]
+        # "available" es la última columna en procps moderno
+        available = values[5] if len(values) >= 6 else total - used
+        stats["memory"] = {
+            "total_bytes": total,
+            "used_bytes": used,
+            "available_bytes": available,
+            "used_percent": _percent(total - available, total),
+            "swap_total_bytes": int(memory["Swap"][0]) if "Swap" in memory else 0,
+            "swap_used_bytes": int(memory["Swap"][1]) if "Swap" in memory else 0
+        }
+
+    load = sections.get("load", [])
+    if load:
+        fields = load[0].split()
+        stats["load"] = {"1m": float(fields[0]), "5m": float(fields[1]), "15m": float(fields[2])}
+
+    uptime = sections.get("uptime", [])
+    if uptime:
+        stats["uptime_s"] = float(uptime[0].split()[0])
+
+    return stats
+
+class HostingStatsStore:
+    """
+    Muestras del recolector en SQLite, compartidas por todos los workers.
+
+    Solo el worker que recolecta escribe; el resto sirve /hosting/status y
+    su historial leyendo de aquí, así todos responden con la misma serie.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, history: Optional[int] = None):
+        self.db_path = db_path or os.getenv("HOSTING_STATS_DB", "data/hosting_stats.db")
+        self.history = history or int(os.getenv("HOSTING_STATS_HISTORY", "120"))
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS samples (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp REAL NOT NULL,
+                data TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT)")
+
+    def add(self, sample: Dict[str, Any]) -> None:
+        """Guarda una muestra y descarta las que exceden HOSTING_STATS_HISTORY"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO samples (timestamp, data) VALUES (?, ?)",
+                (sample["timestamp"], json.dumps(sample))
+            )
+            self._conn.execute("DELETE FROM samples WHERE id <= ?", (cursor.lastrowid - self.history,))
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM samples ORDER BY id DESC LIMIT 1").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Últimas muestras, de la más antigua a la más reciente"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM samples ORDER BY id DESC LIMIT ?", (limit or self.history,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def set_error(self, error: Optional[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state (key, value) VALUES ('last_error', ?)", (error,)
+            )
+
+    def last_error(self) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM state WHERE key = 'last_error'").fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, json.dumps(value))
+            )
+
+    def get_state(self, key: str) -> Any:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class HostingStatsCollector:
+    """
+    Recolector periódico de métricas del hosting.
+
+    Cada HOSTING_STATS_INTERVAL segundos ejecuta stats_command por la
+    conexión SSH compartida (una sola ida y vuelta, con un límite de
+    HOSTING_STATS_TIMEOUT segundos), guarda la muestra parseada en
+    HostingStatsStore y sirve /hosting/status desde la última, con su
+    antigüedad.
+
+    Solo recolecta un worker de gunicorn: el que tiene el bloqueo
+    <HOSTING_STATS_DB>.lock. Los demás leen las muestras del almacén y
+    vuelven a intentar el bloqueo en cada intervalo, de modo que si ese
+    worker termina otro toma el relevo.
+
+    Del log de accesos (HOSTING_ACCESS_LOG) solo viajan los bytes escritos
+    desde la muestra anterior, que alimentan los agregados móviles de
+    access_log. Si API_ACCESS_LOG apunta al accesslog local de gunicorn,
+    cada muestra incluye también sus agregados en "api_access". Ambos logs
+    los sigue solo el worker que recolecta: tras cada muestra guarda sus
+    cursores en el almacén y el worker que toma el relevo continúa desde
+    ahí, sin leer dos veces ni volver a rellenar lo ya contado (los
+    agregados móviles empiezan de cero en el nuevo worker).
+    """
+
+    def __init__(
+        self,
+        ssh: SSHConnectionManager,
+        interval: Optional[float] = None,
+        history: Optional[int] = None,
+        store: Optional[HostingStatsStore] = None
+    ):
+        self.ssh = ssh
+        self.interval = interval or float(os.getenv("HOSTING_STATS_INTERVAL", "30"))
+        self.timeout = float(os.getenv("HOSTING_STATS_TIMEOUT", "20"))
+        self.store = store or HostingStatsStore(history=history)
+        self.access_log = RemoteAccessLog(os.getenv("HOSTING_ACCESS_LOG", "/var/log/apache2/access.log"))
+        api_access_log = os.getenv("API_ACCESS_LOG")
+        self.api_access_log = LocalAccessLog(api_access_log) if api_access_log else None
+        self._leader_lock: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+
+    @property
+    def last_error(self) -> Optional[str]:
+        return self.store.last_error()
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader_lock is not None
+
+    def _try_lead(self) -> bool:
+        """Intenta ser el worker que recolecta, sin bloquear"""
+        if self._leader_lock is not None:
+            return True
+        fd = os.open(f"{self.store.db_path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._leader_lock = fd
+        cursors = self.store.get_state("access_cursors") or {}
+        if cursors.get("access"):
+            self.access_log.resume(cursors["access"])
+        if self.api_access_log is not None and cursors.get("api_access"):
+            self.api_access_log.resume(cursors["api_access"])
+        logger.info(f"Worker {os.getpid()} recolecta las métricas del hosting")
+        return True
+
+    def _save_cursors(self) -> None:
+        cursors = {"access": self.access_log.cursor()}
+        if self.api_access_log is not None:
+            cursors["api_access"] = self.api_access_log.cursor()
+        self.store.set_state("access_cursors", cursors)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.api_access_log is not None:
+            self.api_access_log.close()
+        if self._leader_lock is not None:
+            os.close(self._leader_lock)
+            self._leader_lock = None
+        self.store.close()
+
+    async def _run(self) -> None:
+        while True:
+            if self._try_lead():
+                try:
+                    await self.collect()
+                except Exception as e:
+                    logger.warning(f"Error recolectando métricas del hosting: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def collect(self) -> Dict[str, Any]:
+        """
+        Toma una muestra nueva; las llamadas concurrentes comparten la misma
+
+        En un worker que no recolecta devuelve la última muestra del almacén.
+        """
+        if not self._try_lead():
+            sample = self.store.latest()
+            if sample is None:
+                raise Exception("El recolector de métricas del hosting aún no ha tomado ninguna muestra")
+            return sample
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._collect())
+            self._inflight.add_done_callback(lambda _: setattr(self, "_inflight", None))
+        return await asyncio.shield(self._inflight)
+
+    async def _collect(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            with track("hostinger", "collect_stats"):
+                command = stats_command(self.access_log.command())
+                # Un canal SSH colgado no debe detener la recolección
+                status, stdout, stderr = await asyncio.to_thread(self.ssh.exec, command, self.timeout)
+                if status != 0:
+                    raise Exception(stderr.strip() or f"código de salida {status}")
+            system, access = split_access(stdout)
+            sample = {
+                "timestamp": time.time(),
+                "collect_ms": round((time.perf_counter() - started) * 1000, 1),
+                **parse_stats(system),
+                # Parsear varios MB de log no debe bloquear el event loop
+                "access": await asyncio.to_thread(self.access_log.consume, access)
+            }
+            if self.api_access_log is not None:
+                sample["api_access"] = await asyncio.to_thread(self.api_access_log.poll)
+        except Exception as e:
+            self.store.set_error(str(e) or type(e).__name__)
+            raise
+        self.store.set_error(None)
+        self.store.add(sample)
+        self._save_cursors()
+        return sample
+
+    async def latest(self) -> Dict[str, Any]:
+        """Última muestra con su antigüedad; si aún no hay ninguna, la toma"""
+        sample = self.store.latest()
+        if sample is None:
+            sample = await self.collect()
+        age = time.time() - sample["timestamp"]
+        return {
+            "status": "success",
+            **sample,
+            "sampled_at": datetime.fromtimestamp(sample["timestamp"], timezone.utc).isoformat(),
+            "age_s": round(age, 1),
+            "stale": age > 3 * self.interval,
+            "last_error": self.last_error
+        }
+
+    def history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Serie temporal compacta de las últimas muestras"""
+        return [
+            {
+                "timestamp": s["timestamp"],
+                "disk_used_percent": s["disk"]["used_percent"] if s["disk"] else None,
+                "memory_used_percent": s["memory"]["used_percent"] if s["memory"] else None,
+                "load_1m": s["load"]["1m"] if s["load"] else None,
+                "requests": s["access"]["requests"] if s["access"]["available"] else None,
+                "rps": s["access"]["rps"] if s["access"]["available"] else None
+            }
+            for s in self.store.recent(limit)
+        ]
@@ -1,8 +1,14 @@
 import os
-import paramiko
+import asyncio
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 
+from .deploy_sync import DeploySync
+from .hosting_stats import HostingStatsCollector
+from .metrics import track
+from .ssh_pool import get_ssh_manager
+from .webgl_assets import prepare_webgl_build
+
 class HostingerService:
     def __init__(self):
         load_dotenv()
@@ -13,35 +19,48 @@ class HostingerService:
         self.ssh_key_path = os.getenv('HOSTINGER_SSH_KEY_PATH')
         self.domain = 'radhikatmosphere.com'
         self.web_root = '/public_html'
+        # Conexión SSH compartida con HostingerConfig; se abre en el primer uso
+        self.ssh = get_ssh_manager(self.ssh_host, self.ssh_port, self.ssh_username, self.ssh_key_path)
+        self.stats_collector = HostingStatsCollector(self.ssh)
+
+    def start(self):
+        """Arranca la recolección periódica de métricas si hay servidor configurado"""
+        if self.ssh_host:
+            self.stats_collector.start()
+
+    async def _exec(self, command: str) -> str:
+        """Ejecuta un comando remoto fuera del event loop"""
+        status, stdout, stderr = await asyncio.to_thread(self.ssh.exec, command)
+        if status != 0:
+            raise Exception(f"Error ejecutando comando: {command}")
+        return stdout
 
     async def deploy_frontend(self, unity_build_path: str) -> Dict[str, Any]:
         """Despliega el frontend de Unity a Hostinger"""
         try:
-            ssh = paramiko.SSHClient()
-            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            ssh.connect(
-                self.ssh_host,
-                port=self.ssh_port,
-                username=self.ssh_username,
-                key_filename=self.ssh_key_path
-            )
-            
-            sftp = ssh.open_sftp()
             remote_path = f"{self.web_root}/unity"
             
-            # Crear directorio si no existe
-            try:
-                sftp.stat(remote_path)
-            except:
-                sftp.mkdir(remote_path)
+            # Precomprimir (br/gzip) y poner hash en los nombres antes de subir;
+            # el directorio de salida se conserva entre despliegues como caché
+            dist_path = os.getenv('WEBGL_DIST_DIR') or f"{unity_build_path.rstrip('/')}.dist"
+            with track("hostinger", "prepare_assets"):
+                manifest = await asyncio.to_thread(prepare_webgl_build, unity_build_path, dist_path)
             
-            # Subir archivos del build de Unity
-            self._upload_directory(sftp, unity_build_path, remote_path)
+            # Subir solo los archivos del build de Unity que cambiaron
+            with track("hostinger", "deploy_sync"):
+                sync = await asyncio.to_thread(DeploySync(self.ssh).sync, dist_path, remote_path)
             
             return {
                 "status": "success",
                 "message": "Frontend desplegado exitosamente",
-                "url": f"https://{self.domain}/unity"
+                "url": f"https://{self.domain}/unity",
+                "assets": {
+                    "files": len(manifest["files"]),
+                    "total_bytes": manifest["total_bytes"],
+                    "brotli_bytes": manifest["brotli_bytes"],
+                    "gzip_bytes": manifest["gzip_bytes"]
+                },
+                "sync": sync
             }
         except Exception as e:
             return {
@@ -52,26 +71,11 @@ class HostingerService:
     async def deploy_backend(self, backend_path: str) -> Dict[str, Any]:
         """Despliega el backend a Hostinger"""
         try:
-            ssh = paramiko.SSHClient()
-            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            ssh.connect(
-                self.ssh_host,
-                port=self.ssh_port,
-                username=self.ssh_username,
-                key_filename=self.ssh_key_path
-            )
-            
-            sftp = ssh.open_sftp()
             remote_path = f"{self.web_root}/api"
             
-            # Crear directorio si no existe
-            try:
-                sftp.stat(remote_path)
-            except:
-                sftp.mkdir(remote_path)
-            
-            # Subir archivos del backend
-            self._upload_directory(sftp, backend_path, remote_path)
+            # Subir solo los archivos del backend que cambiaron
+            with track("hostinger", "deploy_sync"):
+                sync = await asyncio.to_thread(DeploySync(self.ssh).sync, backend_path, remote_path)
             
             # Configurar el entorno virtual y dependencias
             commands = [
@@ -83,14 +87,13 @@ class HostingerService:
             ]
             
             for cmd in commands:
-                stdin, stdout, stderr = ssh.exec_command(cmd)
-                if stderr.channel.recv_exit_status() != 0:
-                    raise Exception(f"Error ejecutando comando: {cmd}")
+                await self._exec(cmd)
             
             return {
                 "status": "success",
                 "message": "Backend desplegado exitosamente",
-                "api_url": f"https://{self.domain}/api"
+                "api_url": f"https://{self.domain}/api",
+                "sync": sync
             }
         except Exception as e:
             return {
@@ -98,51 +101,11 @@ class HostingerService:
                 "message": f"Error en el despliegue: {str(e)}"
             }
 
-    def _upload_directory(self, sftp, local_path: str, remote_path: str):
-        """Sube un directorio completo al servidor"""
-        for item in os.listdir(local_path):
-            local_item = os.path.join(local_path, item)
-            remote_item = f"{remote_path}/{item}"
-            
-            if os.path.isfile(local_item):
-                sftp.put(local_item, remote_item)
-            elif os.path.isdir(local_item):
-                try:
-                    sftp.stat(remote_item)
-                except:
-                    sftp.mkdir(remote_item)
-                self._upload_directory(sftp, local_item, remote_item)
-
     async def get_hosting_stats(self) -> Dict[str, Any]:
-        """Obtiene estadísticas del hosting"""
+        """Obtiene estadísticas del hosting en este momento (disco, memoria, carga y accesos)"""
         try:
-            ssh = paramiko.SSHClient()
-            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            ssh.connect(
-                self.ssh_host,
-                port=self.ssh_port,
-                username=self.ssh_username,
-                key_filename=self.ssh_key_path
-            )
-            
-            # Obtener uso de disco
-            stdin, stdout, stderr = ssh.exec_command("df -h /")
-            disk_usage = stdout.read().decode()
-            
-            # Obtener uso de memoria
-            stdin, stdout, stderr = ssh.exec_command("free -m")
-            memory_usage = stdout.read().decode()
-            
-            # Obtener logs de acceso
-            stdin, stdout, stderr = ssh.exec_command("tail -n 100 /var/log/apache2/access.log")
-            access_logs = stdout.read().decode()
-            
-            return {
-                "status": "success",
-                "disk_usage": disk_usage,
-                "memory_usage": memory_usage,
-                "recent_access_logs": access_logs
-            }
+            sample = await self.stats_collector.collect()
+            return {"status": "success", **sample}
         except Exception as e:
             return {
                 "status": "error",
@@ -152,18 +115,9 @@ class HostingerService:
     async def configure_ssl(self) -> Dict[str, Any]:
         """Configura SSL para el dominio"""
         try:
-            ssh = paramiko.SSHClient()
-            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            ssh.connect(
-                self.ssh_host,
-                port=self.ssh_port,
-                username=self.ssh_username,
-                key_filename=self.ssh_key_path
-            )
-            
             # Verificar si ya existe certificado SSL
-            stdin, stdout, stderr = ssh.exec_command(f"certbot certificates | grep {self.domain}")
-            if stdout.channel.recv_exit_status() == 0:
+            status, _, _ = await asyncio.to_thread(self.ssh.exec, f"certbot certificates | grep {self.domain}")
+            if status == 0:
                 return {
                     "status": "success",
                     "message": "SSL ya está configurado"
@@ -175,9 +129,7 @@ class HostingerService:
             ]
             
             for cmd in commands:
-                stdin, stdout, stderr = ssh.exec_command(cmd)
-                if stderr.channel.recv_exit_status() != 0:
-                    raise Exception(f"Error ejecutando comando: {cmd}")
+                await self._exec(cmd)
             
             return {
                 "status": "success",
@@ -187,4 +139,40 @@ class HostingerService:
             return {
                 "status": "error",
                 "message": f"Error configurando SSL: {str(e)}"
-            } 
\ No newline at end of file
+            }
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Comprueba (y restablece si hace falta) la conexión SSH con el hosting"""
+        if not self.ssh_host:
+            return {"ok": False, "error": "HOSTINGER_SSH_HOST no configurado"}
+        ok = await asyncio.to_thread(self.ssh.health_check)
+        return {
+            "ok": ok,
+            "host": self.ssh_host,
+            "last_stats_error": self.stats_collector.last_error
+        }
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Última muestra de métricas del recolector, con su antigüedad"""
+        try:
+            return await self.stats_collector.latest()
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": f"Error obteniendo estadísticas: {str(e)}"
+            }
+
+    def get_status_history(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Serie temporal de las últimas muestras de métricas"""
+        return {
+            "interval_s": self.stats_collector.interval,
+            "samples": self.stats_collector.history(limit)
+        }
+
+    def get_connection_stats(self) -> Dict[str, Any]:
+        """Estado de la conexión SSH compartida"""
+        return self.ssh.stats()
+
+    async def close(self):
+        await self.stats_collector.stop()
+        self.ssh.close()
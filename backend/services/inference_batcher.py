@@ -0,0 +1,101 @@
+import os
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+class InferenceBatcher:
+    """
+    Planificador de micro-lotes para inferencia.
+
+    Agrupa las peticiones concurrentes que comparten clave (model_id) dentro
+    de una ventana de tiempo corta y las ejecuta en una sola llamada a
+    run_batch. Cada llamador recibe únicamente su propio resultado.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[str, List[Any]], Awaitable[List[Any]]],
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None
+    ):
+        if max_batch_size is None:
+            max_batch_size = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8"))
+        if max_wait_ms is None:
+            max_wait_ms = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._pending: Dict[str, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, key: str, item: Any) -> Any:
+        """
+        Encola un elemento y espera el resultado de su lote
+
+        Args:
+            key: Clave de agrupación (model_id)
+            item: Entrada individual del lote
+
+        Returns:
+            El resultado correspondiente a item
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(key, [])
+        pending.append((item, future))
+
+        if len(pending) >= self.max_batch_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+
+        return await future
+
+    def _flush(self, key: str) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        # Descartar llamadores que ya abandonaron la petición
+        batch = [(item, future) for item, future in self._pending.pop(key, []) if not future.done()]
+        if not batch:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._run(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: str, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.run_batch(key, [item for item, _ in batch])
+            if len(results) != len(batch):
+                raise Exception(
+                    f"El lote devolvió {len(results)} resultados para {len(batch)} entradas"
+                )
+        except Exception as e:
+            logger.error(f"Error en lote de inferencia para {key}: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de lotes ejecutados"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0
+        }
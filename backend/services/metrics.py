@@ -0,0 +1,190 @@
+import os
+import time
+import logging
+from typing import Any, Dict, Tuple
+
+from fastapi.routing import APIRoute
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+        multiprocess
+    )
+except ImportError:
+    Counter = None
+
+logger = logging.getLogger(__name__)
+
+# Peticiones que no corresponden a ninguna ruta (404): una sola etiqueta para
+# no crear una serie por cada URL que llegue
+UNMATCHED_ROUTE = "<sin ruta>"
+
+# Hasta 2 min: la inferencia y las llamadas a NIM superan los 10 s por defecto
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+ENABLED = Counter is not None and os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+if Counter is None:
+    logger.warning("Paquete prometheus_client no instalado: /metrics no estará disponible")
+
+if ENABLED:
+    HTTP_REQUESTS = Counter(
+        "http_requests_total", "Peticiones HTTP atendidas", ["method", "route", "status"]
+    )
+    HTTP_LATENCY = Histogram(
+        "http_request_duration_seconds", "Duración de las peticiones HTTP hasta el último byte",
+        ["method", "route"], buckets=LATENCY_BUCKETS
+    )
+    # livesum: con varios workers se suman los valores de los procesos vivos
+    HTTP_IN_FLIGHT = Gauge(
+        "http_requests_in_progress", "Peticiones HTTP en curso",
+        ["method", "route"], multiprocess_mode="livesum"
+    )
+    INTEGRATION_LATENCY = Histogram(
+        "integration_call_duration_seconds", "Duración de cada fase de las llamadas a integraciones externas",
+        ["integration", "phase", "outcome"], buckets=LATENCY_BUCKETS
+    )
+
+class _PhaseTimer:
+    """Context manager que observa la duración de una fase al salir del bloque"""
+
+    __slots__ = ("ok", "error", "started")
+
+    def __init__(self, ok, error):
+        self.ok = ok
+        self.error = error
+
+    def __enter__(self) -> "_PhaseTimer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        (self.error if exc_type is not None else self.ok).observe(time.perf_counter() - self.started)
+        return False
+
+class _NullTimer:
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+_NULL_TIMER = _NullTimer()
+_phase_series: Dict[Tuple[str, str], Tuple[Any, Any]] = {}
+
+def _series(integration: str, phase: str) -> Tuple[Any, Any]:
+    series = _phase_series.get((integration, phase))
+    if series is None:
+        series = _phase_series[(integration, phase)] = (
+            INTEGRATION_LATENCY.labels(integration, phase, "ok"),
+            INTEGRATION_LATENCY.labels(integration, phase, "error")
+        )
+    return series
+
+def observe(integration: str, phase: str, seconds: float) -> None:
+    """Registra una duración medida fuera de un bloque (por ejemplo, espera en cola)"""
+    if ENABLED:
+        _series(integration, phase)[0].observe(seconds)
+
+def track(integration: str, phase: str):
+    """
+    Mide una fase de una llamada saliente
+
+        with track("nvidia", "generate"):
+            ...
+
+    Sirve igual en código síncrono y dentro de corrutinas (alrededor de un
+    await). Si el bloque lanza una excepción la duración se registra con
+    outcome="error".
+    """
+    if not ENABLED:
+        return _NULL_TIMER
+    return _PhaseTimer(*_series(integration, phase))
+
+class InstrumentedRoute(APIRoute):
+    """
+    Ruta de FastAPI que cuenta sus peticiones en curso
+
+    Se usa como route_class de la aplicación: la ruta ya resuelta conoce su
+    plantilla (/video/render/{job_id}), sin tener que buscarla en la tabla
+    de rutas en cada petición.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._in_flight: Dict[str, Any] = {}
+
+    async def handle(self, scope, receive, send):
+        in_flight = self._in_flight.get(scope["method"])
+        if in_flight is None:
+            in_flight = self._in_flight[scope["method"]] = HTTP_IN_FLIGHT.labels(scope["method"], self.path)
+        in_flight.inc()
+        try:
+            await super().handle(scope, receive, send)
+        finally:
+            in_flight.dec()
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que registra latencia y códigos de estado por ruta.
+
+    La ruta se etiqueta con su plantilla, que el router deja en
+    scope["route"] al resolver la petición, no con la URL, para acotar el
+    número de series; las peticiones sin ruta comparten UNMATCHED_ROUTE.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._latency: Dict[Tuple[str, str], Any] = {}
+        self._requests: Dict[Tuple[str, str, int], Any] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            key = (scope["method"], getattr(route, "path", UNMATCHED_ROUTE))
+            latency = self._latency.get(key)
+            if latency is None:
+                latency = self._latency[key] = HTTP_LATENCY.labels(*key)
+            latency.observe(elapsed)
+            requests = self._requests.get((*key, status))
+            if requests is None:
+                requests = self._requests[(*key, status)] = HTTP_REQUESTS.labels(*key, str(status))
+            requests.inc()
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Métricas en formato de texto de Prometheus (bloqueante)
+
+    Con PROMETHEUS_MULTIPROC_DIR cada worker escribe sus valores en archivos
+    mapeados en memoria de ese directorio y aquí se agregan los de todos,
+    así cualquier worker que atienda /metrics devuelve el total del nodo.
+    """
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,254 @@
+import os
+import json
+import fcntl
+import shutil
+import asyncio
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+class ChecksumMismatch(Exception):
+    """El archivo descargado no coincide con el checksum esperado"""
+
+class RangeNotHonored(Exception):
+    """El servidor respondió sin 206 a una petición con Range"""
+
+@asynccontextmanager
+async def file_lock(path: str, poll: float = 0.5) -> AsyncIterator[None]:
+    """
+    Bloqueo exclusivo entre procesos sobre path, que no se borra nunca
+
+    Como _lock_parts, se sondea sin bloquear: la espera no ocupa un hilo y
+    una tarea cancelada mientras espera no se queda con el bloqueo.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(poll)
+        yield
+    finally:
+        os.close(fd)
+
+class ModelDownloader:
+    """
+    Descargador asíncrono de artefactos de modelos.
+
+    Divide los archivos grandes en segmentos que se descargan en paralelo con
+    peticiones HTTP Range, reanuda los segmentos parciales tras un fallo,
+    escribe en una ruta temporal y solo renombra al destino final cuando el
+    checksum es correcto. Las descargas concurrentes del mismo destino
+    comparten una única transferencia dentro del proceso, y un bloqueo
+    sobre el directorio .part impide que dos workers escriban a la vez en
+    los mismos segmentos.
+    """
+
+    def __init__(
+        self,
+        segments: Optional[int] = None,
+        min_segment_bytes: Optional[int] = None,
+        chunk_bytes: Optional[int] = None
+    ):
+        self.segments = segments or int(os.getenv("MODEL_DOWNLOAD_SEGMENTS", "4"))
+        self.min_segment_bytes = min_segment_bytes or int(
+            os.getenv("MODEL_DOWNLOAD_MIN_SEGMENT_BYTES", str(8 * 1024 ** 2))
+        )
+        self.chunk_bytes = chunk_bytes or int(os.getenv("MODEL_DOWNLOAD_CHUNK_BYTES", str(1024 ** 2)))
+        self.lock_poll = float(os.getenv("MODEL_DOWNLOAD_LOCK_POLL", "0.5"))
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def download(
+        self,
+        url: str,
+        target_file: str,
+        sha256: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> str:
+        """
+        Descarga url en target_file
+
+        Args:
+            url: URL del artefacto
+            target_file: Ruta final del archivo
+            sha256: Checksum esperado en hexadecimal (opcional)
+            headers: Cabeceras adicionales para la petición
+
+        Returns:
+            Ruta del archivo descargado
+        """
+        target_file = os.path.abspath(target_file)
+        pending = self._inflight.get(target_file)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.ensure_future(self._download(url, target_file, sha256, headers or {}))
+        self._inflight[target_file] = future
+        future.add_done_callback(lambda _: self._inflight.pop(target_file, None))
+        return await asyncio.shield(future)
+
+    async def _download(self, url: str, target_file: str, sha256: Optional[str],
+                        headers: Dict[str, str]) -> str:
+        part_dir = f"{target_file}.part"
+        lock, waited = await self._lock_parts(part_dir)
+        try:
+            if waited and os.path.exists(target_file):
+                # Otro worker terminó la misma descarga mientras esperábamos
+                shutil.rmtree(part_dir, ignore_errors=True)
+                return target_file
+            return await self._transfer(url, target_file, part_dir, sha256, headers)
+        finally:
+            os.close(lock)
+
+    async def _lock_parts(self, part_dir: str) -> Tuple[int, bool]:
+        """
+        Bloqueo exclusivo entre procesos sobre el directorio .part
+
+        Se sondea sin bloquear para no ocupar un hilo ni quedarse con el
+        bloqueo si la tarea se cancela mientras espera. Si quien lo tenía
+        borró el directorio al terminar, se vuelve a crear y a bloquear.
+
+        Returns:
+            (descriptor que mantiene el bloqueo, si hubo que esperar)
+        """
+        waited = False
+        while True:
+            os.makedirs(part_dir, exist_ok=True)
+            fd = os.open(part_dir, os.O_RDONLY)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                waited = True
+                await asyncio.sleep(self.lock_poll)
+                continue
+            try:
+                if os.stat(part_dir).st_ino == os.fstat(fd).st_ino:
+                    return fd, waited
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    async def _transfer(self, url: str, target_file: str, part_dir: str, sha256: Optional[str],
+                        headers: Dict[str, str]) -> str:
+        async with aiohttp.ClientSession(raise_for_status=True) as session:
+            size, etag, accepts_ranges = await self._probe(session, url, headers)
+            self._reset_stale_parts(part_dir, url, size, etag)
+
+            if size and accepts_ranges:
+                ranges = self._split(size)
+            else:
+                # Sin soporte de rangos no se puede reanudar: empezar de cero
+                self._clear_parts(part_dir)
+                ranges = [(0, None)]
+            self._write_meta(part_dir, url, size, etag)
+
+            tasks = [
+                asyncio.ensure_future(
+                    self._fetch_segment(session, url, headers, os.path.join(part_dir, f"seg-{i}"), start, end)
+                )
+                for i, (start, end) in enumerate(ranges)
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                # No dejar segmentos escribiendo mientras otro intento los reanuda
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+        segment_files = [os.path.join(part_dir, f"seg-{i}") for i in range(len(ranges))]
+        await asyncio.to_thread(self._assemble, segment_files, target_file, sha256)
+        shutil.rmtree(part_dir, ignore_errors=True)
+        return target_file
+
+    async def _probe(self, session: aiohttp.ClientSession, url: str,
+                     headers: Dict[str, str]) -> Tuple[Optional[int], Optional[str], bool]:
+        """Obtiene tamaño, ETag y soporte de rangos con una petición de 1 byte"""
+        async with session.get(url, headers={**headers, "Range": "bytes=0-0"}) as response:
+            etag = response.headers.get("ETag")
+            if response.status == 206:
+                content_range = response.headers.get("Content-Range", "")
+                total = content_range.rpartition("/")[2]
+                return (int(total) if total.isdigit() else None), etag, True
+            return response.content_length, etag, False
+
+    def _split(self, size: int) -> List[Tuple[int, int]]:
+        """Divide [0, size) en segmentos inclusivos para cabeceras Range"""
+        count = max(1, min(self.segments, size // self.min_segment_bytes))
+        step = -(-size // count)
+        return [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+    def _reset_stale_parts(self, part_dir: str, url: str, size: Optional[int], etag: Optional[str]) -> None:
+        """Descarta segmentos de una versión distinta del artefacto"""
+        meta_file = os.path.join(part_dir, "meta.json")
+        if not os.path.exists(meta_file):
+            return
+        with open(meta_file) as f:
+            meta = json.load(f)
+        if (meta.get("size"), meta.get("etag"), meta.get("segments")) != (size, etag, self.segments):
+            logger.info(f"Descartando descarga parcial obsoleta de {url}")
+            self._clear_parts(part_dir)
+
+    @staticmethod
+    def _clear_parts(part_dir: str) -> None:
+        """Vacía el directorio .part sin borrarlo: su inodo es el del bloqueo"""
+        for name in os.listdir(part_dir):
+            os.unlink(os.path.join(part_dir, name))
+
+    def _write_meta(self, part_dir: str, url: str, size: Optional[int], etag: Optional[str]) -> None:
+        with open(os.path.join(part_dir, "meta.json"), "w") as f:
+            json.dump({"url": url, "size": size, "etag": etag, "segments": self.segments}, f)
+
+    async def _fetch_segment(self, session: aiohttp.ClientSession, url: str, headers: Dict[str, str],
+                             segment_file: str, start: int, end: Optional[int]) -> None:
+        done = os.path.getsize(segment_file) if os.path.exists(segment_file) else 0
+        if end is not None:
+            if start + done > end:
+                return
+            headers = {**headers, "Range": f"bytes={start + done}-{end}"}
+
+        async with session.get(url, headers=headers) as response:
+            if end is not None and response.status != 206:
+                # Un servidor o proxy que ignora Range devuelve el cuerpo
+                # entero: añadirlo al segmento lo corrompería
+                raise RangeNotHonored(
+                    f"Respuesta {response.status} sin rango para bytes={start + done}-{end} de {url}"
+                )
+            with open(segment_file, "ab" if end is not None else "wb") as f:
+                async for chunk in response.content.iter_chunked(self.chunk_bytes):
+                    f.write(chunk)
+
+    def _assemble(self, segment_files: List[str], target_file: str, sha256: Optional[str]) -> None:
+        """Concatena los segmentos, verifica el checksum y renombra de forma atómica"""
+        tmp_file = f"{target_file}.tmp"
+        digest = hashlib.sha256()
+        with open(tmp_file, "wb") as out:
+            for segment_file in segment_files:
+                with open(segment_file, "rb") as f:
+                    while True:
+                        block = f.read(self.chunk_bytes)
+                        if not block:
+                            break
+                        digest.update(block)
+                        out.write(block)
+            out.flush()
+            os.fsync(out.fileno())
+
+        if sha256 and digest.hexdigest().lower() != sha256.lower():
+            os.unlink(tmp_file)
+            # Los segmentos están corruptos: no reanudar sobre ellos
+            self._clear_parts(os.path.dirname(segment_files[0]))
+            raise ChecksumMismatch(
+                f"Checksum incorrecto para {os.path.basename(target_file)}: "
+                f"esperado {sha256}, obtenido {digest.hexdigest()}"
+            )
+        os.replace(tmp_file, target_file)
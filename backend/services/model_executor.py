@@ -0,0 +1,129 @@
+import os
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+class ExecutorQueueFull(Exception):
+    """La cola del ejecutor está llena; el cliente debe reintentar más tarde"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"Cola de {name} llena, reintente en {retry_after} s")
+        self.retry_after = retry_after
+
+class BoundedExecutor:
+    """
+    Ejecutor acotado para trabajo bloqueante fuera del event loop.
+
+    Limita la concurrencia al número de workers del pool y rechaza con
+    ExecutorQueueFull las tareas que excedan la profundidad de cola, en lugar
+    de acumular peticiones indefinidamente.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        max_queue: int,
+        kind: str = "thread",
+        retry_after: int = 5
+    ):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.kind = kind
+        self.retry_after = retry_after
+        self._executor = self._create_executor()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls, name: str, prefix: str, default_workers: int, default_queue: int) -> "BoundedExecutor":
+        """
+        Crea un ejecutor configurado con variables de entorno
+
+        Lee {prefix}_WORKERS, {prefix}_QUEUE_DEPTH, {prefix}_EXECUTOR
+        ("thread" o "process") y {prefix}_RETRY_AFTER.
+        """
+        return cls(
+            name,
+            max_workers=int(os.getenv(f"{prefix}_WORKERS", str(default_workers))),
+            max_queue=int(os.getenv(f"{prefix}_QUEUE_DEPTH", str(default_queue))),
+            kind=os.getenv(f"{prefix}_EXECUTOR", "thread"),
+            retry_after=int(os.getenv(f"{prefix}_RETRY_AFTER", "5"))
+        )
+
+    def _create_executor(self) -> Executor:
+        if self.kind == "process":
+            # spawn evita heredar hilos de torch/uvicorn en los procesos hijos
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        if self.kind != "thread":
+            raise ValueError(f"Tipo de ejecutor no soportado: {self.kind}")
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=self.name
+        )
+
+    @property
+    def uses_processes(self) -> bool:
+        return self.kind == "process"
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> asyncio.Future:
+        """
+        Envía fn al pool y devuelve un future del event loop
+
+        La comprobación de capacidad es inmediata, de modo que el llamador
+        puede rechazar la petición antes de empezar a responder.
+
+        Raises:
+            ExecutorQueueFull: si ya hay max_workers + max_queue tareas en curso
+        """
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ExecutorQueueFull(self.name, self.retry_after)
+
+        self._pending += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._executor,
+            functools.partial(fn, *args, **kwargs)
+        )
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: asyncio.Future) -> None:
+        self._pending -= 1
+        if not future.cancelled() and future.exception() is None:
+            self.completed += 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Ejecuta fn en el pool sin bloquear el event loop
+
+        Raises:
+            ExecutorQueueFull: si ya hay max_workers + max_queue tareas en curso
+        """
+        return await self.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Ocupación y contadores del ejecutor"""
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": min(self._pending, self.max_workers),
+            "queued": max(0, self._pending - self.max_workers),
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,139 @@
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ModelRegistry:
+    """
+    Registro en memoria de modelos residentes por model_id.
+
+    Mantiene los modelos cargados entre peticiones y los desaloja en orden
+    LRU cuando la suma de sus tamaños en bytes supera el presupuesto
+    configurado. Las cargas concurrentes del mismo modelo comparten una
+    única llamada al loader.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        on_evict: Optional[Callable[[str, Any], None]] = None
+    ):
+        if max_bytes is None:
+            max_bytes = int(os.getenv("MODEL_CACHE_MAX_BYTES", str(8 * 1024 ** 3)))
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Task] = {}
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.shared_loads = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    async def get(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Tuple[Any, int]]]
+    ) -> Any:
+        """
+        Devuelve el valor residente para key, cargándolo si hace falta
+
+        Args:
+            key: Identificador del modelo
+            loader: Corrutina que devuelve (valor, tamaño_en_bytes)
+
+        Returns:
+            El valor cargado (por ejemplo, la tupla modelo/tokenizer)
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        pending = self._loading.get(key)
+        if pending is not None:
+            self.shared_loads += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        # La carga corre en su propia tarea: si el primer llamante se cancela
+        # (el cliente se desconecta), los demás siguen esperándola y el
+        # modelo queda residente igualmente
+        task = asyncio.get_running_loop().create_task(self._load(key, loader))
+        task.add_done_callback(self._loaded)
+        self._loading[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Tuple[Any, int]]]) -> Any:
+        try:
+            value, size = await loader()
+        finally:
+            self._loading.pop(key, None)
+        self._store(key, value, size)
+        return value
+
+    @staticmethod
+    def _loaded(task: asyncio.Task) -> None:
+        # Marcar la excepción como recuperada si nadie quedaba esperando
+        if not task.cancelled():
+            task.exception()
+
+    def _store(self, key: str, value: Any, size: int) -> None:
+        """Guarda una entrada y desaloja las menos usadas hasta caber en el presupuesto"""
+        if size > self.max_bytes:
+            logger.warning(
+                f"El modelo {key} ({size} bytes) excede el presupuesto de "
+                f"{self.max_bytes} bytes; no se mantendrá residente"
+            )
+            return
+
+        while self._entries and self._current_bytes + size > self.max_bytes:
+            self._evict_oldest()
+
+        self._entries[key] = (value, size)
+        self._current_bytes += size
+
+    def _evict_oldest(self) -> None:
+        key, (value, size) = self._entries.popitem(last=False)
+        self._current_bytes -= size
+        self.evictions += 1
+        self.evicted_bytes += size
+        logger.info(f"Modelo {key} desalojado ({size} bytes)")
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+    def evict(self, key: str) -> bool:
+        """Elimina explícitamente un modelo residente"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._current_bytes -= entry[1]
+        self.evictions += 1
+        self.evicted_bytes += entry[1]
+        logger.info(f"Modelo {key} desalojado ({entry[1]} bytes)")
+        if self.on_evict is not None:
+            self.on_evict(key, entry[0])
+        return True
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para dimensionar el presupuesto de memoria"""
+        lookups = self.hits + self.misses + self.shared_loads
+        return {
+            "max_bytes": self.max_bytes,
+            "current_bytes": self._current_bytes,
+            "resident_models": {key: size for key, (_, size) in self._entries.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_loads": self.shared_loads,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+            "hit_rate": (self.hits + self.shared_loads) / lookups if lookups else 0.0
+        }
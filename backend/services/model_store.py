@@ -0,0 +1,191 @@
+import os
+import json
+import mmap
+import fcntl
+import struct
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import torch
+from safetensors.torch import save_file
+from transformers import AutoConfig, AutoModelForCausalLM, GenerationConfig
+
+logger = logging.getLogger(__name__)
+
+SAFETENSORS_NAME = "model.safetensors"
+SAFETENSORS_INDEX_NAME = "model.safetensors.index.json"
+# Checkpoints pickle de torch: el model.bin de download_model y el nombre estándar de HF
+LEGACY_CHECKPOINTS = ("model.bin", "pytorch_model.bin")
+
+_DTYPES = {
+    "F64": torch.float64, "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+    "I64": torch.int64, "I32": torch.int32, "I16": torch.int16, "I8": torch.int8,
+    "U8": torch.uint8, "BOOL": torch.bool
+}
+
+@contextmanager
+def _model_lock(model_dir: str) -> Iterator[None]:
+    """Bloqueo entre procesos: un solo worker del nodo convierte cada modelo"""
+    with open(os.path.join(model_dir, ".convert.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def has_safetensors(model_dir: str) -> bool:
+    return any(
+        os.path.exists(os.path.join(model_dir, name))
+        for name in (SAFETENSORS_NAME, SAFETENSORS_INDEX_NAME)
+    )
+
+def convert_checkpoint(model_dir: str) -> bool:
+    """
+    Convierte el checkpoint pickle de model_dir a model.safetensors
+
+    Los tensores que comparten memoria (pesos atados) se guardan una sola
+    vez y sus alias quedan en los metadatos. La escritura va a un temporal
+    que se renombra, y el checkpoint original se borra al terminar.
+
+    Returns:
+        True si había algo que convertir
+    """
+    with _model_lock(model_dir):
+        if has_safetensors(model_dir):
+            return False
+        source = next(
+            (os.path.join(model_dir, name) for name in LEGACY_CHECKPOINTS
+             if os.path.exists(os.path.join(model_dir, name))),
+            None
+        )
+        if source is None:
+            return False
+
+        state = torch.load(source, map_location="cpu", weights_only=True, mmap=True)
+        if isinstance(state, dict) and isinstance(state.get("state_dict"), dict):
+            state = state["state_dict"]
+
+        tensors: Dict[str, torch.Tensor] = {}
+        aliases: Dict[str, str] = {}
+        seen: Dict[Any, str] = {}
+        for name, tensor in state.items():
+            key = (tensor.untyped_storage().data_ptr(), tensor.storage_offset(), tuple(tensor.shape),
+                   tuple(tensor.stride()), tensor.dtype)
+            if tensor.numel() and key in seen:
+                aliases[name] = seen[key]
+                continue
+            seen[key] = name
+            tensors[name] = tensor.contiguous()
+
+        target = os.path.join(model_dir, SAFETENSORS_NAME)
+        tmp = f"{target}.tmp"
+        save_file(tensors, tmp, metadata={"format": "pt", "aliases": json.dumps(aliases)})
+        os.replace(tmp, target)
+        os.remove(source)
+        logger.info(f"Checkpoint {source} convertido a safetensors ({len(tensors)} tensores)")
+        return True
+
+def _map_file(path: str) -> Dict[str, torch.Tensor]:
+    """
+    Tensores de un archivo safetensors respaldados por un mmap del archivo
+
+    MAP_PRIVATE sin escrituras: las páginas son las de la caché de páginas
+    del sistema, compartidas por todos los procesos que mapean el archivo.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    (header_size,) = struct.unpack("<Q", mapped[:8])
+    header = json.loads(mapped[8:8 + header_size])
+    base = 8 + header_size
+    metadata = header.pop("__metadata__", None) or {}
+
+    tensors: Dict[str, torch.Tensor] = {}
+    for name, info in header.items():
+        dtype = _DTYPES[info["dtype"]]
+        start, end = info["data_offsets"]
+        if end == start:
+            tensors[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        tensors[name] = torch.frombuffer(
+            mapped, dtype=dtype, count=(end - start) // dtype.itemsize, offset=base + start
+        ).reshape(info["shape"])
+    for alias, name in json.loads(metadata.get("aliases", "{}")).items():
+        tensors[alias] = tensors[name]
+    return tensors
+
+def map_safetensors(model_dir: str) -> Dict[str, torch.Tensor]:
+    """Estado del modelo (uno o varios archivos safetensors) sin copiar los pesos"""
+    index_path = os.path.join(model_dir, SAFETENSORS_INDEX_NAME)
+    if not os.path.exists(index_path):
+        return _map_file(os.path.join(model_dir, SAFETENSORS_NAME))
+    with open(index_path) as f:
+        shards: List[str] = sorted(set(json.load(f)["weight_map"].values()))
+    state: Dict[str, torch.Tensor] = {}
+    for shard in shards:
+        state.update(_map_file(os.path.join(model_dir, shard)))
+    return state
+
+def _materialize_buffers(model: Any) -> List[str]:
+    """
+    Crea en CPU los buffers que quedaron en meta y los inicializa
+
+    Los buffers no persistentes (inv_freq de los rotary embeddings de
+    Llama, Mistral o Qwen) no están en el checkpoint: se recalculan con
+    _init_weights, como hace from_pretrained. Solo se tocan módulos sin
+    parámetros propios, para no reinicializar pesos cargados, y se
+    rellenan con NaN antes para detectar los que _init_weights no cubre.
+
+    Returns:
+        Nombres de los buffers que no se pudieron inicializar
+    """
+    missing: List[str] = []
+    for module_name, module in model.named_modules():
+        names = [name for name, buffer in module._buffers.items() if buffer is not None and buffer.is_meta]
+        if not names:
+            continue
+        prefix = f"{module_name}." if module_name else ""
+        if next(module.parameters(recurse=False), None) is not None or not all(
+            module._buffers[name].is_floating_point() for name in names
+        ):
+            missing.extend(prefix + name for name in names)
+            continue
+        for name in names:
+            buffer = module._buffers[name]
+            module._buffers[name] = torch.full(buffer.shape, float("nan"), dtype=buffer.dtype, device="cpu")
+        with torch.no_grad():
+            model._init_weights(module)
+        missing.extend(prefix + name for name in names if module._buffers[name].isnan().any())
+    return missing
+
+def load_mapped_model(model_dir: str) -> Optional[Any]:
+    """
+    Construye el modelo sobre los pesos mapeados en memoria
+
+    La arquitectura se crea en el dispositivo meta (sin reservar pesos) y
+    los parámetros pasan a apuntar directamente a los tensores del mmap.
+    Los buffers que no están en el checkpoint se calculan en CPU.
+
+    Returns:
+        El modelo, o None si no se puede cargar así (sin safetensors o
+        config.json, o con pesos que no están en el checkpoint)
+    """
+    if not has_safetensors(model_dir) or not os.path.exists(os.path.join(model_dir, "config.json")):
+        return None
+    config = AutoConfig.from_pretrained(model_dir)
+    with torch.device("meta"):
+        model = AutoModelForCausalLM.from_config(config)
+    model.load_state_dict(map_safetensors(model_dir), strict=False, assign=True)
+    model.tie_weights()
+    missing = [name for name, tensor in model.named_parameters() if tensor.is_meta]
+    if not missing:
+        missing = _materialize_buffers(model)
+    if missing:
+        # Pesos ausentes o buffers sin inicializar: se carga de la forma habitual
+        logger.warning(f"Modelo {model_dir} sin mmap, faltan {len(missing)} tensores: {missing[:3]}")
+        return None
+    if os.path.exists(os.path.join(model_dir, "generation_config.json")):
+        # from_pretrained también aplica los parámetros de generación del modelo
+        model.generation_config = GenerationConfig.from_pretrained(model_dir)
+    model.requires_grad_(False)
+    return model
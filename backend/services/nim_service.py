@@ -1,10 +1,14 @@
-from typing import Dict, List, Optional
+from typing import AsyncIterable, Dict, List, Optional, Union
 import os
 import aiohttp
 import asyncio
+import time
 from fastapi import HTTPException
 import logging
 
+from .metrics import track
+from .upload_stream import UploadTooLarge
+
 logger = logging.getLogger(__name__)
 
 class NIMService:
@@ -12,9 +16,54 @@ class NIMService:
         self.api_key = os.getenv("NVIDIA_NGC_API_KEY")
         self.base_url = os.getenv("NIM_URL", "https://api.nvcf.nvidia.com/v2/nvcf")
         self.model_id = os.getenv("NIM_MODEL_ID", "pdf-to-podcast")
-        self.batch_size = int(os.getenv("NIM_BATCH_SIZE", "1"))
+        self.batch_size = int(os.getenv("NIM_BATCH_SIZE", "4"))
         self.max_retries = int(os.getenv("NIM_MAX_RETRIES", "3"))
         self.timeout = int(os.getenv("NIM_TIMEOUT", "300"))
+        self.connect_timeout = float(os.getenv("NIM_CONNECT_TIMEOUT", "10"))
+        self.limit_per_host = int(os.getenv("NIM_CONN_LIMIT_PER_HOST", "32"))
+        self.keepalive_timeout = float(os.getenv("NIM_KEEPALIVE_TIMEOUT", "60"))
+        self.dns_cache_ttl = int(os.getenv("NIM_DNS_CACHE_TTL", "300"))
+        self.voices_ttl = float(os.getenv("NIM_VOICES_TTL", "300"))
+        self.voices_max_stale = float(os.getenv("NIM_VOICES_MAX_STALE", "86400"))
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._voices: Optional[List[Dict]] = None
+        self._voices_fetched_at = 0.0
+        self._voices_refresh: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """
+        Crea la sesión HTTP compartida del worker
+        """
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(
+                total=self.timeout,
+                sock_connect=self.connect_timeout
+            )
+        )
+
+    async def close(self) -> None:
+        """
+        Cierra la sesión HTTP compartida y sus conexiones
+        """
+        if self._voices_refresh is not None:
+            self._voices_refresh.cancel()
+            self._voices_refresh = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
 
     async def convert_pdf_to_podcast(
         self,
@@ -27,14 +76,66 @@ class NIMService:
         Convierte un PDF a podcast usando el servicio NIM
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                # Subir el PDF
-                upload_url = f"{self.base_url}/upload"
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/pdf"
-                }
-                
+            conversion_id = await self.start_conversion(
+                pdf_content,
+                voice_id=voice_id,
+                speaking_rate=speaking_rate,
+                pitch=pitch
+            )
+
+            # Esperar y verificar el estado
+            for _ in range(self.max_retries):
+                status_result = await self.get_conversion_status(conversion_id)
+
+                if status_result["status"] == "completed":
+                    return self.conversion_result(status_result)
+                elif status_result["status"] == "failed":
+                    raise HTTPException(
+                        status_code=500,
+                        detail="La conversión falló"
+                    )
+
+                await asyncio.sleep(5)
+
+            raise HTTPException(
+                status_code=408,
+                detail="Tiempo de espera agotado"
+            )
+
+        except Exception as e:
+            logger.error(f"Error en la conversión: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error en el servicio NIM: {str(e)}"
+            )
+
+    async def start_conversion(
+        self,
+        pdf_content: Union[bytes, AsyncIterable[bytes]],
+        voice_id: str = "default",
+        speaking_rate: float = 1.0,
+        pitch: float = 1.0
+    ) -> str:
+        """
+        Sube el PDF e inicia la conversión sin esperar a que termine
+
+        pdf_content puede ser un iterador asíncrono de bloques, que se envía
+        a NIM por streaming sin acumularlo en memoria.
+
+        Returns:
+            ID de la conversión en NIM
+        """
+        session = await self._get_session()
+
+        # Subir el PDF
+        upload_url = f"{self.base_url}/upload"
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/pdf"
+        }
+
+        try:
+            with track("nim", "upload"):
                 async with session.post(
                     upload_url,
                     headers=headers,
@@ -47,80 +148,113 @@ class NIMService:
                         )
                     upload_result = await response.json()
                     file_id = upload_result["file_id"]
+        except aiohttp.ClientConnectionError as e:
+            # aiohttp encadena los errores del iterador del cuerpo
+            if isinstance(e.__cause__, UploadTooLarge):
+                raise e.__cause__
+            raise
 
-                # Iniciar la conversión
-                convert_url = f"{self.base_url}/convert"
-                convert_payload = {
-                    "file_id": file_id,
-                    "voice_id": voice_id,
-                    "speaking_rate": speaking_rate,
-                    "pitch": pitch
-                }
+        # Iniciar la conversión
+        convert_url = f"{self.base_url}/convert"
+        convert_payload = {
+            "file_id": file_id,
+            "voice_id": voice_id,
+            "speaking_rate": speaking_rate,
+            "pitch": pitch
+        }
 
-                async with session.post(
-                    convert_url,
-                    headers=headers,
-                    json=convert_payload
-                ) as response:
-                    if response.status != 200:
-                        raise HTTPException(
-                            status_code=response.status,
-                            detail="Error al iniciar la conversión"
-                        )
-                    convert_result = await response.json()
-                    conversion_id = convert_result["conversion_id"]
-
-                # Esperar y verificar el estado
-                for _ in range(self.max_retries):
-                    status_url = f"{self.base_url}/status/{conversion_id}"
-                    async with session.get(
-                        status_url,
-                        headers=headers
-                    ) as response:
-                        if response.status != 200:
-                            raise HTTPException(
-                                status_code=response.status,
-                                detail="Error al verificar el estado"
-                            )
-                        status_result = await response.json()
-                        
-                        if status_result["status"] == "completed":
-                            return {
-                                "audio_url": status_result["audio_url"],
-                                "duration": status_result["duration"],
-                                "word_count": status_result["word_count"]
-                            }
-                        elif status_result["status"] == "failed":
-                            raise HTTPException(
-                                status_code=500,
-                                detail="La conversión falló"
-                            )
-                        
-                        await asyncio.sleep(5)
-
-                raise HTTPException(
-                    status_code=408,
-                    detail="Tiempo de espera agotado"
-                )
+        with track("nim", "convert"):
+            async with session.post(
+                convert_url,
+                headers=headers,
+                json=convert_payload
+            ) as response:
+                if response.status != 200:
+                    raise HTTPException(
+                        status_code=response.status,
+                        detail="Error al iniciar la conversión"
+                    )
+                convert_result = await response.json()
+                return convert_result["conversion_id"]
 
-        except Exception as e:
-            logger.error(f"Error en la conversión: {str(e)}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error en el servicio NIM: {str(e)}"
-            )
+    async def get_conversion_status(self, conversion_id: str) -> Dict:
+        """
+        Consulta una vez el estado de una conversión en NIM
+        """
+        session = await self._get_session()
+        status_url = f"{self.base_url}/status/{conversion_id}"
+        headers = {
+            "Authorization": f"Bearer {self.api_key}"
+        }
+
+        with track("nim", "status"):
+            async with session.get(
+                status_url,
+                headers=headers
+            ) as response:
+                if response.status != 200:
+                    raise HTTPException(
+                        status_code=response.status,
+                        detail="Error al verificar el estado"
+                    )
+                return await response.json()
+
+    @staticmethod
+    def conversion_result(status_result: Dict) -> Dict:
+        """
+        Extrae el resultado público de una conversión completada
+        """
+        return {
+            "audio_url": status_result["audio_url"],
+            "duration": status_result["duration"],
+            "word_count": status_result["word_count"]
+        }
 
     async def get_available_voices(self) -> List[Dict]:
         """
         Obtiene la lista de voces disponibles
+
+        Sirve el catálogo desde memoria (stale-while-revalidate): mientras
+        tenga menos de NIM_VOICES_TTL segundos se devuelve tal cual; hasta
+        NIM_VOICES_MAX_STALE se devuelve y se refresca en segundo plano; más
+        allá se espera a una consulta nueva a NIM.
         """
+        age = time.monotonic() - self._voices_fetched_at
+        if self._voices is not None and age < self.voices_max_stale:
+            if age >= self.voices_ttl:
+                self._refresh_voices()
+            return self._voices
+
+        return await asyncio.shield(self._refresh_voices())
+
+    def _refresh_voices(self) -> asyncio.Task:
+        """Lanza (o reutiliza) una única actualización del catálogo de voces"""
+        if self._voices_refresh is None or self._voices_refresh.done():
+            self._voices_refresh = asyncio.create_task(self._fetch_voices())
+            self._voices_refresh.add_done_callback(self._log_refresh_error)
+        return self._voices_refresh
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"No se pudo refrescar el catálogo de voces: {task.exception()}")
+
+    async def _fetch_voices(self) -> List[Dict]:
+        voices = await self._request_voices()
+        self._voices = voices
+        self._voices_fetched_at = time.monotonic()
+        return voices
+
+    async def _request_voices(self) -> List[Dict]:
         try:
-            async with aiohttp.ClientSession() as session:
-                voices_url = f"{self.base_url}/voices"
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}"
-                }
+            session = await self._get_session()
+
+            voices_url = f"{self.base_url}/voices"
+            headers = {
+                "Authorization": f"Bearer {self.api_key}"
+            }
                 
+            with track("nim", "voices"):
                 async with session.get(
                     voices_url,
                     headers=headers
@@ -144,12 +278,14 @@ class NIMService:
         Obtiene el historial de conversiones
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                history_url = f"{self.base_url}/history"
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}"
-                }
+            session = await self._get_session()
+
+            history_url = f"{self.base_url}/history"
+            headers = {
+                "Authorization": f"Bearer {self.api_key}"
+            }
                 
+            with track("nim", "history"):
                 async with session.get(
                     history_url,
                     headers=headers
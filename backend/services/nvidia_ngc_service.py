@@ -1,9 +1,120 @@
 import os
-from typing import Dict, Any
+import time
+import shutil
+import asyncio
+import threading
+from typing import Dict, Any, AsyncIterator, List, Tuple
 import requests
 import json
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from transformers import (
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextStreamer
+)
+
+from .inference_batcher import InferenceBatcher
+from .metrics import track
+from .model_downloader import ModelDownloader, file_lock
+from .model_executor import BoundedExecutor, ExecutorQueueFull
+from .model_registry import ModelRegistry
+from .model_store import LEGACY_CHECKPOINTS, convert_checkpoint, has_safetensors, load_mapped_model
+
+# Modelos residentes en cada proceso del pool cuando INFERENCE_EXECUTOR=process
+_process_models: Dict[str, Tuple[Any, Any]] = {}
+
+def _load_pretrained(model_path: str, device: str, use_mmap: bool = True) -> Tuple[Any, Any]:
+    """Carga modelo y tokenizer listos para generar en lote (bloqueante)"""
+    # Con safetensors los pesos se mapean en memoria: en CPU todos los workers
+    # del nodo comparten las mismas páginas de la caché del sistema
+    with track("nvidia", "load"):
+        model = load_mapped_model(model_path) if use_mmap else None
+        if model is None:
+            model = AutoModelForCausalLM.from_pretrained(model_path)
+        model = model.to(device)
+        model.eval()
+        tokenizer = AutoTokenizer.from_pretrained(model_path)
+    
+    # Los modelos causales necesitan padding a la izquierda para generar en lote
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
+    
+    return model, tokenizer
+
+def _generate(model, tokenizer, texts: List[str], device: str) -> List[str]:
+    """Tokeniza, genera y decodifica un lote de textos (bloqueante)"""
+    with track("nvidia", "tokenize"):
+        inputs = tokenizer(texts, return_tensors="pt", padding=True).to(device)
+    
+    with torch.no_grad(), track("nvidia", "generate"):
+        outputs = model.generate(**inputs, pad_token_id=tokenizer.pad_token_id)
+        
+    with track("nvidia", "decode"):
+        return tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+class _AsyncTextStreamer(TextStreamer):
+    """Reenvía el texto generado desde el hilo de generate a una cola asyncio"""
+    
+    def __init__(self, tokenizer, loop: asyncio.AbstractEventLoop):
+        super().__init__(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.generated_tokens = 0
+        self.first_token_at = None
+        
+    def put(self, value):
+        if not self.next_tokens_are_prompt:
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+            self.generated_tokens += value.numel()
+        super().put(value)
+        
+    def on_finalized_text(self, text: str, stream_end: bool = False):
+        if text:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, text)
+            
+    def close(self):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+
+class _CancelledCriteria(StoppingCriteria):
+    """Detiene generate en el siguiente token cuando el cliente se desconecta"""
+    
+    def __init__(self, cancelled: threading.Event):
+        self.cancelled = cancelled
+        
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full(
+            (input_ids.shape[0],),
+            self.cancelled.is_set(),
+            dtype=torch.bool,
+            device=input_ids.device
+        )
+
+def _generate_streaming(model, tokenizer, text: str, device: str, streamer, stopping) -> None:
+    """Genera para un único texto emitiendo tokens por el streamer (bloqueante)"""
+    try:
+        with track("nvidia", "tokenize"):
+            inputs = tokenizer(text, return_tensors="pt").to(device)
+        # Incluye la decodificación incremental que hace el streamer
+        with torch.no_grad(), track("nvidia", "generate_stream"):
+            model.generate(
+                **inputs,
+                pad_token_id=tokenizer.pad_token_id,
+                streamer=streamer,
+                stopping_criteria=stopping
+            )
+    finally:
+        streamer.close()
+
+def _generate_in_process(model_path: str, texts: List[str], device: str, use_mmap: bool = True) -> List[str]:
+    """Punto de entrada del pool de procesos: cada proceso mantiene sus modelos"""
+    if model_path not in _process_models:
+        _process_models[model_path] = _load_pretrained(model_path, device, use_mmap)
+    model, tokenizer = _process_models[model_path]
+    return _generate(model, tokenizer, texts, device)
 
 class NvidiaService:
     def __init__(self):
@@ -11,6 +122,12 @@ class NvidiaService:
         self.api_url = os.getenv("NVIDIA_NGC_API_URL")
         self.models_path = os.getenv("MODELS_PATH")
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.use_mmap = os.getenv("MODEL_MMAP", "true").lower() == "true"
+        self.model_registry = ModelRegistry(on_evict=self._release_model)
+        self.batcher = InferenceBatcher(self._generate_batch)
+        self.model_executor = BoundedExecutor.from_env("nvidia-model", "INFERENCE", 2, 16)
+        self.io_executor = BoundedExecutor.from_env("nvidia-io", "NGC_IO", 4, 32)
+        self.downloader = ModelDownloader()
         
     async def run_inference(self, model_id: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -24,24 +141,8 @@ class NvidiaService:
             Dict con los resultados de la inferencia
         """
         try:
-            # Cargar modelo desde NGC o caché local
-            model_path = os.path.join(self.models_path, model_id)
-            if not os.path.exists(model_path):
-                await self.download_model(model_id, model_path)
-                
-            # Cargar modelo y tokenizer
-            model = AutoModelForCausalLM.from_pretrained(model_path).to(self.device)
-            tokenizer = AutoTokenizer.from_pretrained(model_path)
-            
-            # Preparar input
-            inputs = tokenizer(input_data["text"], return_tensors="pt").to(self.device)
-            
-            # Generar salida
-            with torch.no_grad():
-                outputs = model.generate(**inputs)
-                
-            # Decodificar resultado
-            result = tokenizer.decode(outputs[0], skip_special_tokens=True)
+            # Agrupar con otras peticiones concurrentes del mismo modelo
+            result = await self.batcher.submit(model_id, input_data["text"])
             
             return {
                 "model_id": model_id,
@@ -50,9 +151,190 @@ class NvidiaService:
                 "device": self.device
             }
             
+        except ExecutorQueueFull:
+            raise
+        except Exception as e:
+            raise Exception(f"Error en inferencia: {str(e)}")
+            
+    async def stream_inference(self, model_id: str, input_data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Inicia una inferencia que emite el texto a medida que se genera
+        
+        El modelo se carga y la generación se encola antes de devolver el
+        iterador, así los errores (incluida la cola llena) se producen antes
+        de empezar a responder al cliente.
+        
+        Args:
+            model_id: ID del modelo a usar
+            input_data: Datos de entrada para el modelo
+            
+        Returns:
+            Iterador asíncrono de eventos {"token": ...} terminado por un
+            evento {"done": True, ...} con métricas de la generación
+        """
+        try:
+            start = time.perf_counter()
+            text = input_data["text"]
+            
+            if self.model_executor.uses_processes:
+                # El modelo vive en otro proceso: no hay tokens intermedios
+                output = await self.batcher.submit(model_id, text)
+                return self._single_event_stream(model_id, output, start)
+                
+            model, tokenizer = await self.model_registry.get(
+                model_id,
+                lambda: self._load_model(model_id)
+            )
+            
+            streamer = _AsyncTextStreamer(tokenizer, asyncio.get_running_loop())
+            cancelled = threading.Event()
+            future = self.model_executor.submit(
+                _generate_streaming,
+                model,
+                tokenizer,
+                text,
+                self.device,
+                streamer,
+                StoppingCriteriaList([_CancelledCriteria(cancelled)])
+            )
+            
+            return self._token_stream(model_id, streamer, future, cancelled, start)
+            
+        except ExecutorQueueFull:
+            raise
         except Exception as e:
             raise Exception(f"Error en inferencia: {str(e)}")
             
+    async def _token_stream(self, model_id: str, streamer: _AsyncTextStreamer, future: asyncio.Future,
+                            cancelled: threading.Event, start: float) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            while True:
+                text = await streamer.queue.get()
+                if text is None:
+                    break
+                yield {"token": text}
+                
+            # Propagar errores de generate
+            await future
+            
+            elapsed = time.perf_counter() - start
+            first_token_at = streamer.first_token_at or time.perf_counter()
+            yield {
+                "done": True,
+                "model_id": model_id,
+                "device": self.device,
+                "tokens": streamer.generated_tokens,
+                "time_to_first_token_ms": (first_token_at - start) * 1000,
+                "tokens_per_second": streamer.generated_tokens / elapsed if elapsed else 0.0
+            }
+        finally:
+            # Cliente desconectado o generación terminada: liberar el worker
+            cancelled.set()
+            
+    async def _single_event_stream(self, model_id: str, output: str, start: float) -> AsyncIterator[Dict[str, Any]]:
+        elapsed = time.perf_counter() - start
+        yield {"token": output}
+        yield {
+            "done": True,
+            "model_id": model_id,
+            "device": self.device,
+            "time_to_first_token_ms": elapsed * 1000
+        }
+        
+    async def _generate_batch(self, model_id: str, texts: List[str]) -> List[str]:
+        """
+        Genera salidas para un lote de textos con una sola llamada a generate
+        
+        Args:
+            model_id: ID del modelo a usar
+            texts: Textos de entrada del lote
+            
+        Returns:
+            Lista de textos decodificados en el mismo orden que texts
+        """
+        if self.model_executor.uses_processes:
+            # Cada proceso del pool carga y conserva su propia copia del modelo
+            model_path = await self._ensure_model_files(model_id)
+            return await self.model_executor.run(_generate_in_process, model_path, texts, self.device, self.use_mmap)
+            
+        # Obtener modelo y tokenizer residentes (o cargarlos una sola vez)
+        model, tokenizer = await self.model_registry.get(
+            model_id,
+            lambda: self._load_model(model_id)
+        )
+        
+        return await self.model_executor.run(_generate, model, tokenizer, texts, self.device)
+        
+    async def _load_model(self, model_id: str) -> Tuple[Tuple[Any, Any], int]:
+        """
+        Carga un modelo y su tokenizer desde NGC o caché local
+        
+        Args:
+            model_id: ID del modelo a cargar
+            
+        Returns:
+            Tupla ((modelo, tokenizer), tamaño en bytes del modelo)
+        """
+        model_path = await self._ensure_model_files(model_id)
+        model, tokenizer = await self.model_executor.run(_load_pretrained, model_path, self.device, self.use_mmap)
+        
+        return (model, tokenizer), self._model_nbytes(model)
+        
+    async def _ensure_model_files(self, model_id: str) -> str:
+        """Devuelve la ruta local del modelo, descargándolo si no existe"""
+        model_path = os.path.join(self.models_path, model_id)
+        if not os.path.exists(model_path):
+            await self.download_model(model_id, model_path)
+        elif not has_safetensors(model_path) and any(
+            os.path.exists(os.path.join(model_path, name)) for name in LEGACY_CHECKPOINTS
+        ):
+            # Modelos descargados antes de usar safetensors: se convierten una vez
+            with track("nvidia", "convert"):
+                await self.io_executor.run(convert_checkpoint, model_path)
+        return model_path
+        
+    @staticmethod
+    def _model_nbytes(model) -> int:
+        """Calcula los bytes ocupados por los parámetros y buffers del modelo"""
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+        
+    def _release_model(self, model_id: str, value: Any) -> None:
+        """Libera la memoria de GPU tras desalojar un modelo del registro"""
+        if self.device == "cuda":
+            torch.cuda.empty_cache()
+            
+    async def health_check(self) -> Dict[str, Any]:
+        """Dispositivo de inferencia, ruta de modelos y ocupación de los ejecutores"""
+        models_path_ok = bool(self.models_path) and os.path.isdir(self.models_path)
+        return {
+            "ok": models_path_ok,
+            "device": self.device,
+            "models_path": self.models_path,
+            "error": None if models_path_ok else "MODELS_PATH no configurado o inexistente",
+            "resident_models": self.model_registry.stats(),
+            "model_executor": self.model_executor.stats()
+        }
+        
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene los contadores del registro de modelos residentes
+        
+        Returns:
+            Dict con aciertos, fallos, desalojos y bytes residentes
+        """
+        return {
+            **self.model_registry.stats(),
+            "batching": self.batcher.stats(),
+            "model_executor": self.model_executor.stats(),
+            "io_executor": self.io_executor.stats()
+        }
+        
+    def close(self) -> None:
+        """Detiene los ejecutores de trabajo bloqueante"""
+        self.model_executor.shutdown()
+        self.io_executor.shutdown()
+        
     async def download_model(self, model_id: str, target_path: str) -> None:
         """
         Descarga un modelo desde NVIDIA NGC
@@ -62,32 +344,53 @@ class NvidiaService:
             target_path: Ruta donde guardar el modelo
         """
         try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            # Obtener URL de descarga
-            response = requests.get(
+            os.makedirs(os.path.dirname(target_path) or ".", exist_ok=True)
+            # Un solo worker del nodo descarga, convierte e instala cada
+            # modelo; los demás esperan y encuentran target_path ya en su sitio
+            async with file_lock(f"{target_path}.lock", self.downloader.lock_poll):
+                if os.path.exists(target_path):
+                    return
+                await self._download_and_install(model_id, target_path)
+        except Exception as e:
+            raise Exception(f"Error al descargar modelo: {str(e)}")
+
+    async def _download_and_install(self, model_id: str, target_path: str) -> None:
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+        # Obtener URL de descarga
+        with track("nvidia", "ngc_api"):
+            response = await self.io_executor.run(
+                requests.get,
                 f"{self.api_url}/models/{model_id}/download",
                 headers=headers
             )
             response.raise_for_status()
-            download_url = response.json()["download_url"]
-            
-            # Descargar modelo
-            os.makedirs(target_path, exist_ok=True)
-            response = requests.get(download_url, stream=True)
-            response.raise_for_status()
-            
-            model_file = os.path.join(target_path, "model.bin")
-            with open(model_file, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-                    
-        except Exception as e:
-            raise Exception(f"Error al descargar modelo: {str(e)}")
-            
+        download_info = response.json()
+
+        # Descargar en un directorio de staging: target_path solo existe
+        # cuando el modelo está completo y verificado
+        staging_path = f"{target_path}.download"
+        os.makedirs(staging_path, exist_ok=True)
+        try:
+            with track("nvidia", "download"):
+                await self.downloader.download(
+                    download_info["download_url"],
+                    os.path.join(staging_path, "model.bin"),
+                    sha256=download_info.get("sha256")
+                )
+            # Convertir a safetensors para poder mapearlo en memoria al cargar
+            with track("nvidia", "convert"):
+                await self.io_executor.run(convert_checkpoint, staging_path)
+
+            os.replace(staging_path, target_path)
+        finally:
+            # Si la descarga falló el staging se conserva para reanudarla
+            if os.path.exists(target_path):
+                shutil.rmtree(staging_path, ignore_errors=True)
+
     async def get_model_info(self, model_id: str) -> Dict[str, Any]:
         """
         Obtiene información sobre un modelo
@@ -104,11 +407,13 @@ class NvidiaService:
                 "Content-Type": "application/json"
             }
             
-            response = requests.get(
-                f"{self.api_url}/models/{model_id}",
-                headers=headers
-            )
-            response.raise_for_status()
+            with track("nvidia", "ngc_api"):
+                response = await self.io_executor.run(
+                    requests.get,
+                    f"{self.api_url}/models/{model_id}",
+                    headers=headers
+                )
+                response.raise_for_status()
             
             return response.json()
             
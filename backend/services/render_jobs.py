@@ -0,0 +1,413 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RENDER_TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+class ResolveBusy(Exception):
+    """Resolve está renderizando algo que no lanzó esta cola; el trabajo espera"""
+
+class RenderJobStore:
+    """
+    Almacén SQLite de la cola de renderizado de DaVinci Resolve.
+
+    Los trabajos pendientes sobreviven a reinicios del backend y la reserva
+    del siguiente trabajo se hace en una transacción, de modo que entre
+    todos los workers de gunicorn solo hay un renderizado a la vez.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("RENDER_JOBS_DB", "data/render_jobs.db")
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS render_jobs (
+                id TEXT PRIMARY KEY,
+                project_id TEXT NOT NULL,
+                render_preset TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                progress REAL NOT NULL DEFAULT 0,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS render_jobs_queue ON render_jobs (status, priority, created_at)"
+        )
+
+    def create(self, project_id: str, render_preset: str, priority: int = 0) -> Dict[str, Any]:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO render_jobs (id, project_id, render_preset, priority, status,
+                                            created_at, updated_at)
+                   VALUES (?, ?, ?, ?, 'queued', ?, ?)""",
+                (job_id, project_id, render_preset, priority, now, now)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM render_jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = self._to_dict(row)
+            if job["status"] == "queued":
+                (ahead,) = self._conn.execute(
+                    """SELECT COUNT(*) FROM render_jobs WHERE status = 'queued'
+                       AND (priority > ? OR (priority = ? AND created_at < ?))""",
+                    (job["priority"], job["priority"], job["created_at"])
+                ).fetchone()
+                job["position"] = ahead + 1
+        return job
+
+    def update(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = time.time()
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json.dumps(fields["result"])
+        columns = ", ".join(f"{key} = ?" for key in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE render_jobs SET {columns} WHERE id = ?",
+                (*fields.values(), job_id)
+            )
+
+    def heartbeat(self, job_id: str) -> None:
+        """Marca como vivo un trabajo en rendering sin tocar el resto de campos"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE render_jobs SET updated_at = ? WHERE id = ? AND status = 'rendering'",
+                (time.time(), job_id)
+            )
+
+    def list_jobs(self, statuses: Optional[List[str]] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Trabajos en el orden en que se renderizan: el activo y luego la cola por prioridad"""
+        where = f"WHERE status IN ({', '.join('?' * len(statuses))})" if statuses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT * FROM render_jobs {where}
+                    ORDER BY status != 'rendering', priority DESC, created_at LIMIT ?""",
+                (*(statuses or []), limit)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def claim_next(self, stale_after: float) -> Optional[Dict[str, Any]]:
+        """
+        Reserva el trabajo de más prioridad si no hay otro renderizándose
+
+        Un trabajo en rendering cuyo worker dejó de actualizarlo hace más de
+        stale_after segundos (reinicio o caída) vuelve a la cola antes de
+        elegir.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    """UPDATE render_jobs SET status = 'queued', progress = 0, updated_at = ?
+                       WHERE status = 'rendering' AND updated_at < ?""",
+                    (now, now - stale_after)
+                )
+                active = self._conn.execute(
+                    "SELECT 1 FROM render_jobs WHERE status = 'rendering' LIMIT 1"
+                ).fetchone()
+                row = None if active else self._conn.execute(
+                    """SELECT * FROM render_jobs WHERE status = 'queued'
+                       ORDER BY priority DESC, created_at LIMIT 1"""
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        """UPDATE render_jobs SET status = 'rendering', progress = 0,
+                                  attempts = attempts + 1, started_at = ?, updated_at = ?
+                           WHERE id = ?""",
+                        (now, now, row["id"])
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row is not None else None
+
+    def release(self, job_id: str, count_attempt: bool = True) -> None:
+        """
+        Devuelve a la cola un trabajo reservado
+
+        Con count_attempt=False (Resolve ocupado, el render ni empezó) la
+        reserva no cuenta como intento.
+        """
+        with self._lock:
+            self._conn.execute(
+                """UPDATE render_jobs SET status = 'queued', progress = 0, updated_at = ?,
+                          attempts = attempts - ?
+                   WHERE id = ? AND status = 'rendering'""",
+                (time.time(), 0 if count_attempt else 1, job_id)
+            )
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """
+        Cancela un trabajo en cola o pide detener el que se está renderizando
+
+        Returns:
+            El estado tras la petición, o None si el trabajo no existe
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """UPDATE render_jobs SET status = 'cancelled', updated_at = ?
+                   WHERE id = ? AND status = 'queued'""",
+                (now, job_id)
+            )
+            self._conn.execute(
+                """UPDATE render_jobs SET cancel_requested = 1, updated_at = ?
+                   WHERE id = ? AND status = 'rendering'""",
+                (now, job_id)
+            )
+            row = self._conn.execute("SELECT status FROM render_jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["status"] if row else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM render_jobs GROUP BY status"
+            ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+class RenderJobManager:
+    """
+    Cola de renderizado con prioridad para DaVinci Resolve.
+
+    render_video() solo registra el trabajo. Un único bucle por worker
+    reserva el siguiente trabajo, lo lanza en el hilo que posee el handle de
+    Resolve y sondea su porcentaje cada RENDER_POLL_INTERVAL segundos,
+    guardándolo en el almacén y avisando a los suscriptores (SSE).
+
+    Mientras dura el trabajo, una tarea aparte escribe un latido cada
+    tercio de RENDER_STALE_AFTER, también durante start_render (cargar un
+    proyecto grande puede tardar más que eso), para que ningún worker lo
+    reclame como huérfano. Las llamadas al almacén SQLite van en
+    asyncio.to_thread para no bloquear el bucle de eventos.
+    """
+
+    def __init__(self, davinci_service: Any, store: Optional[RenderJobStore] = None):
+        self.davinci = davinci_service
+        self.store = store or RenderJobStore()
+        self.poll_interval = float(os.getenv("RENDER_POLL_INTERVAL", "1"))
+        self.idle_tick = float(os.getenv("RENDER_QUEUE_TICK", "2"))
+        self.job_timeout = float(os.getenv("RENDER_JOB_TIMEOUT", str(6 * 3600)))
+        self.max_attempts = int(os.getenv("RENDER_MAX_ATTEMPTS", "3"))
+        # Sin latido durante este tiempo, un trabajo en rendering se da por huérfano
+        self.stale_after = float(os.getenv("RENDER_STALE_AFTER", str(max(30.0, 10 * self.poll_interval))))
+        self.heartbeat_interval = self.stale_after / 3
+        self._worker: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._current: Optional[str] = None
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        """Arranca el bucle de renderizado; los trabajos persistidos se retoman"""
+        if self._worker is None:
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    def submit(self, project_id: str, render_preset: str, priority: int = 0) -> Dict[str, Any]:
+        job = self.store.create(project_id, render_preset, priority)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def list_jobs(self, active_only: bool = True) -> List[Dict[str, Any]]:
+        return self.store.list_jobs(["rendering", "queued"] if active_only else None)
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        status = self.store.cancel(job_id)
+        self._notify(job_id)
+        return status
+
+    async def wait_for_change(self, job_id: str, timeout: float) -> None:
+        """Espera a que este worker actualice el trabajo o venza timeout"""
+        event = self._changed.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            event.clear()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                job = await self._claim_next()
+            except Exception as e:
+                logger.error(f"Error reservando trabajo de renderizado: {str(e)}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.idle_tick)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            self._current = job["id"]
+            try:
+                await self._render(job)
+            except ResolveBusy as e:
+                logger.info(f"Renderizado {job['id']} en espera: {str(e)}")
+                await asyncio.to_thread(self.store.release, job["id"], count_attempt=False)
+                await asyncio.sleep(self.idle_tick)
+            except asyncio.CancelledError:
+                # Parada del backend: se detiene el render y el trabajo vuelve a
+                # la cola para el próximo arranque
+                try:
+                    await self.davinci.run(self.davinci.stop_render)
+                except Exception as e:
+                    logger.warning(f"Error deteniendo el renderizado {job['id']}: {str(e)}")
+                await asyncio.to_thread(self.store.release, job["id"])
+                raise
+            finally:
+                self._current = None
+
+    async def _claim_next(self) -> Optional[Dict[str, Any]]:
+        claim = asyncio.ensure_future(asyncio.to_thread(self.store.claim_next, self.stale_after))
+        try:
+            return await asyncio.shield(claim)
+        except asyncio.CancelledError:
+            # La reserva sigue en su hilo: si llega a reservar, el trabajo
+            # vuelve a la cola en vez de esperar a quedar huérfano
+            (claimed,) = await asyncio.gather(claim, return_exceptions=True)
+            if isinstance(claimed, dict):
+                await asyncio.to_thread(self.store.release, claimed["id"], count_attempt=False)
+            raise
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.store.heartbeat, job_id)
+            except Exception as e:
+                logger.warning(f"Error escribiendo el latido del renderizado {job_id}: {str(e)}")
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def _render(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        self._notify(job_id)
+        if job["attempts"] > self.max_attempts:
+            await self._finish(job_id, "failed", error="Demasiados intentos interrumpidos")
+            return
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            render_id = await self.davinci.run(self.davinci.start_render, job["project_id"], job["render_preset"])
+            last_progress = None
+            while True:
+                await asyncio.sleep(self.poll_interval)
+                status = await self.davinci.run(self.davinci.get_render_status, render_id)
+                current = await asyncio.to_thread(self.store.get, job_id)
+                if current["cancel_requested"]:
+                    await self.davinci.run(self.davinci.stop_render)
+                    await self._finish(job_id, "cancelled")
+                    return
+                if status["status"] == "completed":
+                    await self._finish(job_id, "completed", result=self.davinci.render_result(job["project_id"]))
+                    return
+                if status["status"] == "failed":
+                    await self._finish(job_id, "failed", error=status.get("error") or "El renderizado falló")
+                    return
+                if time.time() - current["started_at"] > self.job_timeout:
+                    await self.davinci.run(self.davinci.stop_render)
+                    await self._finish(job_id, "failed", error="Tiempo de espera agotado")
+                    return
+                if status["progress"] != last_progress:
+                    last_progress = status["progress"]
+                    await asyncio.to_thread(self.store.update, job_id, progress=status["progress"])
+                    self._notify(job_id)
+        except (asyncio.CancelledError, ResolveBusy):
+            raise
+        except Exception as e:
+            logger.error(f"Error en el renderizado {job_id}: {str(e)}")
+            await self._finish(job_id, "failed", error=str(e))
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+    async def _finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+                error: Optional[str] = None) -> None:
+        fields: Dict[str, Any] = {"status": status, "result": result, "error": error}
+        if status == "completed":
+            fields["progress"] = 100
+            self.completed += 1
+        elif status == "failed":
+            self.failed += 1
+        await asyncio.to_thread(self.store.update, job_id, **fields)
+        self._notify(job_id)
+
+    def _notify(self, job_id: str) -> None:
+        event = self._changed.get(job_id)
+        if event is not None:
+            event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "current": self._current,
+            "jobs": self.store.counts(),
+            "completed": self.completed,
+            "failed": self.failed,
+            "poll_interval": self.poll_interval
+        }
+
+def public_render_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos de un trabajo de renderizado que se exponen a los clientes"""
+    return {
+        "job_id": job["id"],
+        "project_id": job["project_id"],
+        "render_preset": job["render_preset"],
+        "priority": job["priority"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "position": job.get("position"),
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "updated_at": job["updated_at"]
+    }
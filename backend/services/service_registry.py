@@ -0,0 +1,179 @@
+import os
+import time
+import asyncio
+import inspect
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class ServiceUnavailable(Exception):
+    """La integración no se pudo inicializar; el cliente debe reintentar más tarde"""
+
+    def __init__(self, name: str, error: str, retry_after: int):
+        super().__init__(f"Servicio {name} no disponible: {error}")
+        self.name = name
+        self.retry_after = retry_after
+
+class LazyService:
+    """
+    Servicio que se construye en el primer uso.
+
+    La construcción (imports pesados incluidos) se hace en un hilo para no
+    bloquear el event loop y las llamadas concurrentes esperan a la misma.
+    Si falla, el error se recuerda y no se reintenta hasta pasados
+    SERVICE_RETRY_INTERVAL segundos, de modo que una integración caída
+    responde rápido con ServiceUnavailable sin afectar a las demás.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        on_ready: Optional[Callable[[Any], Awaitable[None]]] = None,
+        retry_interval: Optional[float] = None
+    ):
+        self.name = name
+        self.factory = factory
+        self.on_ready = on_ready
+        self.retry_interval = retry_interval if retry_interval is not None else float(
+            os.getenv("SERVICE_RETRY_INTERVAL", "30")
+        )
+        self.instance: Any = None
+        self.error: Optional[str] = None
+        self.init_ms: Optional[float] = None
+        self._failed_at: Optional[float] = None
+        self._initializing: Optional[asyncio.Future] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.instance is not None
+
+    async def get(self) -> Any:
+        """
+        Devuelve la instancia, construyéndola si hace falta
+
+        Raises:
+            ServiceUnavailable: si la construcción falla o falló hace poco
+        """
+        if self.instance is not None:
+            return self.instance
+        if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_interval:
+            raise ServiceUnavailable(self.name, self.error, self._retry_after())
+        if self._initializing is None:
+            self._initializing = asyncio.ensure_future(self._initialize())
+            self._initializing.add_done_callback(lambda _: setattr(self, "_initializing", None))
+        return await asyncio.shield(self._initializing)
+
+    async def _initialize(self) -> Any:
+        start = time.perf_counter()
+        try:
+            instance = await asyncio.to_thread(self.factory)
+            if self.on_ready is not None:
+                await self.on_ready(instance)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {str(e)}"
+            self._failed_at = time.monotonic()
+            logger.error(f"Error inicializando el servicio {self.name}: {self.error}")
+            raise ServiceUnavailable(self.name, self.error, self._retry_after())
+        self.init_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.instance = instance
+        self.error = None
+        self._failed_at = None
+        logger.info(f"Servicio {self.name} inicializado en {self.init_ms} ms")
+        return instance
+
+    def _retry_after(self) -> int:
+        elapsed = time.monotonic() - self._failed_at if self._failed_at is not None else 0
+        return max(1, int(self.retry_interval - elapsed + 0.999))
+
+    async def status(self, probe: bool = False, timeout: float = 2.0) -> Dict[str, Any]:
+        """
+        Estado de inicialización y, con probe, comprobación activa
+
+        La comprobación llama a health_check() de la instancia si lo tiene;
+        nunca construye un servicio que aún no se ha usado.
+        """
+        if self.ready:
+            status = {"status": "ready", "init_ms": self.init_ms}
+        elif self.error is not None:
+            status = {"status": "unavailable", "error": self.error, "retry_after": self._retry_after()}
+        else:
+            status = {"status": "initializing" if self._initializing is not None else "not_initialized"}
+        health_check = getattr(self.instance, "health_check", None)
+        if probe and health_check is not None:
+            try:
+                status["probe"] = await asyncio.wait_for(health_check(), timeout)
+            except asyncio.TimeoutError:
+                status["probe"] = {"ok": False, "error": f"Sin respuesta en {timeout} s"}
+            except Exception as e:
+                status["probe"] = {"ok": False, "error": str(e)}
+            if not status["probe"].get("ok", False):
+                status["status"] = "degraded"
+        return status
+
+    async def close(self) -> None:
+        """Cierra la instancia si llegó a construirse"""
+        if self.instance is None:
+            return
+        close = getattr(self.instance, "close", None)
+        if close is not None:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+
+class ServiceRegistry:
+    """
+    Servicios de la aplicación con inicialización diferida e independiente.
+
+    SERVICE_WARMUP lista los servicios ("all" para todos) que se inicializan
+    en segundo plano al arrancar, sin retrasar el arranque del worker.
+    """
+
+    def __init__(self):
+        self.services: Dict[str, LazyService] = {}
+        self.warmup = [
+            name.strip() for name in os.getenv("SERVICE_WARMUP", "davinci,hostinger").split(",") if name.strip()
+        ]
+        self.probe_timeout = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+        self._warmup_task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, factory: Callable[[], Any], **kwargs) -> LazyService:
+        self.services[name] = LazyService(name, factory, **kwargs)
+        return self.services[name]
+
+    async def get(self, name: str) -> Any:
+        return await self.services[name].get()
+
+    def start_warmup(self) -> None:
+        names: List[str] = list(self.services) if "all" in self.warmup else [
+            name for name in self.warmup if name in self.services
+        ]
+
+        async def warm(name: str) -> None:
+            try:
+                await self.services[name].get()
+            except ServiceUnavailable:
+                pass
+
+        if names:
+            self._warmup_task = asyncio.ensure_future(asyncio.gather(*(warm(name) for name in names)))
+
+    async def health(self, probe: bool = False) -> Dict[str, Any]:
+        names = list(self.services)
+        statuses = await asyncio.gather(
+            *(self.services[name].status(probe, self.probe_timeout) for name in names)
+        )
+        services = dict(zip(names, statuses))
+        healthy = all(s["status"] in ("ready", "not_initialized", "initializing") for s in statuses)
+        return {"status": "ok" if healthy else "degraded", "services": services}
+
+    async def close(self) -> None:
+        if self._warmup_task is not None:
+            self._warmup_task.cancel()
+            await asyncio.gather(self._warmup_task, return_exceptions=True)
+        for service in self.services.values():
+            try:
+                await service.close()
+            except Exception as e:
+                logger.warning(f"Error cerrando el servicio {service.name}: {str(e)}")
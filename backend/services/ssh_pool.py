@@ -0,0 +1,261 @@
+import os
+import time
+import select
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import paramiko
+
+from .metrics import track
+
+logger = logging.getLogger(__name__)
+
+def _read_output(channel: paramiko.Channel, timeout: Optional[float],
+                 chunk_bytes: int = 32768) -> Tuple[bytes, bytes]:
+    """
+    Lee stdout y stderr de un canal a la vez hasta el EOF
+
+    Leer uno entero antes que el otro se bloquea si el comando llena la
+    ventana del canal con el segundo: el servidor deja de enviar y el
+    primero no termina nunca.
+
+    Raises:
+        TimeoutError: si pasan timeout segundos sin terminar
+    """
+    stdout: List[bytes] = []
+    stderr: List[bytes] = []
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        while channel.recv_ready():
+            stdout.append(channel.recv(chunk_bytes))
+        while channel.recv_stderr_ready():
+            stderr.append(channel.recv_stderr(chunk_bytes))
+        if channel.eof_received or channel.closed:
+            if not channel.recv_ready() and not channel.recv_stderr_ready():
+                return b"".join(stdout), b"".join(stderr)
+            continue
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            raise TimeoutError(f"Sin respuesta del comando remoto tras {timeout} s")
+        # El descriptor del canal se activa con datos en cualquiera de los dos flujos
+        select.select([channel], [], [], remaining)
+
+class SSHConnectionManager:
+    """
+    Conexión SSH persistente y compartida con un servidor.
+
+    Mantiene un único transporte con keep-alive sobre el que se abren los
+    canales (exec y SFTP), limitados a SSH_MAX_CHANNELS simultáneos. Los
+    clientes SFTP se reutilizan entre operaciones. Antes de cada uso se
+    comprueba que el transporte sigue vivo y, si no, se reconecta; tras
+    SSH_IDLE_TIMEOUT segundos sin uso la conexión se cierra.
+
+    Todos los métodos son bloqueantes: desde asyncio deben llamarse con
+    asyncio.to_thread.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 22,
+        username: Optional[str] = None,
+        key_filename: Optional[str] = None,
+        password: Optional[str] = None
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.key_filename = key_filename
+        self.password = password
+        self.keepalive = int(os.getenv("SSH_KEEPALIVE_INTERVAL", "30"))
+        self.max_channels = int(os.getenv("SSH_MAX_CHANNELS", "8"))
+        self.idle_timeout = float(os.getenv("SSH_IDLE_TIMEOUT", "300"))
+        self.connect_timeout = float(os.getenv("SSH_CONNECT_TIMEOUT", "10"))
+        self._client: Optional[paramiko.SSHClient] = None
+        self._generation = 0
+        self._idle_sftp: List[Tuple[int, paramiko.SFTPClient]] = []
+        self._channels = threading.BoundedSemaphore(self.max_channels)
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._last_used = time.monotonic()
+        self._reaper: Optional[threading.Thread] = None
+        self.connects = 0
+        self.commands = 0
+        self.sftp_reused = 0
+
+    def _connect(self) -> paramiko.SSHClient:
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        with track("hostinger", "ssh_connect"):
+            client.connect(
+                self.host,
+                port=self.port,
+                username=self.username,
+                key_filename=self.key_filename,
+                password=self.password,
+                timeout=self.connect_timeout,
+                look_for_keys=self.key_filename is None and self.password is None
+            )
+        client.get_transport().set_keepalive(self.keepalive)
+        return client
+
+    def _healthy(self) -> bool:
+        transport = self._client.get_transport() if self._client is not None else None
+        return transport is not None and transport.is_active() and transport.is_authenticated()
+
+    def _get_client(self) -> Tuple[paramiko.SSHClient, int]:
+        """Cliente conectado y su generación; reconecta si el transporte murió"""
+        with self._lock:
+            if not self._healthy():
+                if self._client is not None:
+                    logger.warning(f"Conexión SSH con {self.host} perdida, reconectando")
+                    self._discard()
+                self._client = self._connect()
+                self._generation += 1
+                self.connects += 1
+                if self._reaper is None or not self._reaper.is_alive():
+                    self._reaper = threading.Thread(target=self._reap_idle, daemon=True)
+                    self._reaper.start()
+            return self._client, self._generation
+
+    def _discard(self) -> None:
+        for _, sftp in self._idle_sftp:
+            sftp.close()
+        self._idle_sftp.clear()
+        if self._client is not None:
+            self._client.close()
+        self._client = None
+
+    @contextmanager
+    def _channel_slot(self) -> Iterator[None]:
+        self._channels.acquire()
+        with self._lock:
+            self._in_use += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                self._last_used = time.monotonic()
+            self._channels.release()
+
+    def exec(self, command: str, timeout: Optional[float] = None) -> Tuple[int, str, str]:
+        """
+        Ejecuta un comando remoto
+
+        Returns:
+            (código de salida, stdout, stderr)
+        """
+        with self._channel_slot():
+            client, generation = self._get_client()
+            try:
+                channel = client.get_transport().open_session(timeout=self.connect_timeout)
+            except (paramiko.SSHException, EOFError, OSError):
+                # El transporte murió entre la comprobación y la apertura: un reintento
+                with self._lock:
+                    if generation == self._generation:
+                        self._discard()
+                client, _ = self._get_client()
+                channel = client.get_transport().open_session(timeout=self.connect_timeout)
+            self.commands += 1
+            with channel, track("hostinger", "ssh_exec"):
+                channel.settimeout(timeout)
+                channel.exec_command(command)
+                stdout, stderr = _read_output(channel, timeout)
+                # surrogateescape: sin pérdida, encode(errors="surrogateescape")
+                # devuelve los bytes originales (logs con bytes que no son UTF-8)
+                return (channel.recv_exit_status(), stdout.decode(errors="surrogateescape"),
+                        stderr.decode(errors="replace"))
+
+    @contextmanager
+    def sftp(self) -> Iterator[paramiko.SFTPClient]:
+        """Cliente SFTP del pool; vuelve al pool al salir del bloque"""
+        with self._channel_slot():
+            client, generation = self._get_client()
+            sftp = None
+            with self._lock:
+                while self._idle_sftp and sftp is None:
+                    idle_generation, candidate = self._idle_sftp.pop()
+                    if idle_generation == generation and not candidate.sock.closed:
+                        sftp = candidate
+                        self.sftp_reused += 1
+                    else:
+                        candidate.close()
+            if sftp is None:
+                with track("hostinger", "sftp_open"):
+                    sftp = client.open_sftp()
+            try:
+                yield sftp
+            except (FileNotFoundError, PermissionError):
+                self._release_sftp(generation, sftp)
+                raise
+            except BaseException:
+                # El canal puede haber quedado con peticiones a medias: no reutilizarlo
+                sftp.close()
+                raise
+            self._release_sftp(generation, sftp)
+
+    def _release_sftp(self, generation: int, sftp: paramiko.SFTPClient) -> None:
+        with self._lock:
+            if generation == self._generation and not sftp.sock.closed:
+                self._idle_sftp.append((generation, sftp))
+            else:
+                sftp.close()
+
+    def _reap_idle(self) -> None:
+        while True:
+            time.sleep(max(1.0, self.idle_timeout / 4))
+            with self._lock:
+                if self._client is None:
+                    return
+                if self._in_use == 0 and time.monotonic() - self._last_used > self.idle_timeout:
+                    logger.info(f"Cerrando conexión SSH inactiva con {self.host}")
+                    self._discard()
+                    return
+
+    def health_check(self) -> bool:
+        """Comprueba (y restablece si hace falta) la conexión"""
+        try:
+            client, _ = self._get_client()
+            client.get_transport().send_ignore()
+            return True
+        except Exception as e:
+            logger.warning(f"Comprobación SSH con {self.host} fallida: {str(e)}")
+            return False
+
+    def close(self) -> None:
+        with self._lock:
+            self._discard()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "host": self.host,
+                "connected": self._healthy(),
+                "channels_in_use": self._in_use,
+                "max_channels": self.max_channels,
+                "idle_sftp": len(self._idle_sftp),
+                "connects": self.connects,
+                "commands": self.commands,
+                "sftp_reused": self.sftp_reused,
+                "idle_s": round(time.monotonic() - self._last_used, 1)
+            }
+
+_managers: Dict[Tuple[Any, ...], SSHConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+def get_ssh_manager(
+    host: str,
+    port: int = 22,
+    username: Optional[str] = None,
+    key_filename: Optional[str] = None
+) -> SSHConnectionManager:
+    """Gestor compartido por proceso para un mismo servidor y usuario"""
+    key = (host, port, username, key_filename)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = SSHConnectionManager(host, port, username, key_filename)
+        return manager
@@ -0,0 +1,375 @@
+import os
+import re
+import math
+import time
+import uuid
+import hashlib
+import datetime
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Tipos de evento que envían los clientes WebGL. "heartbeat" solo sirve para
+# que la duración de una sesión sin interacciones llegue hasta el final
+EVENT_TYPES = ("view", "interaction", "heartbeat", "session_end")
+_TYPE_CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+VIEW, INTERACTION = _TYPE_CODES["view"], _TYPE_CODES["interaction"]
+
+# Columnas de cada partición: nombre -> tipo de los valores en disco
+COLUMNS = {
+    "ts": np.dtype("<f8"),       # segundos epoch (UTC)
+    "session": np.dtype("<u8"),  # hash de 64 bits del session_id
+    "type": np.dtype("u1")       # índice en EVENT_TYPES
+}
+
+DAY_SECONDS = 86400
+MINUTES_PER_DAY = 1440
+# Eventos fuera de esta ventana respecto a la hora del servidor se rechazan:
+# un reloj de cliente roto no debe crear particiones en 1970 o en 2099
+MAX_EVENT_AGE = 7 * DAY_SECONDS
+MAX_EVENT_SKEW = 3600
+MAX_QUERY_DAYS = 366
+# Resumen guardado junto a las columnas de cada partición de días pasados
+SUMMARY_FILE = "summary.npz"
+
+_EXPERIENCE_ID = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,127}$")
+_EMPTY_IDS = np.empty(0, dtype=np.uint64)
+_EMPTY_TS = np.empty(0, dtype=np.float64)
+
+def session_hash(session_id: Any) -> int:
+    """Hash estable entre procesos (no el hash() de Python); 0 si el id no es válido"""
+    if not isinstance(session_id, str) or not session_id:
+        return 0
+    return int.from_bytes(hashlib.blake2b(session_id.encode(), digest_size=8).digest(), "little") or 1
+
+def _merge_sessions(ids: np.ndarray, first: np.ndarray, last: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Agrupa por sesión: primer y último instante de cada una, ordenadas por id"""
+    if len(ids) == 0:
+        return _EMPTY_IDS, _EMPTY_TS, _EMPTY_TS
+    order = np.argsort(ids)
+    ids = ids[order]
+    starts = np.flatnonzero(np.concatenate(([True], ids[1:] != ids[:-1])))
+    first_sorted = first[order]
+    last_sorted = first_sorted if last is first else last[order]
+    return ids[starts], np.minimum.reduceat(first_sorted, starts), np.maximum.reduceat(last_sorted, starts)
+
+class _PartitionSummary:
+    """
+    Agregados de una partición (día, experiencia), actualizables por incrementos
+
+    rows guarda cuántas filas de cada segmento se han sumado ya: al volver a
+    consultar solo se leen las filas nuevas, así el día en curso no se
+    recorre entero en cada consulta y los días cerrados no se vuelven a leer.
+    """
+
+    ARRAYS = ("events_per_minute", "interactions_per_minute", "session_ids", "session_first", "session_last")
+
+    def __init__(self, day: int):
+        self.day = day
+        self.rows: Dict[str, int] = {}
+        self.events = 0
+        self.views = 0
+        self.interactions = 0
+        self.events_per_minute = np.zeros(MINUTES_PER_DAY, dtype=np.int64)
+        self.interactions_per_minute = np.zeros(MINUTES_PER_DAY, dtype=np.int64)
+        self.session_ids = _EMPTY_IDS
+        self.session_first = _EMPTY_TS
+        self.session_last = _EMPTY_TS
+
+    def add(self, ts: np.ndarray, sessions: np.ndarray, types: np.ndarray) -> None:
+        # Multiplicar y truncar es varias veces más rápido que // con float64
+        minutes = np.clip(((ts - self.day * DAY_SECONDS) * (1 / 60)).astype(np.int64), 0, MINUTES_PER_DAY - 1)
+        is_interaction = types == INTERACTION
+        self.events += len(ts)
+        self.views += int(np.count_nonzero(types == VIEW))
+        self.interactions += int(np.count_nonzero(is_interaction))
+        self.events_per_minute += np.bincount(minutes, minlength=MINUTES_PER_DAY)
+        self.interactions_per_minute += np.bincount(minutes[is_interaction], minlength=MINUTES_PER_DAY)
+        if len(self.session_ids):
+            merged = _merge_sessions(np.concatenate((self.session_ids, sessions)),
+                                     np.concatenate((self.session_first, ts)),
+                                     np.concatenate((self.session_last, ts)))
+        else:
+            merged = _merge_sessions(sessions, ts, ts)
+        self.session_ids, self.session_first, self.session_last = merged
+
+    def save(self, path: str) -> None:
+        # Escritura atómica: otro worker puede estar leyendo o guardando el mismo resumen
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp,
+            totals=np.array([self.day, self.events, self.views, self.interactions], dtype=np.int64),
+            segments=np.array(list(self.rows), dtype=str),
+            segment_rows=np.array(list(self.rows.values()), dtype=np.int64),
+            **{name: getattr(self, name) for name in self.ARRAYS}
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["_PartitionSummary"]:
+        try:
+            with np.load(path) as data:
+                day, events, views, interactions = (int(value) for value in data["totals"])
+                summary = cls(day)
+                summary.events, summary.views, summary.interactions = events, views, interactions
+                summary.rows = dict(zip(data["segments"].tolist(), data["segment_rows"].tolist()))
+                for name in cls.ARRAYS:
+                    setattr(summary, name, data[name])
+                return summary
+        except (OSError, KeyError, ValueError):
+            return None
+
+class UnityAnalyticsStore:
+    """
+    Almacén columnar en disco de los eventos de interacción de Unity WebGL.
+
+    Cada partición es un directorio <día UTC>/<experience_id> con un archivo
+    por columna (COLUMNS) y segmento; cada proceso escribe en su propio
+    segmento, así los workers de gunicorn añaden eventos sin bloquearse y
+    las columnas de un segmento siempre están alineadas. Un lote se
+    convierte a arrays de NumPy y se escribe con una llamada por columna.
+
+    get_analytics agrega con NumPy los resúmenes de cada partición del
+    intervalo (visitas, histogramas por minuto y primer y último instante
+    de cada sesión), que se guardan en memoria y se amplían con las filas
+    nuevas. Los de días pasados también se guardan en la partición
+    (SUMMARY_FILE), así un worker recién arrancado no vuelve a leer las
+    columnas de un mes entero.
+    """
+
+    def __init__(self, base_path: Optional[str] = None, cache_partitions: Optional[int] = None):
+        self.base_path = base_path or os.getenv("UNITY_ANALYTICS_PATH", "data/unity_analytics")
+        self.cache_partitions = cache_partitions or int(os.getenv("UNITY_ANALYTICS_CACHE_PARTITIONS", "4096"))
+        self._segment = self._new_segment()
+        self._write_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._summaries: "OrderedDict[Tuple[str, int], _PartitionSummary]" = OrderedDict()
+        self._session_hashes: Dict[str, int] = {}
+        self.accepted = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _new_segment() -> str:
+        return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    @staticmethod
+    def check_experience_id(experience_id: str) -> None:
+        # El id forma parte de la ruta de la partición
+        if not isinstance(experience_id, str) or not _EXPERIENCE_ID.match(experience_id):
+            raise ValueError(f"experience_id no válido: {experience_id!r}")
+
+    def _partition_path(self, day: int, experience_id: str) -> str:
+        date = datetime.date.fromordinal(datetime.date(1970, 1, 1).toordinal() + day)
+        return os.path.join(self.base_path, date.isoformat(), experience_id)
+
+    def _hash(self, session_id: Any) -> int:
+        value = self._session_hashes.get(session_id) if isinstance(session_id, str) else None
+        if value is None:
+            value = session_hash(session_id)
+            if value and isinstance(session_id, str):
+                if len(self._session_hashes) >= 100000:
+                    self._session_hashes.clear()
+                self._session_hashes[session_id] = value
+        return value
+
+    def append(self, experience_id: str, events: List[Any], session_id: Optional[str] = None,
+               now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Añade un lote de eventos de una experiencia
+
+        Cada evento es {"type": ..., "timestamp": epoch en segundos o en
+        milisegundos, "session_id": ...}; sin timestamp se usa la hora de
+        llegada y sin session_id el del lote.
+        Los eventos no válidos se descartan sin rechazar el resto del lote.
+
+        Returns:
+            Dict con los eventos aceptados y rechazados
+        """
+        self.check_experience_id(experience_id)
+        if not isinstance(events, list):
+            raise ValueError("events debe ser una lista")
+        now = time.time() if now is None else now
+        n = len(events)
+        if n == 0:
+            return {"accepted": 0, "rejected": 0}
+
+        events = [event if isinstance(event, dict) else {} for event in events]
+        try:
+            codes = [_TYPE_CODES.get(event.get("type"), 255) for event in events]
+        except TypeError:
+            codes = [_TYPE_CODES.get(event.get("type"), 255) if isinstance(event.get("type"), str) else 255
+                     for event in events]
+        types = np.array(codes, dtype=np.uint8)
+        timestamps = [event.get("timestamp", now) for event in events]
+        try:
+            ts = np.array(timestamps, dtype=np.float64)
+        except (TypeError, ValueError):
+            ts = np.array([_to_float(value) for value in timestamps], dtype=np.float64)
+        # Date.now() de JavaScript da milisegundos
+        ts = np.where(ts > 1e11, ts / 1000, ts)
+        default_session = self._hash(session_id)
+        if any("session_id" in event for event in events):
+            sessions = np.array([self._hash(event.get("session_id", session_id)) for event in events], dtype=np.uint64)
+        else:
+            sessions = np.full(n, default_session, dtype=np.uint64)
+
+        valid = (types != 255) & (sessions != 0) & (ts >= now - MAX_EVENT_AGE) & (ts <= now + MAX_EVENT_SKEW)
+        accepted = int(np.count_nonzero(valid))
+        if accepted < n:
+            ts, sessions, types = ts[valid], sessions[valid], types[valid]
+
+        if accepted:
+            days = (ts // DAY_SECONDS).astype(np.int64)
+            first_day = days[0]
+            if days[-1] == first_day and (days == first_day).all():
+                self._write(int(first_day), experience_id, {"ts": ts, "session": sessions, "type": types})
+            else:
+                for day in np.unique(days):
+                    selected = days == day
+                    self._write(int(day), experience_id,
+                                {"ts": ts[selected], "session": sessions[selected], "type": types[selected]})
+
+        self.accepted += accepted
+        self.rejected += n - accepted
+        return {"accepted": accepted, "rejected": n - accepted}
+
+    def _write(self, day: int, experience_id: str, columns: Dict[str, np.ndarray]) -> None:
+        path = self._partition_path(day, experience_id)
+        with self._write_lock:
+            os.makedirs(path, exist_ok=True)
+            try:
+                for name, dtype in COLUMNS.items():
+                    with open(os.path.join(path, f"{self._segment}.{name}"), "ab") as f:
+                        f.write(np.ascontiguousarray(columns[name], dtype=dtype).data)
+            except Exception:
+                # Una escritura a medias desalinearía las columnas del
+                # segmento: los lotes siguientes van a uno nuevo
+                self._segment = self._new_segment()
+                raise
+
+    def _summary(self, day: int, experience_id: str) -> Optional[_PartitionSummary]:
+        path = self._partition_path(day, experience_id)
+        try:
+            names = os.listdir(path)
+        except FileNotFoundError:
+            return None
+
+        # Filas completas de cada segmento: las de la columna más corta
+        segments: Dict[str, int] = {}
+        for name in names:
+            segment, _, column = name.rpartition(".")
+            if column in COLUMNS:
+                rows = os.path.getsize(os.path.join(path, name)) // COLUMNS[column].itemsize
+                segments[segment] = min(rows, segments.get(segment, rows))
+
+        key = (experience_id, day)
+        summary_path = os.path.join(path, SUMMARY_FILE)
+        with self._cache_lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = _PartitionSummary.load(summary_path) if SUMMARY_FILE in names else None
+                summary = self._summaries[key] = summary or _PartitionSummary(day)
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.cache_partitions:
+                self._summaries.popitem(last=False)
+
+            updated = False
+            for segment, rows in segments.items():
+                seen = summary.rows.get(segment, 0)
+                if rows <= seen:
+                    continue
+                columns = {
+                    name: np.fromfile(os.path.join(path, f"{segment}.{name}"), dtype=dtype,
+                                      count=rows - seen, offset=seen * dtype.itemsize)
+                    for name, dtype in COLUMNS.items()
+                }
+                summary.add(columns["ts"], columns["session"], columns["type"])
+                summary.rows[segment] = rows
+                updated = True
+            # El día en curso cambia en cada consulta: solo se guardan los pasados
+            if updated and day < time.time() // DAY_SECONDS:
+                summary.save(summary_path)
+        return summary
+
+    def get_analytics(self, experience_id: str, days: int = 30, end: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Analíticas de una experiencia en los días [end - days + 1, end] (UTC)
+
+        Args:
+            experience_id: ID de la experiencia
+            days: Número de días del intervalo
+            end: Último día (YYYY-MM-DD), por defecto hoy
+
+        Returns:
+            Dict con visitas, sesiones, percentiles de duración de sesión e
+            interacciones por minuto
+        """
+        self.check_experience_id(experience_id)
+        if not 1 <= days <= MAX_QUERY_DAYS:
+            raise ValueError(f"days debe estar entre 1 y {MAX_QUERY_DAYS}")
+        try:
+            end_date = datetime.date.fromisoformat(end) if end else datetime.datetime.now(datetime.timezone.utc).date()
+        except ValueError:
+            raise ValueError(f"end debe ser una fecha YYYY-MM-DD: {end!r}")
+        last_day = (end_date - datetime.date(1970, 1, 1)).days
+        first_day = last_day - days + 1
+
+        summaries = [s for s in (self._summary(day, experience_id) for day in range(first_day, last_day + 1))
+                     if s is not None]
+
+        views = sum(s.views for s in summaries)
+        interactions = sum(s.interactions for s in summaries)
+        events = sum(s.events for s in summaries)
+        # Una sesión que cruza la medianoche aparece en dos particiones
+        session_ids, first, last = _merge_sessions(
+            np.concatenate([_EMPTY_IDS] + [s.session_ids for s in summaries]),
+            np.concatenate([_EMPTY_TS] + [s.session_first for s in summaries]),
+            np.concatenate([_EMPTY_TS] + [s.session_last for s in summaries])
+        )
+        durations = last - first
+        if len(durations):
+            p50, p90, p99 = np.percentile(durations, (50, 90, 99))
+            avg_duration = float(durations.mean())
+        else:
+            p50 = p90 = p99 = avg_duration = 0.0
+
+        # Interacciones por minuto sobre los minutos con actividad
+        if summaries:
+            active = np.concatenate([s.events_per_minute for s in summaries]) > 0
+            per_minute = np.concatenate([s.interactions_per_minute for s in summaries])[active]
+        else:
+            per_minute = np.empty(0, dtype=np.int64)
+        if len(per_minute):
+            ipm = {"mean": round(float(per_minute.mean()), 3),
+                   "p95": round(float(np.percentile(per_minute, 95)), 3),
+                   "peak": int(per_minute.max())}
+        else:
+            ipm = {"mean": 0.0, "p95": 0.0, "peak": 0}
+
+        return {
+            "experience_id": experience_id,
+            "start": (end_date - datetime.timedelta(days=days - 1)).isoformat(),
+            "end": end_date.isoformat(),
+            "events": events,
+            "views": views,
+            "sessions": len(session_ids),
+            "avg_session_duration": round(avg_duration, 3),
+            "session_duration": {"p50": round(float(p50), 3), "p90": round(float(p90), 3), "p99": round(float(p99), 3)},
+            "interactions": interactions,
+            "interactions_per_minute": ipm
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "cached_partitions": len(self._summaries),
+            "segment": self._segment
+        }
+
+def _to_float(value: Any) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return math.nan
+    return float(value)
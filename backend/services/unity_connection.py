@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import websockets
+
+from .metrics import observe, track
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+class UnityBackpressure(Exception):
+    """Unity no da abasto: demasiadas peticiones pendientes de respuesta"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Unity saturado, reintente en {retry_after} s")
+        self.retry_after = retry_after
+
+def encode_message(message: Dict[str, Any], encoding: str) -> Any:
+    """Serializa un mensaje: texto JSON o frame binario MessagePack"""
+    if encoding == "msgpack":
+        return msgpack.packb(message, use_bin_type=True)
+    return json.dumps(message, separators=(",", ":"))
+
+def decode_message(raw: Any) -> Any:
+    if isinstance(raw, bytes):
+        return msgpack.unpackb(raw, raw=False)
+    return json.loads(raw)
+
+class _UnityConnection:
+    """
+    Una conexión WebSocket persistente con Unity.
+
+    Un lector en segundo plano reparte cada respuesta al future de la
+    petición con el mismo request_id. Las respuestas sin request_id se
+    asignan a la petición pendiente más antigua (servidores que responden
+    en orden).
+    """
+
+    def __init__(self, url: str, encoding: str, ping_interval: float, ping_timeout: float,
+                 reconnect_min: float, reconnect_max: float):
+        self.url = url
+        self.encoding = encoding
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+        self.pending: "OrderedDict[str, asyncio.Future]" = OrderedDict()
+        self._ws = None
+        self._reader: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._backoff = 0.0
+        self.connects = 0
+        self.messages_sent = 0
+        self.bytes_sent = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None
+
+    async def _ensure_connected(self):
+        if self._ws is not None:
+            return self._ws
+        async with self._lock:
+            if self._ws is not None:
+                return self._ws
+            if self._backoff:
+                await asyncio.sleep(self._backoff)
+            try:
+                with track("unity", "connect"):
+                    self._ws = await websockets.connect(
+                        self.url,
+                        ping_interval=self.ping_interval,
+                        ping_timeout=self.ping_timeout
+                    )
+            except Exception:
+                self._backoff = min(max(self._backoff * 2, self.reconnect_min), self.reconnect_max)
+                raise
+            self._backoff = 0.0
+            self.connects += 1
+            self._reader = asyncio.create_task(self._read_loop(self._ws))
+            return self._ws
+
+    async def request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        ws = await self._ensure_connected()
+        request_id = message["request_id"]
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            frame = encode_message(message, self.encoding)
+            await ws.send(frame)
+            self.messages_sent += 1
+            self.bytes_sent += len(frame) if isinstance(frame, bytes) else len(frame.encode())
+            return await future
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def _read_loop(self, ws) -> None:
+        error: Exception = ConnectionError("Conexión con Unity cerrada")
+        try:
+            async for raw in ws:
+                try:
+                    reply = decode_message(raw)
+                except Exception:
+                    logger.warning("Respuesta de Unity con formato no válido")
+                    continue
+                self._dispatch(reply)
+        except Exception as e:
+            error = ConnectionError(f"Conexión con Unity perdida: {str(e)}")
+        finally:
+            if self._ws is ws:
+                self._ws = None
+            # Las peticiones en vuelo no recibirán respuesta por esta conexión
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(error)
+
+    def _dispatch(self, reply: Dict[str, Any]) -> None:
+        request_id = reply.get("request_id") if isinstance(reply, dict) else None
+        future = self.pending.get(request_id) if request_id else None
+        if future is None and request_id is None:
+            future = next((f for f in self.pending.values() if not f.done()), None)
+        if future is None:
+            logger.warning(f"Respuesta de Unity sin petición asociada: {request_id}")
+            return
+        if not future.done():
+            future.set_result(reply)
+
+    async def close(self) -> None:
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+        self._ws = None
+
+class UnityConnectionPool:
+    """
+    Pool pequeño de conexiones WebSocket persistentes con Unity.
+
+    Multiplexa las peticiones concurrentes sobre las conexiones abiertas
+    (correlacionadas por request_id), se reconecta automáticamente con
+    backoff y aplica contrapresión: si hay demasiadas peticiones sin
+    respuesta, las nuevas esperan un tiempo acotado y después se rechazan
+    con UnityBackpressure.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.size = int(os.getenv("UNITY_WS_POOL_SIZE", "2"))
+        self.max_inflight = int(os.getenv("UNITY_WS_MAX_INFLIGHT", "256"))
+        self.queue_timeout = float(os.getenv("UNITY_WS_QUEUE_TIMEOUT", "2"))
+        self.request_timeout = float(os.getenv("UNITY_WS_REQUEST_TIMEOUT", "10"))
+        self.retry_after = int(os.getenv("UNITY_WS_RETRY_AFTER", "1"))
+        self.encoding = os.getenv("UNITY_WS_ENCODING", "json")
+        if self.encoding not in ("json", "msgpack"):
+            raise ValueError(f"UNITY_WS_ENCODING no soportado: {self.encoding}")
+        if self.encoding == "msgpack" and msgpack is None:
+            raise ImportError("UNITY_WS_ENCODING=msgpack requiere el paquete msgpack")
+        self._connections: List[_UnityConnection] = [
+            _UnityConnection(
+                url,
+                self.encoding,
+                ping_interval=float(os.getenv("UNITY_WS_PING_INTERVAL", "20")),
+                ping_timeout=float(os.getenv("UNITY_WS_PING_TIMEOUT", "20")),
+                reconnect_min=float(os.getenv("UNITY_WS_RECONNECT_MIN", "0.5")),
+                reconnect_max=float(os.getenv("UNITY_WS_RECONNECT_MAX", "30"))
+            )
+            for _ in range(max(1, self.size))
+        ]
+        self._inflight = asyncio.Semaphore(self.max_inflight)
+        self.requests = 0
+        self.rejected = 0
+
+    async def request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Envía un mensaje a Unity y espera su respuesta
+
+        Args:
+            message: Mensaje JSON; se le añade un request_id de correlación
+
+        Raises:
+            UnityBackpressure: si Unity acumula demasiadas respuestas pendientes
+        """
+        queued_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._inflight.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise UnityBackpressure(self.retry_after)
+        observe("unity", "queue", time.perf_counter() - queued_at)
+
+        try:
+            self.requests += 1
+            message = {**message, "request_id": uuid.uuid4().hex}
+            # La conexión menos ocupada; a igualdad, una que ya esté abierta
+            connection = min(
+                self._connections,
+                key=lambda c: (len(c.pending), not c.connected)
+            )
+            with track("unity", "request"):
+                return await asyncio.wait_for(connection.request(message), self.request_timeout)
+        finally:
+            self._inflight.release()
+
+    async def close(self) -> None:
+        await asyncio.gather(*(c.close() for c in self._connections), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._connections),
+            "connected": sum(1 for c in self._connections if c.connected),
+            "inflight": sum(len(c.pending) for c in self._connections),
+            "max_inflight": self.max_inflight,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "connects": sum(c.connects for c in self._connections),
+            "encoding": self.encoding,
+            "messages_sent": sum(c.messages_sent for c in self._connections),
+            "bytes_sent": sum(c.bytes_sent for c in self._connections)
+        }
@@ -0,0 +1,257 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+logger = logging.getLogger(__name__)
+
+# Código de cierre WebSocket "Try Again Later" para consumidores lentos
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+class _Subscriber:
+    """Un cliente WebGL suscrito con su cola de envío acotada"""
+
+    __slots__ = ("websocket", "experience_id", "queue", "task", "sent")
+
+    def __init__(self, websocket: WebSocket, experience_id: str, queue_size: int):
+        self.websocket = websocket
+        self.experience_id = experience_id
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.task: Optional[asyncio.Task] = None
+        self.sent = 0
+
+class _Peer:
+    """Conexión saliente hacia el hub de otro worker"""
+
+    __slots__ = ("path", "queue", "task")
+
+    def __init__(self, path: str, queue_size: int):
+        self.path = path
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.task: Optional[asyncio.Task] = None
+
+class UnityBroadcastHub:
+    """
+    Hub pub/sub de WebSockets para clientes Unity WebGL.
+
+    Cada cliente se suscribe a un experience_id. publish() serializa el
+    mensaje una sola vez y deja el mismo frame en la cola acotada de cada
+    suscriptor; una tarea por cliente vacía su cola hacia el socket. Si la
+    cola de un cliente se llena, el cliente es demasiado lento: se le
+    desconecta con el código 1013 para que no retenga memoria ni frene al
+    resto.
+
+    Los suscriptores están repartidos entre los workers de gunicorn. Con
+    UNITY_HUB_PEER_DIR cada hub escucha en un socket Unix de ese directorio
+    (uno por worker) y reenvía lo que publica a los demás, que lo entregan a
+    sus clientes; el frame viaja ya serializado, como una línea. Sin
+    UNITY_HUB_PEER_DIR solo reciben el mensaje los clientes del worker que
+    lo publica.
+    """
+
+    def __init__(self, queue_size: Optional[int] = None):
+        self.queue_size = queue_size or int(os.getenv("UNITY_HUB_QUEUE_SIZE", "64"))
+        self.close_timeout = float(os.getenv("UNITY_HUB_CLOSE_TIMEOUT", "5"))
+        self.peer_dir = os.getenv("UNITY_HUB_PEER_DIR")
+        self.peer_queue_size = int(os.getenv("UNITY_HUB_PEER_QUEUE_SIZE", "1024"))
+        self._subscribers: Dict[str, Set[_Subscriber]] = {}
+        self._peers: Dict[str, _Peer] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._socket_path: Optional[str] = None
+        self.published = 0
+        self.delivered = 0
+        self.dropped_clients = 0
+        self.forwarded = 0
+        self.received = 0
+        self.dropped_forwards = 0
+
+    async def start(self) -> None:
+        """Escucha las difusiones de los otros workers (con UNITY_HUB_PEER_DIR)"""
+        if not self.peer_dir or self._server is not None:
+            return
+        os.makedirs(self.peer_dir, exist_ok=True)
+        self._socket_path = os.path.join(self.peer_dir, f"{os.getpid()}.sock")
+        if os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+        self._server = await asyncio.start_unix_server(self._receive_peer, self._socket_path, limit=2 ** 26)
+
+    def subscribe(self, experience_id: str, websocket: WebSocket) -> _Subscriber:
+        subscriber = _Subscriber(websocket, experience_id, self.queue_size)
+        subscriber.task = asyncio.create_task(self._send_loop(subscriber))
+        self._subscribers.setdefault(experience_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber) -> None:
+        subscribers = self._subscribers.get(subscriber.experience_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[subscriber.experience_id]
+        if subscriber.task is not None and subscriber.task is not asyncio.current_task():
+            subscriber.task.cancel()
+
+    def publish(self, experience_id: str, message: Dict[str, Any]) -> int:
+        """
+        Difunde un mensaje a los suscriptores de una experiencia en todos
+        los workers
+
+        Returns:
+            Número de clientes de este worker a los que se encoló el mensaje
+        """
+        self.published += 1
+        frame = json.dumps(message, separators=(",", ":"))
+        if self._server is not None:
+            self._forward(experience_id, frame)
+        return self._deliver(experience_id, frame)
+
+    def _deliver(self, experience_id: str, frame: str) -> int:
+        subscribers = self._subscribers.get(experience_id)
+        if not subscribers:
+            return 0
+
+        queued = 0
+        for subscriber in list(subscribers):
+            try:
+                subscriber.queue.put_nowait(frame)
+                queued += 1
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+        return queued
+
+    def _forward(self, experience_id: str, frame: str) -> None:
+        # Los frames JSON no contienen saltos de línea: una línea por mensaje
+        line = f"{json.dumps(experience_id)} {frame}\n".encode()
+        for name in os.listdir(self.peer_dir):
+            path = os.path.join(self.peer_dir, name)
+            if path == self._socket_path or not name.endswith(".sock"):
+                continue
+            peer = self._peers.get(path)
+            if peer is None:
+                peer = self._peers[path] = _Peer(path, self.peer_queue_size)
+                peer.task = asyncio.create_task(self._send_peer(peer))
+            try:
+                peer.queue.put_nowait(line)
+                self.forwarded += 1
+            except asyncio.QueueFull:
+                # El worker no lee: se pierde este mensaje para sus clientes
+                self.dropped_forwards += 1
+
+    async def _send_peer(self, peer: _Peer) -> None:
+        writer = None
+        try:
+            _, writer = await asyncio.open_unix_connection(peer.path)
+            while True:
+                writer.write(await peer.queue.get())
+                if peer.queue.empty():
+                    await writer.drain()
+        except asyncio.CancelledError:
+            raise
+        except ConnectionRefusedError:
+            # Nadie escucha: el socket es de un worker que terminó sin limpiar
+            try:
+                os.unlink(peer.path)
+            except OSError:
+                pass
+        except Exception as e:
+            logger.warning(f"Conexión con el hub de {os.path.basename(peer.path)} perdida: {str(e)}")
+        finally:
+            if self._peers.get(peer.path) is peer:
+                del self._peers[peer.path]
+            if writer is not None:
+                writer.close()
+
+    async def _receive_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        decoder = json.JSONDecoder()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                text = line.decode().rstrip("\n")
+                experience_id, end = decoder.raw_decode(text)
+                self.received += 1
+                self._deliver(experience_id, text[end + 1:])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Error al leer difusiones de otro worker: {str(e)}")
+        finally:
+            writer.close()
+
+    def _drop(self, subscriber: _Subscriber) -> None:
+        logger.warning(f"Desconectando cliente lento de la experiencia {subscriber.experience_id}")
+        self.dropped_clients += 1
+        self.unsubscribe(subscriber)
+        asyncio.create_task(self._close(subscriber.websocket))
+
+    async def _close(self, websocket: WebSocket) -> None:
+        # Un cliente que no lee puede bloquear también el frame de cierre
+        try:
+            await asyncio.wait_for(websocket.close(code=SLOW_CONSUMER_CLOSE_CODE), self.close_timeout)
+        except Exception:
+            pass
+
+    async def _send_loop(self, subscriber: _Subscriber) -> None:
+        try:
+            while True:
+                frame = await subscriber.queue.get()
+                await subscriber.websocket.send_text(frame)
+                subscriber.sent += 1
+                self.delivered += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # El socket se cerró: serve() se encarga de dar de baja al cliente
+            self.unsubscribe(subscriber)
+
+    async def serve(self, websocket: WebSocket, experience_id: str) -> None:
+        """
+        Atiende la conexión de un cliente hasta que se desconecta
+
+        Los mensajes que envía el cliente (texto o binarios) se ignoran;
+        leerlos permite detectar la desconexión.
+        """
+        await websocket.accept()
+        subscriber = self.subscribe(experience_id, websocket)
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            try:
+                os.unlink(self._socket_path)
+            except OSError:
+                pass
+        for peer in list(self._peers.values()):
+            peer.task.cancel()
+        self._peers.clear()
+        for subscribers in list(self._subscribers.values()):
+            for subscriber in list(subscribers):
+                self.unsubscribe(subscriber)
+                await self._close(subscriber.websocket)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "experiences": len(self._subscribers),
+            "clients": sum(len(s) for s in self._subscribers.values()),
+            "queue_size": self.queue_size,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped_clients": self.dropped_clients,
+            "peers": len(self._peers),
+            "forwarded": self.forwarded,
+            "received": self.received,
+            "dropped_forwards": self.dropped_forwards
+        }
@@ -1,15 +1,21 @@
 import os
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional
 import asyncio
-import json
 import websockets
+from .metrics import track
+from .unity_analytics import UnityAnalyticsStore
+from .unity_connection import UnityBackpressure, UnityConnectionPool
+from .unity_updates import UnityUpdateCoalescer
 
 class UnityService:
     def __init__(self):
         self.api_key = os.getenv("UNITY_API_KEY")
         self.build_path = os.getenv("UNITY_BUILD_PATH")
         self.ws_url = f"ws://{os.getenv('UNITY_WS_HOST', 'localhost')}:{os.getenv('UNITY_WS_PORT', '8765')}"
-        
+        self.connections = UnityConnectionPool(self.ws_url)
+        self.updates = UnityUpdateCoalescer(self.connections.request)
+        self.analytics = UnityAnalyticsStore()
+
     async def update_experience(self, experience_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Actualiza una experiencia Unity en tiempo real
@@ -22,18 +28,30 @@ class UnityService:
             Dict con el resultado de la actualización
         """
         try:
-            async with websockets.connect(self.ws_url) as websocket:
-                message = {
-                    "type": "update_experience",
-                    "experience_id": experience_id,
-                    "data": data
-                }
-                await websocket.send(json.dumps(message))
-                response = await websocket.recv()
-                return json.loads(response)
-                
+            return await self.updates.submit(experience_id, data)
+
+        except UnityBackpressure:
+            raise
         except Exception as e:
             raise Exception(f"Error al actualizar experiencia Unity: {str(e)}")
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Comprueba que Unity acepta conexiones (sin abrir una nueva si el pool ya está conectado)"""
+        stats = self.connections.stats()
+        if not stats["connected"]:
+            async with websockets.connect(self.ws_url):
+                pass
+        return {"ok": True, "url": self.ws_url, "connected": stats["connected"]}
+
+    def get_connection_stats(self) -> Dict[str, Any]:
+        """Estado del pool de conexiones WebSocket con Unity y de la agrupación de actualizaciones"""
+        return {
+            "connections": self.connections.stats(),
+            "updates": self.updates.stats()
+        }
+
+    async def close(self):
+        await self.connections.close()
             
     async def build_webgl(self, project_path: str, build_target: str = "WebGL") -> Dict[str, Any]:
         """
@@ -49,12 +67,13 @@ class UnityService:
         try:
             # Comando para compilar Unity en modo headless
             cmd = f"unity-cli build {project_path} -buildTarget {build_target}"
-            process = await asyncio.create_subprocess_shell(
-                cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await process.communicate()
+            with track("unity", "build"):
+                process = await asyncio.create_subprocess_shell(
+                    cmd,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+                stdout, stderr = await process.communicate()
             
             if process.returncode != 0:
                 raise Exception(f"Error en la compilación: {stderr.decode()}")
@@ -91,24 +110,45 @@ class UnityService:
         except Exception as e:
             raise Exception(f"Error al desplegar experiencia: {str(e)}")
             
-    async def get_analytics(self, experience_id: str) -> Dict[str, Any]:
+    async def record_events(self, experience_id: str, events: List[Any],
+                            session_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Guarda un lote de eventos de interacción enviado por un cliente WebGL
+
+        Args:
+            experience_id: ID de la experiencia
+            events: Eventos con type, timestamp y opcionalmente session_id
+            session_id: Sesión de los eventos que no indican la suya
+
+        Returns:
+            Dict con los eventos aceptados y rechazados
+        """
+        try:
+            # Una escritura por columna en la caché de páginas: no compensa
+            # pasar el lote a otro hilo
+            return self.analytics.append(experience_id, events, session_id)
+
+        except ValueError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al guardar eventos de analíticas: {str(e)}")
+
+    async def get_analytics(self, experience_id: str, days: int = 30, end: Optional[str] = None) -> Dict[str, Any]:
         """
         Obtiene analíticas de una experiencia
         
         Args:
             experience_id: ID de la experiencia
+            days: Número de días consultados
+            end: Último día del intervalo (YYYY-MM-DD, UTC), por defecto hoy
             
         Returns:
             Dict con las analíticas
         """
         try:
-            # Aquí iría la lógica para obtener analíticas
-            return {
-                "experience_id": experience_id,
-                "views": 1000,
-                "avg_session_duration": 300,
-                "interactions": 500
-            }
-            
+            return await asyncio.to_thread(self.analytics.get_analytics, experience_id, days, end)
+
+        except ValueError:
+            raise
         except Exception as e:
-            raise Exception(f"Error al obtener analíticas: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"Error al obtener analíticas: {str(e)}") 
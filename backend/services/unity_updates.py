@@ -0,0 +1,170 @@
+import os
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+@dataclass
+class _PendingUpdate:
+    data: Dict[str, Any] = field(default_factory=dict)
+    future: Optional[asyncio.Future] = None
+
+class UnityUpdateCoalescer:
+    """
+    Agrupa y comprime las actualizaciones de experiencias Unity.
+
+    Las actualizaciones de una misma experiencia que llegan dentro de la
+    ventana UNITY_UPDATE_WINDOW_MS se fusionan (gana la última escritura de
+    cada clave) y se envían como un único mensaje.
+
+    Con UNITY_UPDATE_DELTAS (desactivado por defecto: requiere un cliente
+    Unity que entienda "update_experience_delta") solo viajan las claves que
+    cambian respecto a lo último que este worker envió. La versión la lleva
+    Unity: cada respuesta incluye la versión de la experiencia y el delta
+    indica en base_version de cuál parte. Si otro worker escribió después o
+    Unity perdió el estado, las versiones no coinciden y Unity responde
+    {"status": "resync"}; entonces se reenvía la actualización completa con
+    el tipo "update_experience" de siempre. Un lote sin claves cambiadas
+    también se envía completo: solo Unity sabe si su estado sigue siendo el
+    que este worker conoce.
+
+    Los envíos de una misma experiencia se serializan para que cada delta
+    parta de la última versión confirmada.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        window_ms: Optional[float] = None,
+        deltas: Optional[bool] = None,
+        max_experiences: Optional[int] = None
+    ):
+        self.send = send
+        if window_ms is None:
+            window_ms = float(os.getenv("UNITY_UPDATE_WINDOW_MS", "20"))
+        self.window = window_ms / 1000
+        if deltas is None:
+            deltas = os.getenv("UNITY_UPDATE_DELTAS", "false").lower() in ("1", "true", "yes")
+        self.deltas = deltas
+        self.max_experiences = max_experiences or int(os.getenv("UNITY_UPDATE_MAX_EXPERIENCES", "10000"))
+        self._pending: Dict[str, _PendingUpdate] = {}
+        # experience_id -> (versión de Unity, claves enviadas desde esa base), en orden de uso
+        self._acked: "OrderedDict[str, Tuple[int, Dict[str, Any]]]" = OrderedDict()
+        self._tail: Dict[str, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.submitted = 0
+        self.messages = 0
+        self.full_messages = 0
+        self.delta_messages = 0
+        self.resyncs = 0
+        self.keys_submitted = 0
+        self.keys_sent = 0
+
+    async def submit(self, experience_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Encola una actualización y espera la respuesta de Unity al envío
+        que la incluye (compartida por todas las actualizaciones fusionadas)
+        """
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(experience_id)
+        if pending is None:
+            pending = _PendingUpdate(future=loop.create_future())
+            self._pending[experience_id] = pending
+            loop.call_later(self.window, self._start_flush, experience_id)
+        pending.data.update(data)
+        self.submitted += 1
+        self.keys_submitted += len(data)
+        return await asyncio.shield(pending.future)
+
+    def _start_flush(self, experience_id: str) -> None:
+        pending = self._pending.pop(experience_id)
+        task = asyncio.ensure_future(self._flush(experience_id, pending, self._tail.get(experience_id)))
+        self._tail[experience_id] = task
+        self._tasks.add(task)
+        task.add_done_callback(lambda t: self._flush_done(experience_id, t))
+
+    def _flush_done(self, experience_id: str, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if self._tail.get(experience_id) is task:
+            del self._tail[experience_id]
+
+    async def _flush(self, experience_id: str, pending: _PendingUpdate,
+                     previous: Optional[asyncio.Task]) -> None:
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        try:
+            reply = await self._send_update(experience_id, pending.data)
+        except Exception as e:
+            pending.future.set_exception(e)
+        else:
+            pending.future.set_result(reply)
+        # Nadie más espera el resultado si todos los llamantes se cancelaron
+        if pending.future.done() and not pending.future.cancelled():
+            pending.future.exception()
+
+    async def _send_update(self, experience_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        base = self._acked.get(experience_id) if self.deltas else None
+        changes = data
+        if base is not None:
+            version, state = base
+            changes = {k: v for k, v in data.items() if k not in state or state[k] != v}
+
+        try:
+            if base is None or not changes:
+                state = {}
+                reply = await self._send(self._full_message(experience_id, data))
+            else:
+                reply = await self._send({
+                    "type": "update_experience_delta",
+                    "experience_id": experience_id,
+                    "base_version": version,
+                    "data": changes
+                })
+                if isinstance(reply, dict) and reply.get("status") == "resync":
+                    # Unity tiene otra versión: enviar la actualización completa
+                    self.resyncs += 1
+                    state = {}
+                    reply = await self._send(self._full_message(experience_id, data))
+        except Exception:
+            # Sin confirmación no se sabe qué estado tiene Unity
+            self._acked.pop(experience_id, None)
+            raise
+
+        if self.deltas:
+            confirmed = reply.get("version") if isinstance(reply, dict) else None
+            if isinstance(confirmed, int):
+                self._acked[experience_id] = (confirmed, {**state, **data})
+                self._acked.move_to_end(experience_id)
+                while len(self._acked) > self.max_experiences:
+                    self._acked.popitem(last=False)
+            else:
+                # Un cliente sin versiones no admite deltas
+                self._acked.pop(experience_id, None)
+        return reply
+
+    @staticmethod
+    def _full_message(experience_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {"type": "update_experience", "experience_id": experience_id, "data": data}
+
+    async def _send(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        self.messages += 1
+        self.keys_sent += len(message["data"])
+        if message["type"] == "update_experience_delta":
+            self.delta_messages += 1
+        else:
+            self.full_messages += 1
+        return await self.send(message)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window * 1000,
+            "deltas": self.deltas,
+            "submitted": self.submitted,
+            "messages": self.messages,
+            "full_messages": self.full_messages,
+            "delta_messages": self.delta_messages,
+            "resyncs": self.resyncs,
+            "keys_submitted": self.keys_submitted,
+            "keys_sent": self.keys_sent,
+            "tracked_experiences": len(self._acked)
+        }
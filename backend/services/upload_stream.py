@@ -0,0 +1,104 @@
+import os
+import asyncio
+import hashlib
+import zipfile
+from typing import AsyncIterator, List, Optional, Tuple
+
+from fastapi import UploadFile
+
+class UploadTooLarge(Exception):
+    """El archivo subido supera el tamaño máximo permitido"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"El archivo supera el tamaño máximo de {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+def max_upload_bytes() -> int:
+    return int(os.getenv("PDF_MAX_UPLOAD_BYTES", str(100 * 1024 ** 2)))
+
+async def iter_upload_chunks(
+    file: UploadFile,
+    max_bytes: Optional[int] = None,
+    chunk_bytes: int = 1024 ** 2
+) -> AsyncIterator[bytes]:
+    """
+    Lee un UploadFile por bloques sin cargarlo completo en memoria
+
+    Args:
+        file: Archivo recibido por FastAPI
+        max_bytes: Tamaño máximo permitido (por defecto PDF_MAX_UPLOAD_BYTES)
+        chunk_bytes: Tamaño de cada bloque
+
+    Raises:
+        UploadTooLarge: en cuanto el total leído supera max_bytes
+    """
+    if max_bytes is None:
+        max_bytes = max_upload_bytes()
+
+    total = 0
+    while True:
+        chunk = await file.read(chunk_bytes)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        yield chunk
+
+async def hash_upload(
+    file: UploadFile,
+    max_bytes: Optional[int] = None,
+    chunk_bytes: int = 1024 ** 2
+) -> Tuple[str, int]:
+    """
+    Calcula el SHA-256 y el tamaño de un UploadFile leyéndolo por bloques
+
+    Starlette ya ha volcado la subida a un archivo temporal, así que releerla
+    no añade memoria. Al terminar el archivo vuelve al principio para poder
+    enviarlo después con iter_upload_chunks.
+
+    Raises:
+        UploadTooLarge: si el archivo supera max_bytes
+    """
+    digest = hashlib.sha256()
+    size = 0
+    async for chunk in iter_upload_chunks(file, max_bytes, chunk_bytes):
+        digest.update(chunk)
+        size += len(chunk)
+    await file.seek(0)
+    return digest.hexdigest(), size
+
+async def iter_zip_member_chunks(
+    archive: zipfile.ZipFile,
+    name: str,
+    chunk_bytes: int = 1024 ** 2
+) -> AsyncIterator[bytes]:
+    """
+    Lee un miembro de un ZIP por bloques sin bloquear el event loop
+    """
+    member = await asyncio.to_thread(archive.open, name)
+    try:
+        while True:
+            chunk = await asyncio.to_thread(member.read, chunk_bytes)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        member.close()
+
+async def hash_zip_member(
+    archive: zipfile.ZipFile,
+    name: str,
+    chunk_bytes: int = 1024 ** 2
+) -> Tuple[str, int]:
+    """Calcula el SHA-256 y el tamaño descomprimido de un miembro de un ZIP"""
+    digest = hashlib.sha256()
+    size = 0
+    async for chunk in iter_zip_member_chunks(archive, name, chunk_bytes):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+def zip_pdf_members(archive: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    """PDFs de un ZIP según su directorio central, sin descomprimir nada"""
+    return [info for info in archive.infolist() if not info.is_dir() and info.filename.endswith('.pdf')]
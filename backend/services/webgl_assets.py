@@ -0,0 +1,290 @@
+import os
+import re
+import json
+import gzip
+import shutil
+import hashlib
+import logging
+import mimetypes
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "asset-manifest.json"
+
+# Directorio de los artefactos del build que carga el loader de Unity
+BUILD_DIR = "Build"
+
+# Extensiones que merece la pena comprimir en un build WebGL de Unity
+COMPRESSIBLE = {
+    ".wasm", ".data", ".js", ".json", ".html", ".css", ".symbols",
+    ".txt", ".xml", ".svg", ".mem", ".unityweb"
+}
+
+CONTENT_TYPES = {
+    ".wasm": "application/wasm",
+    ".data": "application/octet-stream",
+    ".js": "application/javascript",
+    ".unityweb": "application/octet-stream",
+}
+
+# Servir las variantes precomprimidas con Apache (Hostinger): mismo criterio que
+# brotli_static/gzip_static en nginx
+HTACCESS = """\
+# Generado por webgl_assets: sirve las variantes .br/.gz precomprimidas
+<IfModule mod_rewrite.c>
+RewriteEngine On
+RewriteCond %{HTTP:Accept-Encoding} br
+RewriteCond %{REQUEST_FILENAME}.br -f
+RewriteRule ^(.*)$ $1.br [L]
+RewriteCond %{HTTP:Accept-Encoding} gzip
+RewriteCond %{REQUEST_FILENAME}.gz -f
+RewriteRule ^(.*)$ $1.gz [L]
+</IfModule>
+<IfModule mod_headers.c>
+<FilesMatch "\\.br$">
+    Header set Content-Encoding br
+    Header append Vary Accept-Encoding
+</FilesMatch>
+<FilesMatch "\\.gz$">
+    Header set Content-Encoding gzip
+    Header append Vary Accept-Encoding
+</FilesMatch>
+<FilesMatch "\\.[0-9a-f]{12}\\.">
+    Header set Cache-Control "public, max-age=31536000, immutable"
+</FilesMatch>
+<FilesMatch "\\.html$">
+    Header set Cache-Control "no-cache"
+</FilesMatch>
+</IfModule>
+<IfModule mod_mime.c>
+AddType application/wasm .wasm .wasm.br .wasm.gz
+AddType application/javascript .js .js.br .js.gz
+AddType application/octet-stream .data .data.br .data.gz
+RemoveType .br .gz
+AddEncoding br .br
+AddEncoding gzip .gz
+</IfModule>
+"""
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 ** 2), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _hashed_name(relative: str, digest: str) -> str:
+    """Build/game.wasm -> Build/game.<12 hex>.wasm"""
+    directory, name = posixpath.split(relative)
+    stem, dot, ext = name.partition(".")
+    hashed = f"{stem}.{digest[:12]}{dot}{ext}" if dot else f"{name}.{digest[:12]}"
+    return posixpath.join(directory, hashed)
+
+def _compress(args: Tuple[str, str, str, int]) -> Tuple[str, Optional[int]]:
+    """
+    Comprime un archivo en un proceso del pool
+
+    Returns:
+        (codificación, tamaño comprimido) o tamaño None si no compensa
+    """
+    source, target, encoding, quality = args
+    with open(source, "rb") as f:
+        data = f.read()
+    if encoding == "br":
+        compressed = brotli.compress(data, quality=quality)
+    else:
+        # mtime=0: salida determinista, el manifiesto de despliegue no ve cambios falsos
+        compressed = gzip.compress(data, compresslevel=quality, mtime=0)
+    # Variantes que apenas reducen (datos ya comprimidos) solo ocupan espacio
+    if len(compressed) > 0.9 * len(data):
+        return encoding, None
+    tmp = f"{target}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(compressed)
+    os.replace(tmp, target)
+    return encoding, len(compressed)
+
+def prepare_webgl_build(
+    build_dir: str,
+    out_dir: str,
+    workers: Optional[int] = None,
+    brotli_quality: Optional[int] = None,
+    gzip_level: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Prepara un build WebGL para publicarlo
+
+    Copia el build a out_dir. Los artefactos de Build/ que referencia algún
+    .html (el loader, .wasm, .data, framework) llevan un hash de contenido
+    en el nombre y el HTML se reescribe para apuntar a ellos; el resto
+    (TemplateData/, CSS, imágenes) conserva su nombre, porque otros
+    archivos que no se reescriben (CSS, JS, JSON) pueden referenciarlo.
+    Genera variantes .br y .gz en paralelo en varios procesos y escribe
+    asset-manifest.json y un .htaccess para servir la codificación
+    adecuada. Las variantes de archivos cuyo hash ya estaba en out_dir no
+    se recalculan.
+
+    WEBGL_BROTLI_QUALITY es 9 por defecto: 11 reduce otro ~20% el .wasm
+    pero tarda un orden de magnitud más, y la preparación va dentro de la
+    petición de despliegue.
+
+    Returns:
+        El manifiesto generado
+    """
+    workers = workers or int(os.getenv("WEBGL_COMPRESS_WORKERS", str(os.cpu_count() or 1)))
+    brotli_quality = brotli_quality if brotli_quality is not None else int(os.getenv("WEBGL_BROTLI_QUALITY", "9"))
+    gzip_level = gzip_level if gzip_level is not None else int(os.getenv("WEBGL_GZIP_LEVEL", "9"))
+    encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+    if brotli is None:
+        logger.warning("Paquete brotli no instalado: solo se generarán variantes gzip")
+
+    sources: Dict[str, str] = {}
+    for root, dirs, names in os.walk(build_dir):
+        dirs.sort()
+        for name in sorted(names):
+            full = os.path.join(root, name)
+            sources[os.path.relpath(full, build_dir).replace(os.sep, "/")] = full
+
+    html = {relative: _read_text(full) for relative, full in sources.items() if relative.endswith(".html")}
+    referenced = _referenced_build_files(
+        [relative for relative in sources if relative.startswith(f"{BUILD_DIR}/")], html.values()
+    )
+
+    files: Dict[str, Dict[str, Any]] = {}
+    renames: Dict[str, str] = {}
+    for relative, full in sources.items():
+        digest = _hash_file(full)
+        ext = posixpath.splitext(relative)[1].lower()
+        immutable = relative in referenced
+        path = _hashed_name(relative, digest) if immutable else relative
+        if immutable:
+            renames[relative] = path
+        files[relative] = {
+            "path": path,
+            "size": os.path.getsize(full),
+            "sha256": digest,
+            "content_type": CONTENT_TYPES.get(ext) or mimetypes.guess_type(relative)[0] or "application/octet-stream",
+            "immutable": immutable,
+            "encodings": {}
+        }
+
+    os.makedirs(out_dir, exist_ok=True)
+    previous = _read_manifest(out_dir)
+    jobs: List[Tuple[str, str, str, str, int]] = []
+    for relative, entry in files.items():
+        target = os.path.join(out_dir, *entry["path"].split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if relative in html:
+            _write_rewritten_html(html[relative], target, renames)
+            entry["sha256"] = _hash_file(target)
+            entry["size"] = os.path.getsize(target)
+        elif not entry["immutable"] or not os.path.exists(target):
+            # Un nombre sin hash puede tener contenido distinto en cada build
+            shutil.copyfile(sources[relative], target)
+
+        if posixpath.splitext(relative)[1].lower() not in COMPRESSIBLE or entry["size"] < 1024:
+            continue
+        cached = previous.get(relative, {})
+        for encoding in encodings:
+            suffix = ".br" if encoding == "br" else ".gz"
+            known = cached.get("encodings", {}).get(encoding)
+            if cached.get("sha256") == entry["sha256"] and known and os.path.exists(f"{target}{suffix}"):
+                entry["encodings"][encoding] = known
+                continue
+            quality = brotli_quality if encoding == "br" else gzip_level
+            jobs.append((relative, target, f"{target}{suffix}", encoding, quality))
+
+    # Los archivos grandes primero para repartir mejor la carga entre procesos
+    jobs.sort(key=lambda job: -files[job[0]]["size"])
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_compress, [(target, out, enc, q) for _, target, out, enc, q in jobs])
+            for (relative, _, out, _, _), (encoding, size) in zip(jobs, results):
+                if size is not None:
+                    files[relative]["encodings"][encoding] = {
+                        "path": f"{files[relative]['path']}{'.br' if encoding == 'br' else '.gz'}",
+                        "size": size
+                    }
+
+    manifest = {
+        "files": files,
+        "entry": "index.html" if "index.html" in files else None,
+        "total_bytes": sum(e["size"] for e in files.values()),
+        "brotli_bytes": sum(e["encodings"].get("br", e)["size"] for e in files.values()),
+        "gzip_bytes": sum(e["encodings"].get("gzip", e)["size"] for e in files.values())
+    }
+    _remove_stale(out_dir, manifest)
+    with open(os.path.join(out_dir, ".htaccess"), "w") as f:
+        f.write(HTACCESS)
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+def _read_manifest(out_dir: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME)) as f:
+            return json.load(f).get("files", {})
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _read_text(path: str) -> str:
+    with open(path, encoding="utf-8", errors="surrogateescape") as f:
+        return f.read()
+
+def _reference_pattern(names) -> "re.Pattern[str]":
+    """
+    Referencias a names en HTML: rutas completas y nombres base (el loader
+    de Unity compone buildUrl + "/game.wasm")
+
+    Cada nombre debe ir precedido de "/", comillas o "(" y seguido de
+    comillas, ")", "?" o "#", así "a.js" no coincide con el final de
+    "data.js". Las claves más largas van primero en la alternancia.
+    """
+    alternatives = "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+    return re.compile(f"(?<=[/\"'(])(?:{alternatives})(?=[\"')?#])")
+
+def _referenced_build_files(build_files: List[str], html) -> set:
+    """Archivos de Build/ que aparecen referenciados en algún HTML"""
+    if not build_files:
+        return set()
+    by_name: Dict[str, List[str]] = {}
+    for relative in build_files:
+        by_name.setdefault(relative, []).append(relative)
+        by_name.setdefault(posixpath.basename(relative), []).append(relative)
+    pattern = _reference_pattern(by_name)
+    referenced = set()
+    for text in html:
+        for match in pattern.finditer(text):
+            referenced.update(by_name[match.group(0)])
+    return referenced
+
+def _write_rewritten_html(html: str, target: str, renames: Dict[str, str]) -> None:
+    """Sustituye en el HTML las referencias a los archivos renombrados"""
+    # Una sola pasada: un reemplazo no vuelve a reemplazarse
+    replacements = {**{posixpath.basename(a): posixpath.basename(b) for a, b in renames.items()}, **renames}
+    if replacements:
+        html = _reference_pattern(replacements).sub(lambda m: replacements[m.group(0)], html)
+    with open(target, "w", encoding="utf-8", errors="surrogateescape") as f:
+        f.write(html)
+
+def _remove_stale(out_dir: str, manifest: Dict[str, Any]) -> None:
+    """Borra salidas de builds anteriores que ya no están en el manifiesto"""
+    keep = {MANIFEST_NAME, ".htaccess"}
+    for entry in manifest["files"].values():
+        keep.add(entry["path"])
+        keep.update(variant["path"] for variant in entry["encodings"].values())
+    for root, _, names in os.walk(out_dir, topdown=False):
+        for name in names:
+            full = os.path.join(root, name)
+            if os.path.relpath(full, out_dir).replace(os.sep, "/") not in keep:
+                os.remove(full)
+        if root != out_dir and not os.listdir(root):
+            os.rmdir(root)
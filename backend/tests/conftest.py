@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# Los módulos se importan como en la aplicación y los benchmarks, desde backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def ssh():
+    """SSHConnectionManager contra benchmarks.fake_sftp: SFTP y exec sobre el sistema local"""
+    from benchmarks.fake_sftp import FakeSSHServer
+    from services.ssh_pool import SSHConnectionManager
+
+    server = FakeSSHServer()
+    server.start()
+    manager = SSHConnectionManager("127.0.0.1", server.port, "test", password="test")
+    yield manager
+    manager.close()
+    server.stop()
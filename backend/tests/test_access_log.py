@@ -0,0 +1,145 @@
+import os
+import subprocess
+
+from services.access_log import LocalAccessLog, RemoteAccessLog
+
+def line(status=200, size=100, path="/"):
+    return (f'1.2.3.4 - - [10/Oct/2025:13:55:36 +0000] "GET {path} HTTP/1.1" {status} {size} '
+            f'"-" "agente"\n').encode()
+
+def append(path, data):
+    with open(path, "ab") as f:
+        f.write(data)
+
+def poll(log):
+    """Ejecuta command() con el sh local, como lo haría el servidor por SSH"""
+    output = subprocess.run(["sh", "-c", log.command()], capture_output=True, check=True).stdout
+    return log.consume(output)
+
+def test_remote_reads_only_new_lines(tmp_path):
+    path = str(tmp_path / "access.log")
+    append(path, line() * 3)
+    log = RemoteAccessLog(path, backfill_bytes=10 ** 6)
+
+    assert poll(log)["totals"]["lines"] == 3
+    assert log.offset == os.path.getsize(path)
+
+    append(path, line(404) * 2)
+    before = log.transferred_bytes
+    stats = poll(log)
+    assert stats["totals"]["lines"] == 5
+    assert stats["totals"]["status"]["4xx"] == 2
+    # Solo viajan las dos líneas nuevas y las cabeceras
+    assert log.transferred_bytes - before < 3 * len(line())
+
+def test_remote_keeps_partial_line_for_next_poll(tmp_path):
+    path = str(tmp_path / "access.log")
+    append(path, line())
+    log = RemoteAccessLog(path, backfill_bytes=10 ** 6)
+    poll(log)
+
+    half = len(line()) // 2
+    append(path, line(500)[:half])
+    assert poll(log)["totals"]["lines"] == 1
+    append(path, line(500)[half:])
+    stats = poll(log)
+    assert stats["totals"]["lines"] == 2
+    assert stats["totals"]["status"]["5xx"] == 1
+
+def test_remote_first_poll_backfills_from_whole_line(tmp_path):
+    path = str(tmp_path / "access.log")
+    append(path, line() * 10)
+    log = RemoteAccessLog(path, backfill_bytes=len(line()) * 3 + 5)
+
+    stats = poll(log)
+    # Los 5 bytes de más caen en una línea cortada que se descarta
+    assert stats["totals"]["lines"] == 3
+    assert stats["totals"]["parse_errors"] == 0
+
+def test_remote_rotation_finishes_old_file(tmp_path):
+    path = str(tmp_path / "access.log")
+    append(path, line() * 2)
+    log = RemoteAccessLog(path, backfill_bytes=10 ** 6)
+    poll(log)
+
+    append(path, line(404))
+    os.rename(path, path + ".1")
+    append(path, line(500) * 2)
+    stats = poll(log)
+    assert stats["rotations"] == 1
+    assert stats["totals"]["status"] == {"2xx": 2, "3xx": 0, "4xx": 1, "5xx": 2}
+    assert log.inode == os.stat(path).st_ino
+    assert log.offset == os.path.getsize(path)
+
+def test_remote_truncation_restarts(tmp_path):
+    path = str(tmp_path / "access.log")
+    append(path, line() * 4)
+    log = RemoteAccessLog(path, backfill_bytes=10 ** 6)
+    poll(log)
+
+    # copytruncate: mismo inodo, archivo más corto
+    with open(path, "wb") as f:
+        f.write(line(404))
+    stats = poll(log)
+    assert stats["rotations"] == 1
+    assert stats["totals"]["status"]["4xx"] == 1
+    assert log.offset == len(line())
+
+def test_remote_skips_to_max_bytes_when_far_behind(tmp_path):
+    path = str(tmp_path / "access.log")
+    append(path, line())
+    log = RemoteAccessLog(path, max_bytes=len(line()) * 3, backfill_bytes=10 ** 6)
+    poll(log)
+
+    append(path, line() * 10)
+    stats = poll(log)
+    assert stats["skipped_bytes"] > 0
+    assert stats["totals"]["lines"] <= 4
+    assert log.offset == os.path.getsize(path)
+
+def test_remote_missing_file(tmp_path):
+    log = RemoteAccessLog(str(tmp_path / "no-existe.log"))
+    assert poll(log)["available"] is False
+    assert log.inode is None
+
+def test_remote_resume_continues_from_cursor(tmp_path):
+    path = str(tmp_path / "access.log")
+    append(path, line() * 3)
+    first = RemoteAccessLog(path, backfill_bytes=10 ** 6)
+    poll(first)
+
+    append(path, line(404) * 2)
+    second = RemoteAccessLog(path, backfill_bytes=10 ** 6)
+    second.resume(first.cursor())
+    stats = poll(second)
+    assert stats["totals"]["lines"] == 2
+    assert stats["skipped_bytes"] == 0
+
+def test_local_rotation_and_resume(tmp_path):
+    path = str(tmp_path / "api.log")
+    append(path, line() * 2)
+    log = LocalAccessLog(path, backfill_bytes=10 ** 6)
+    assert log.poll()["totals"]["lines"] == 2
+
+    append(path, line(404))
+    os.rename(path, path + ".1")
+    append(path, line(500))
+    stats = log.poll()
+    assert stats["rotations"] == 1
+    assert stats["totals"]["status"] == {"2xx": 2, "3xx": 0, "4xx": 1, "5xx": 1}
+
+    append(path, line())
+    other = LocalAccessLog(path, backfill_bytes=10 ** 6)
+    other.resume(log.cursor())
+    assert other.poll()["totals"]["lines"] == 1
+    log.close()
+    other.close()
+
+def test_local_resume_ignores_other_file(tmp_path):
+    path = str(tmp_path / "api.log")
+    append(path, line() * 2)
+    log = LocalAccessLog(path, backfill_bytes=10 ** 6)
+    log.resume({"path": path, "inode": os.stat(path).st_ino + 1, "offset": 0})
+    # Inodo distinto: arranque normal con el relleno inicial
+    assert log.poll()["totals"]["lines"] == 2
+    log.close()
@@ -0,0 +1,45 @@
+from services.conversion_cache import ConversionResultCache, conversion_cache_key
+
+RESULT = {"audio_url": "https://cdn/a.mp3", "duration": 12.5, "word_count": 40}
+
+def test_key_depends_on_content_and_parameters():
+    key = conversion_cache_key("abc", "default", 1, 1)
+    assert key == conversion_cache_key("abc", "default", 1.0, 1.0)
+    assert key != conversion_cache_key("abc", "default", 1.25, 1.0)
+    assert key != conversion_cache_key("abd", "default", 1, 1)
+
+def test_stats_are_shared_between_workers(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    # Dos workers de gunicorn con su propia conexión a la misma base de datos
+    first = ConversionResultCache(db_path)
+    second = ConversionResultCache(db_path)
+
+    assert first.get("k", 100) is None
+    first.put("k", RESULT, 100)
+    assert second.get("k", 100) == RESULT
+    assert second.get("k", 250) == RESULT
+    first.record_coalesced(50)
+
+    for cache in (first, second):
+        stats = cache.stats()
+        assert stats["entries"] == 1
+        assert (stats["hits"], stats["misses"], stats["coalesced"]) == (2, 1, 1)
+        assert stats["bytes_saved"] == 400
+        assert stats["hit_rate"] == 2 / 3
+
+def test_expired_entries_miss(tmp_path):
+    cache = ConversionResultCache(str(tmp_path / "cache.db"), ttl=0)
+    cache.put("k", RESULT, 100)
+    assert cache.get("k", 100) is None
+    assert cache.stats()["entries"] == 0
+
+def test_least_recently_hit_entry_is_evicted(tmp_path):
+    cache = ConversionResultCache(str(tmp_path / "cache.db"), max_entries=2)
+    cache.put("a", RESULT, 1)
+    cache.put("b", RESULT, 1)
+    cache.get("a", 1)
+    cache.put("c", RESULT, 1)
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == RESULT
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,174 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from services.conversion_cache import ConversionResultCache
+from services.conversion_jobs import ConversionJobManager, ConversionJobStore, _PublicResolver, validate_webhook_url
+
+@pytest.fixture
+def store(tmp_path):
+    store = ConversionJobStore(str(tmp_path / "jobs.db"))
+    yield store
+    store.close()
+
+def join(store, user_id, cache_key="clave", webhook_url=None):
+    return store.create_or_join(user_id, {"voice": "a"}, webhook_url, 5.0, cache_key, 1024)
+
+def test_first_request_leads(store):
+    job, is_new = join(store, "1")
+    assert is_new
+    assert job["status"] == "uploading"
+    assert job["leader_id"] is None
+    assert job["user_id"] == "1"
+
+def test_identical_request_gets_its_own_job(store):
+    leader, _ = join(store, "1", webhook_url="https://a/hook")
+    store.update(leader["id"], status="processing", conversion_id="conv-1")
+
+    follower, is_new = join(store, "2", webhook_url="https://b/hook")
+    assert not is_new
+    assert follower["id"] != leader["id"]
+    assert follower["leader_id"] == leader["id"]
+    # Conserva su dueño y su webhook, con el estado de la conversión compartida
+    assert follower["user_id"] == "2"
+    assert follower["webhook_url"] == "https://b/hook"
+    assert follower["status"] == "processing"
+    assert follower["conversion_id"] == "conv-1"
+
+def test_joins_only_running_conversions_with_same_key(store):
+    done, _ = join(store, "1")
+    store.update(done["id"], status="completed")
+    assert join(store, "2")[1]
+    assert join(store, "3", cache_key="otra")[1]
+
+def test_followers_never_lead(store):
+    leader, _ = join(store, "1")
+    follower, _ = join(store, "2")
+    third, _ = join(store, "3")
+    assert third["leader_id"] == leader["id"]
+
+def test_update_followers_skips_finished_jobs(store):
+    leader, _ = join(store, "1")
+    a, _ = join(store, "2")
+    b, _ = join(store, "3")
+    store.update(b["id"], status="failed")
+
+    updated = store.update_followers(leader["id"], status="completed", result={"audio": "x"})
+    assert updated == [a["id"]]
+    assert store.get(a["id"])["result"] == {"audio": "x"}
+    assert store.get(b["id"])["status"] == "failed"
+
+def test_claim_due_only_claims_leaders(store):
+    leader, _ = join(store, "1")
+    follower, _ = join(store, "2")
+    for job_id in (leader["id"], follower["id"]):
+        store.update(job_id, status="processing", next_poll_at=time.time() - 1)
+    assert [job["id"] for job in store.claim_due(10)] == [leader["id"]]
+    # next_poll_at ha avanzado: otro worker no lo vuelve a reclamar
+    assert store.claim_due(10) == []
+
+def test_interrupted_upload_fails_followers(store):
+    leader, _ = join(store, "1")
+    follower, _ = join(store, "2")
+    store.update(follower["id"], status="processing")
+    time.sleep(0.01)
+
+    assert store.fail_interrupted_uploads(grace=0) == 1
+    assert store.get(leader["id"])["status"] == "failed"
+    assert store.get(follower["id"])["status"] == "failed"
+
+class FakeNIM:
+    timeout = 60
+    batch_size = 4
+    max_retries = 3
+
+    async def start_conversion(self, content, **params):
+        return "conv-1"
+
+@pytest.fixture
+def manager(store, tmp_path):
+    manager = ConversionJobManager(FakeNIM(), store, ConversionResultCache(str(tmp_path / "cache.db")))
+    return manager
+
+@pytest.mark.parametrize("url", [
+    "ftp://example.com/hook", "http:///sin-host", "http://127.0.0.1:8000/hook", "http://10.0.0.5/hook",
+    "http://169.254.169.254/latest/meta-data", "http://[::1]/hook", "http://[::ffff:127.0.0.1]/hook",
+    "http://localhost/hook", "http://api.localhost/hook"
+])
+def test_webhook_url_rejects_local_targets(url, monkeypatch):
+    monkeypatch.delenv("NIM_WEBHOOK_ALLOW_PRIVATE", raising=False)
+    with pytest.raises(ValueError):
+        validate_webhook_url(url)
+
+def test_webhook_url_accepts_public_targets(monkeypatch):
+    monkeypatch.delenv("NIM_WEBHOOK_ALLOW_PRIVATE", raising=False)
+    validate_webhook_url("https://example.com/hook")
+    validate_webhook_url("http://8.8.8.8/hook")
+    monkeypatch.setenv("NIM_WEBHOOK_ALLOW_PRIVATE", "true")
+    validate_webhook_url("http://127.0.0.1:8000/hook")
+
+def test_resolver_drops_private_addresses():
+    async def resolve():
+        resolver = _PublicResolver()
+        try:
+            await resolver.resolve("localhost", 80)
+        finally:
+            await resolver.close()
+
+    with pytest.raises(OSError):
+        asyncio.run(resolve())
+
+def test_slow_webhook_does_not_delay_finish(manager, monkeypatch):
+    monkeypatch.setenv("NIM_WEBHOOK_ALLOW_PRIVATE", "true")
+    received = []
+
+    async def hook(request):
+        await asyncio.sleep(0.5)
+        received.append(await request.json())
+        return web.Response()
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/hook", hook)
+        async with TestServer(app) as server:
+            job, _ = join(manager.store, "1", webhook_url=str(server.make_url("/hook")))
+            started = time.perf_counter()
+            await manager._finish(job["id"], "completed", result={"audio": "x"})
+            finish_s = time.perf_counter() - started
+            await manager.stop()
+            return finish_s
+
+    finish_s = asyncio.run(scenario())
+    assert finish_s < 0.3
+    assert [item["status"] for item in received] == ["completed"]
+
+def test_store_contention_does_not_block_event_loop(manager, tmp_path):
+    job, _ = join(manager.store, "1")
+    # Otro worker con la base de datos bloqueada para escritura
+    other = sqlite3.connect(manager.store.db_path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        finishing = asyncio.create_task(manager._finish(job["id"], "failed", error="x"))
+        await asyncio.sleep(0.3)
+        other.execute("COMMIT")
+        await finishing
+        ticking.cancel()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 10
+    assert manager.store.get(job["id"])["status"] == "failed"
+    other.close()
@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from services.deploy_sync import MANIFEST_NAME, DeploySync, build_manifest
+
+def write(root, files):
+    for path, content in files.items():
+        full = os.path.join(root, *path.split("/"))
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w") as f:
+            f.write(content)
+
+def read_tree(root):
+    tree = {}
+    for current, _, names in os.walk(root):
+        for name in names:
+            full = os.path.join(current, name)
+            with open(full) as f:
+                tree[os.path.relpath(full, root).replace(os.sep, "/")] = f.read()
+    return tree
+
+@pytest.fixture
+def site(tmp_path):
+    build = tmp_path / "build"
+    write(str(build), {"index.html": "v1", "Build/game.wasm": "wasm1", "Build/game.data": "data1",
+                       "TemplateData/style.css": "css1"})
+    return str(build), str(tmp_path / "public_html" / "unity")
+
+def test_build_manifest_hashes_files(tmp_path):
+    write(str(tmp_path), {"a.txt": "hola", "sub/b.txt": "", MANIFEST_NAME: "{}"})
+    manifest = build_manifest(str(tmp_path))
+    assert set(manifest) == {"a.txt", "sub/b.txt"}
+    assert manifest["a.txt"]["size"] == 4
+    assert manifest["sub/b.txt"]["sha256"] == "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
+
+def test_first_deploy_keeps_unmanaged_files(ssh, site):
+    build, remote = site
+    write(remote, {"index.html": "viejo", ".env": "SECRETO=1", "logs/app.log": "x"})
+
+    result = DeploySync(ssh).sync(build, remote)
+
+    assert os.path.islink(remote)
+    tree = read_tree(remote)
+    assert tree[".env"] == "SECRETO=1" and tree["logs/app.log"] == "x"
+    assert tree["index.html"] == "v1" and tree["Build/game.wasm"] == "wasm1"
+    assert result["uploaded"] == 4 and result["deleted"] == 0
+    legacy = [name for name in os.listdir(f"{remote}.releases") if name.endswith("-legacy")]
+    assert len(legacy) == 1
+    assert read_tree(f"{remote}.releases/{legacy[0]}")["index.html"] == "viejo"
+
+def test_redeploy_uploads_only_differences(ssh, site):
+    build, remote = site
+    sync = DeploySync(ssh)
+    sync.sync(build, remote)
+    previous = os.path.realpath(remote)
+
+    write(build, {"index.html": "v2", "Build/extra/new.json": "{}"})
+    os.remove(os.path.join(build, "Build", "game.data"))
+    result = sync.sync(build, remote)
+
+    assert (result["uploaded"], result["deleted"], result["unchanged"]) == (2, 1, 2)
+    assert result["bytes_uploaded"] == len("v2") + len("{}")
+    tree = read_tree(remote)
+    assert tree.pop(MANIFEST_NAME)
+    assert tree == read_tree(build)
+    # La release anterior comparte enlaces duros con la nueva y no se ha tocado
+    old = read_tree(previous)
+    assert old["index.html"] == "v1" and old["Build/game.data"] == "data1"
+
+def test_unchanged_redeploy_uploads_nothing(ssh, site):
+    build, remote = site
+    sync = DeploySync(ssh)
+    sync.sync(build, remote)
+    result = sync.sync(build, remote)
+    assert (result["uploaded"], result["deleted"], result["bytes_uploaded"]) == (0, 0, 0)
+
+def test_file_already_removed_on_server_does_not_abort(ssh, site):
+    build, remote = site
+    sync = DeploySync(ssh)
+    sync.sync(build, remote)
+    os.remove(os.path.join(remote, "Build", "game.data"))
+    os.remove(os.path.join(build, "Build", "game.data"))
+
+    result = sync.sync(build, remote)
+    assert result["deleted"] == 1
+    assert "Build/game.data" not in read_tree(remote)
+
+def test_old_releases_are_pruned(ssh, site):
+    build, remote = site
+    sync = DeploySync(ssh, keep_releases=2)
+    for version in range(4):
+        write(build, {"index.html": f"v{version}"})
+        sync.sync(build, remote)
+    releases = os.listdir(f"{remote}.releases")
+    assert len(releases) == 2
+    assert os.path.basename(os.path.realpath(remote)) in releases
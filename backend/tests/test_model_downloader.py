@@ -0,0 +1,98 @@
+import asyncio
+import hashlib
+import os
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from services.model_downloader import ChecksumMismatch, ModelDownloader, RangeNotHonored
+
+DATA = bytes(range(256)) * 4096 + b"cola"
+
+def make_app(honor_ranges=True, requests=None):
+    async def handler(request):
+        header = request.headers.get("Range")
+        if requests is not None:
+            requests.append(header)
+        # El sondeo de 1 byte siempre responde 206, como un proxy que solo
+        # ignora el rango en las peticiones grandes
+        if header and (honor_ranges or header == "bytes=0-0"):
+            start, end = (int(value) for value in header[len("bytes="):].split("-"))
+            return web.Response(status=206, body=DATA[start:end + 1], headers={
+                "Content-Range": f"bytes {start}-{end}/{len(DATA)}", "ETag": '"v1"'
+            })
+        return web.Response(body=DATA, headers={"ETag": '"v1"'})
+
+    app = web.Application()
+    app.router.add_get("/modelo.bin", handler)
+    return app
+
+async def fetch(app, segment_file, start, end):
+    async with TestServer(app) as server:
+        async with aiohttp.ClientSession(raise_for_status=True) as session:
+            await ModelDownloader()._fetch_segment(
+                session, str(server.make_url("/modelo.bin")), {}, segment_file, start, end
+            )
+
+def test_fetch_segment_resumes_partial_segment(tmp_path):
+    segment = tmp_path / "seg-0"
+    segment.write_bytes(DATA[100:250])
+    requests = []
+
+    asyncio.run(fetch(make_app(requests=requests), str(segment), 100, 999))
+
+    assert requests == ["bytes=250-999"]
+    assert segment.read_bytes() == DATA[100:1000]
+
+def test_fetch_segment_skips_complete_segment(tmp_path):
+    segment = tmp_path / "seg-0"
+    segment.write_bytes(DATA[:1000])
+    requests = []
+
+    asyncio.run(fetch(make_app(requests=requests), str(segment), 0, 999))
+
+    assert requests == []
+    assert segment.read_bytes() == DATA[:1000]
+
+def test_fetch_segment_rejects_ignored_range(tmp_path):
+    segment = tmp_path / "seg-0"
+    segment.write_bytes(DATA[100:250])
+
+    with pytest.raises(RangeNotHonored):
+        asyncio.run(fetch(make_app(honor_ranges=False), str(segment), 100, 999))
+
+    # El cuerpo completo no se ha añadido al segmento parcial
+    assert segment.read_bytes() == DATA[100:250]
+
+def download(app, target, **kwargs):
+    async def run():
+        async with TestServer(app) as server:
+            downloader = ModelDownloader(segments=4, min_segment_bytes=64 * 1024, chunk_bytes=16 * 1024)
+            return await downloader.download(str(server.make_url("/modelo.bin")), str(target), **kwargs)
+    return asyncio.run(run())
+
+def test_download_resumes_leftover_parts(tmp_path):
+    target = tmp_path / "modelo.bin"
+    part_dir = tmp_path / "modelo.bin.part"
+    part_dir.mkdir()
+    (part_dir / "meta.json").write_text(
+        '{"url": "x", "size": %d, "etag": "\\"v1\\"", "segments": 4}' % len(DATA)
+    )
+    (part_dir / "seg-1").write_bytes(DATA[262145:262145 + 5000])
+    requests = []
+
+    download(make_app(requests=requests), target, sha256=hashlib.sha256(DATA).hexdigest())
+
+    assert target.read_bytes() == DATA
+    assert f"bytes={262145 + 5000}-{2 * 262145 - 1}" in requests
+    assert not part_dir.exists()
+
+def test_download_checksum_mismatch_keeps_target_absent(tmp_path):
+    target = tmp_path / "modelo.bin"
+
+    with pytest.raises(ChecksumMismatch):
+        download(make_app(), target, sha256="0" * 64)
+
+    assert not os.path.exists(target)
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+import torch
+from safetensors.torch import load_file, save_file
+from transformers import AutoModelForCausalLM, GPT2Config, LlamaConfig
+
+from services.model_store import LEGACY_CHECKPOINTS, SAFETENSORS_NAME, convert_checkpoint, load_mapped_model
+
+CONFIGS = {
+    "gpt2": GPT2Config(n_layer=2, n_head=2, n_embd=32, vocab_size=128, n_positions=64),
+    # Rotary embeddings: inv_freq y original_inv_freq son buffers no persistentes
+    "llama": LlamaConfig(num_hidden_layers=2, num_attention_heads=4, num_key_value_heads=2, hidden_size=32,
+                         intermediate_size=64, vocab_size=128, max_position_embeddings=64),
+}
+
+def save(config, model_dir):
+    torch.manual_seed(0)
+    AutoModelForCausalLM.from_config(config).save_pretrained(model_dir)
+    return AutoModelForCausalLM.from_pretrained(model_dir).eval()
+
+@pytest.mark.parametrize("arch", sorted(CONFIGS))
+def test_mapped_model_matches_from_pretrained(arch, tmp_path):
+    reference = save(CONFIGS[arch], str(tmp_path))
+    model = load_mapped_model(str(tmp_path))
+    assert model is not None
+    model.eval()
+
+    assert not any(t.is_meta for t in list(model.parameters()) + list(model.buffers()))
+    for name, buffer in reference.named_buffers():
+        assert torch.equal(dict(model.named_buffers())[name], buffer), name
+    input_ids = torch.tensor([[1, 5, 9, 17, 33]])
+    with torch.no_grad():
+        assert torch.allclose(model(input_ids).logits, reference(input_ids).logits, atol=1e-5)
+
+def test_missing_weights_fall_back(tmp_path):
+    save(CONFIGS["llama"], str(tmp_path))
+    config_only = tmp_path / "sin_pesos"
+    config_only.mkdir()
+    os.rename(tmp_path / "config.json", config_only / "config.json")
+    state = load_file(str(tmp_path / SAFETENSORS_NAME))
+    state.pop("model.norm.weight")
+    save_file(state, str(config_only / SAFETENSORS_NAME), metadata={"format": "pt"})
+    assert load_mapped_model(str(config_only)) is None
+
+def test_convert_checkpoint_keeps_tied_weights(tmp_path):
+    reference = save(CONFIGS["gpt2"], str(tmp_path))
+    os.remove(tmp_path / SAFETENSORS_NAME)
+    torch.save(reference.state_dict(), tmp_path / LEGACY_CHECKPOINTS[0])
+
+    assert convert_checkpoint(str(tmp_path))
+    assert not os.path.exists(tmp_path / LEGACY_CHECKPOINTS[0])
+    model = load_mapped_model(str(tmp_path)).eval()
+    assert model.lm_head.weight.data_ptr() == model.transformer.wte.weight.data_ptr()
+    input_ids = torch.tensor([[3, 4, 5]])
+    with torch.no_grad():
+        assert torch.allclose(model(input_ids).logits, reference(input_ids).logits, atol=1e-5)
@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+import torch
+
+from services import nvidia_ngc_service
+from services.model_store import SAFETENSORS_NAME
+from services.nvidia_ngc_service import NvidiaService
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"download_url": "http://ngc/modelo.bin"}
+
+def make_service(downloads):
+    """Un NvidiaService por worker, cada uno con su propio ModelDownloader"""
+    service = NvidiaService()
+    service.downloader.lock_poll = 0.01
+
+    async def download(url, target_file, sha256=None):
+        downloads.append(target_file)
+        await asyncio.sleep(0.05)
+        torch.save({"peso": torch.ones(4)}, target_file)
+        return target_file
+
+    service.downloader.download = download
+    return service
+
+def test_concurrent_workers_install_model_once(tmp_path, monkeypatch):
+    api_calls = []
+    monkeypatch.setattr(nvidia_ngc_service.requests, "get",
+                        lambda url, headers: api_calls.append(url) or FakeResponse())
+    downloads = []
+    services = [make_service(downloads) for _ in range(3)]
+    target = str(tmp_path / "org" / "modelo")
+
+    async def run():
+        await asyncio.gather(*(service.download_model("org/modelo", target) for service in services))
+
+    try:
+        asyncio.run(run())
+    finally:
+        for service in services:
+            service.io_executor.shutdown()
+
+    assert len(downloads) == 1
+    assert len(api_calls) == 1
+    files = os.listdir(target)
+    assert SAFETENSORS_NAME in files and "model.bin" not in files
+    assert not os.path.exists(f"{target}.download")
+
+def test_failed_download_keeps_staging_for_resume(tmp_path, monkeypatch):
+    monkeypatch.setattr(nvidia_ngc_service.requests, "get", lambda url, headers: FakeResponse())
+    service = NvidiaService()
+
+    async def download(url, target_file, sha256=None):
+        with open(f"{target_file}.parcial", "wb") as f:
+            f.write(b"x")
+        raise ConnectionError("cortado")
+
+    service.downloader.download = download
+    target = str(tmp_path / "modelo")
+    try:
+        asyncio.run(service.download_model("modelo", target))
+    except Exception as e:
+        assert "Error al descargar modelo" in str(e)
+    else:
+        raise AssertionError("la descarga debía fallar")
+    finally:
+        service.io_executor.shutdown()
+
+    assert not os.path.exists(target)
+    assert os.listdir(f"{target}.download") == ["model.bin.parcial"]
@@ -0,0 +1,157 @@
+import asyncio
+import time
+
+import pytest
+
+from services.render_jobs import RenderJobManager, RenderJobStore, ResolveBusy
+
+@pytest.fixture
+def store(tmp_path):
+    store = RenderJobStore(str(tmp_path / "render_jobs.db"))
+    yield store
+    store.close()
+
+def test_claims_by_priority_one_at_a_time(store):
+    low = store.create("p1", "H.264")
+    high = store.create("p2", "H.264", priority=5)
+    assert store.get(low["id"])["position"] == 2
+
+    claimed = store.claim_next(stale_after=60)
+    assert claimed["id"] == high["id"]
+    assert claimed["status"] == "rendering"
+    assert claimed["attempts"] == 1
+    # Solo un renderizado a la vez entre todos los workers
+    assert store.claim_next(stale_after=60) is None
+
+    store.update(high["id"], status="completed")
+    assert store.claim_next(stale_after=60)["id"] == low["id"]
+
+def test_release_returns_job_to_queue(store):
+    job = store.create("p1", "H.264")
+    store.claim_next(stale_after=60)
+    store.release(job["id"], count_attempt=False)
+
+    released = store.get(job["id"])
+    assert released["status"] == "queued"
+    assert released["attempts"] == 0
+    assert store.claim_next(stale_after=60)["id"] == job["id"]
+    store.release(job["id"])
+    assert store.get(job["id"])["attempts"] == 1
+
+def test_reclaims_job_without_heartbeat(store):
+    job = store.create("p1", "H.264")
+    store.claim_next(stale_after=60)
+    time.sleep(0.05)
+    reclaimed = store.claim_next(stale_after=0.01)
+    assert reclaimed["id"] == job["id"]
+    assert reclaimed["attempts"] == 2
+
+def test_heartbeat_only_touches_rendering_jobs(store):
+    job = store.create("p1", "H.264")
+    store.heartbeat(job["id"])
+    assert store.get(job["id"])["updated_at"] == job["updated_at"]
+
+class FakeDaVinci:
+    """Resolve con un start_render lento (LoadProject de un proyecto grande)"""
+
+    def __init__(self, start_s: float, busy: bool = False):
+        self.start_s = start_s
+        self.busy = busy
+        self.starts = 0
+
+    async def run(self, fn, *args):
+        return await asyncio.to_thread(fn, *args)
+
+    def start_render(self, project_id, render_preset):
+        if self.busy:
+            raise ResolveBusy("ocupado")
+        self.starts += 1
+        time.sleep(self.start_s)
+        return "render-1"
+
+    def get_render_status(self, render_id):
+        return {"status": "completed", "progress": 100}
+
+    def stop_render(self):
+        pass
+
+    def render_result(self, project_id):
+        return {"project_id": project_id}
+
+def make_manager(davinci, store, stale_after):
+    manager = RenderJobManager(davinci, store)
+    manager.poll_interval = 0.05
+    manager.idle_tick = 0.05
+    manager.stale_after = stale_after
+    manager.heartbeat_interval = stale_after / 3
+    return manager
+
+def test_slow_start_render_is_not_reclaimed(tmp_path):
+    db = str(tmp_path / "render_jobs.db")
+    davinci = FakeDaVinci(start_s=1.0)
+
+    async def scenario():
+        store = RenderJobStore(db)
+        other = RenderJobStore(db)
+        manager = make_manager(davinci, store, stale_after=0.3)
+        job = await asyncio.to_thread(manager.submit, "p1", "H.264")
+        await manager.start()
+        stolen = []
+        try:
+            # Otro worker sondea la cola mientras start_render sigue en curso
+            for _ in range(15):
+                await asyncio.sleep(0.05)
+                stolen.append(await asyncio.to_thread(other.claim_next, 0.3))
+            while (await asyncio.to_thread(store.get, job["id"]))["status"] == "rendering":
+                await asyncio.sleep(0.05)
+            return stolen, await asyncio.to_thread(store.get, job["id"])
+        finally:
+            await manager.stop()
+            store.close()
+            other.close()
+
+    stolen, job = asyncio.run(scenario())
+    assert stolen == [None] * 15
+    assert davinci.starts == 1
+    assert job["status"] == "completed"
+    assert job["attempts"] == 1
+    assert job["result"] == {"project_id": "p1"}
+
+def test_busy_resolve_releases_without_counting_attempt(tmp_path):
+    async def scenario():
+        store = RenderJobStore(str(tmp_path / "render_jobs.db"))
+        manager = make_manager(FakeDaVinci(start_s=0, busy=True), store, stale_after=30)
+        job = await asyncio.to_thread(manager.submit, "p1", "H.264")
+        await manager.start()
+        try:
+            await asyncio.sleep(0.2)
+        finally:
+            await manager.stop()
+        job = store.get(job["id"])
+        store.close()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "queued"
+    assert job["attempts"] == 0
+
+def test_stop_during_claim_returns_job_to_queue(tmp_path):
+    class SlowClaimStore(RenderJobStore):
+        def claim_next(self, stale_after):
+            time.sleep(0.2)
+            return super().claim_next(stale_after)
+
+    async def scenario():
+        store = SlowClaimStore(str(tmp_path / "render_jobs.db"))
+        job = await asyncio.to_thread(store.create, "p1", "H.264")
+        manager = make_manager(FakeDaVinci(start_s=0), store, stale_after=30)
+        await manager.start()
+        await asyncio.sleep(0.05)
+        await manager.stop()
+        job = store.get(job["id"])
+        store.close()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "queued"
+    assert job["attempts"] == 0
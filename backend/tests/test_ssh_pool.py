@@ -0,0 +1,35 @@
+import threading
+
+import pytest
+
+def test_exec_returns_status_and_both_streams(ssh):
+    status, stdout, stderr = ssh.exec("echo salida; echo error >&2; exit 3")
+    assert (status, stdout, stderr) == (3, "salida\n", "error\n")
+
+def test_exec_with_large_stderr_does_not_deadlock(ssh):
+    # Más que la ventana del canal (2 MB) en stderr antes de escribir stdout
+    command = "head -c 5000000 /dev/zero | tr '\\\\0' e >&2; echo fin"
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(out=ssh.exec(command, timeout=30)), daemon=True)
+    worker.start()
+    worker.join(30)
+    assert not worker.is_alive(), "exec bloqueado"
+    status, stdout, stderr = result["out"]
+    assert status == 0 and stdout == "fin\n" and len(stderr) == 5000000
+
+def test_exec_keeps_non_utf8_stdout_bytes(ssh):
+    _, stdout, _ = ssh.exec("printf 'a\\377b'")
+    assert stdout.encode(errors="surrogateescape") == b"a\xffb"
+
+def test_exec_timeout(ssh):
+    with pytest.raises(TimeoutError):
+        ssh.exec("sleep 5", timeout=0.3)
+
+def test_sftp_clients_are_reused(ssh, tmp_path):
+    for i in range(3):
+        with ssh.sftp() as sftp:
+            with sftp.open(str(tmp_path / f"{i}.txt"), "w") as f:
+                f.write("x")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["0.txt", "1.txt", "2.txt"]
+    stats = ssh.stats()
+    assert (stats["sftp_reused"], stats["idle_sftp"], stats["connects"]) == (2, 1, 1)
@@ -0,0 +1,119 @@
+import asyncio
+
+from services.unity_updates import UnityUpdateCoalescer
+
+class FakeUnity:
+    """Cliente Unity que versiona el estado de cada experiencia"""
+
+    def __init__(self, versions=True):
+        self.versions = versions
+        self.state = {}
+        self.version = {}
+        self.messages = []
+
+    async def send(self, message):
+        self.messages.append(message)
+        experience_id = message["experience_id"]
+        if message["type"] == "update_experience_delta":
+            if message["base_version"] != self.version.get(experience_id):
+                return {"status": "resync"}
+            self.state[experience_id].update(message["data"])
+        else:
+            self.state[experience_id] = dict(message["data"])
+        self.version[experience_id] = self.version.get(experience_id, 0) + 1
+        reply = {"status": "ok"}
+        if self.versions:
+            reply["version"] = self.version[experience_id]
+        return reply
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_deltas_off_by_default(monkeypatch):
+    monkeypatch.delenv("UNITY_UPDATE_DELTAS", raising=False)
+    unity = FakeUnity()
+    coalescer = UnityUpdateCoalescer(unity.send, window_ms=0)
+
+    async def scenario():
+        await coalescer._send_update("exp", {"a": 1, "b": 2})
+        await coalescer._send_update("exp", {"a": 1, "b": 3})
+
+    run(scenario())
+    assert not coalescer.deltas
+    assert [m["type"] for m in unity.messages] == ["update_experience", "update_experience"]
+
+def test_delta_carries_base_version():
+    unity = FakeUnity()
+    coalescer = UnityUpdateCoalescer(unity.send, window_ms=0, deltas=True)
+
+    async def scenario():
+        await coalescer._send_update("exp", {"a": 1, "b": 2})
+        return await coalescer._send_update("exp", {"a": 1, "b": 3})
+
+    reply = run(scenario())
+    delta = unity.messages[-1]
+    assert delta["type"] == "update_experience_delta"
+    assert delta["base_version"] == 1
+    assert delta["data"] == {"b": 3}
+    assert reply["version"] == 2
+    assert unity.state["exp"] == {"a": 1, "b": 3}
+
+def test_unchanged_batch_is_sent_in_full():
+    unity = FakeUnity()
+    coalescer = UnityUpdateCoalescer(unity.send, window_ms=0, deltas=True)
+
+    async def scenario():
+        await coalescer._send_update("exp", {"a": 1})
+        await coalescer._send_update("exp", {"a": 1})
+
+    run(scenario())
+    assert [m["type"] for m in unity.messages] == ["update_experience", "update_experience"]
+
+def test_write_from_another_worker_forces_resync():
+    unity = FakeUnity()
+    ours = UnityUpdateCoalescer(unity.send, window_ms=0, deltas=True)
+    other = UnityUpdateCoalescer(unity.send, window_ms=0, deltas=True)
+
+    async def scenario():
+        await ours._send_update("exp", {"a": 1, "b": 1})
+        await other._send_update("exp", {"a": 2, "b": 2})
+        return await ours._send_update("exp", {"a": 1, "b": 5})
+
+    reply = run(scenario())
+    assert ours.resyncs == 1
+    assert [m["type"] for m in unity.messages[-2:]] == ["update_experience_delta", "update_experience"]
+    # El reenvío completo deja en Unity lo que este worker quería escribir
+    assert unity.state["exp"] == {"a": 1, "b": 5}
+    assert reply["version"] == 3
+
+def test_client_without_versions_gets_full_updates():
+    unity = FakeUnity(versions=False)
+    coalescer = UnityUpdateCoalescer(unity.send, window_ms=0, deltas=True)
+
+    async def scenario():
+        await coalescer._send_update("exp", {"a": 1})
+        await coalescer._send_update("exp", {"a": 2})
+
+    run(scenario())
+    assert [m["type"] for m in unity.messages] == ["update_experience", "update_experience"]
+    assert coalescer.stats()["tracked_experiences"] == 0
+
+def test_failed_send_forgets_base():
+    unity = FakeUnity()
+    coalescer = UnityUpdateCoalescer(unity.send, window_ms=0, deltas=True)
+
+    async def failing(message):
+        raise ConnectionError("desconectado")
+
+    async def scenario():
+        await coalescer._send_update("exp", {"a": 1})
+        coalescer.send = failing
+        try:
+            await coalescer._send_update("exp", {"a": 2})
+        except ConnectionError:
+            pass
+        coalescer.send = unity.send
+        await coalescer._send_update("exp", {"a": 3})
+
+    run(scenario())
+    assert unity.messages[-1]["type"] == "update_experience"
@@ -0,0 +1,38 @@
+import asyncio
+import hashlib
+import io
+import zipfile
+
+import pytest
+
+from services.upload_stream import hash_zip_member, zip_pdf_members
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+def test_zip_pdf_members_lists_only_pdfs():
+    data = make_zip({"docs/": b"", "docs/a.pdf": b"%PDF-a", "b.pdf": b"%PDF-b", "notas.txt": b"x"})
+    members = zip_pdf_members(zipfile.ZipFile(io.BytesIO(data)))
+    assert [info.filename for info in members] == ["docs/a.pdf", "b.pdf"]
+
+def test_zip_pdf_members_does_not_read_member_data():
+    data = bytearray(make_zip({f"{i}.pdf": b"%PDF" + bytes(1000) for i in range(3)}))
+    # Corromper los datos comprimidos: el directorio central sigue intacto
+    start = data.index(b"0.pdf") + len("0.pdf")
+    data[start:start + 20] = bytes(20)
+    archive = zipfile.ZipFile(io.BytesIO(bytes(data)))
+
+    assert len(zip_pdf_members(archive)) == 3
+    with pytest.raises(Exception):
+        asyncio.run(hash_zip_member(archive, "0.pdf"))
+
+def test_hash_zip_member_matches_content():
+    content = b"%PDF-1.7" + bytes(range(256)) * 100
+    archive = zipfile.ZipFile(io.BytesIO(make_zip({"a.pdf": content})))
+    assert asyncio.run(hash_zip_member(archive, "a.pdf", chunk_bytes=1000)) == (
+        hashlib.sha256(content).hexdigest(), len(content)
+    )
@@ -0,0 +1,96 @@
+import os
+import json
+
+import pytest
+
+from services.webgl_assets import MANIFEST_NAME, prepare_webgl_build
+
+# Extracto de la plantilla por defecto de Unity
+INDEX = """<link rel="shortcut icon" href="TemplateData/favicon.ico">
+<link rel="stylesheet" href="TemplateData/style.css">
+<script>
+  var buildUrl = "Build";
+  var loaderUrl = buildUrl + "/game.loader.js";
+  var config = {
+    dataUrl: buildUrl + "/game.data",
+    frameworkUrl: buildUrl + "/game.framework.js",
+    codeUrl: buildUrl + "/game.wasm",
+  };
+</script>
+<script src="Build/a.js?v=1"></script>
+<script src="js/data.js"></script>
+"""
+
+STYLE = "#unity-logo { background: url('unity-logo-dark.png') no-repeat center }\n" * 40
+
+def write(root, files):
+    for path, content in files.items():
+        full = os.path.join(root, *path.split("/"))
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w") as f:
+            f.write(content)
+
+def read(root, path):
+    with open(os.path.join(root, *path.split("/"))) as f:
+        return f.read()
+
+@pytest.fixture
+def build(tmp_path):
+    root = str(tmp_path / "build")
+    write(root, {
+        "index.html": INDEX,
+        "Build/game.loader.js": "loader();\n" * 200,
+        "Build/game.data": "data",
+        "Build/game.framework.js": "framework();\n" * 200,
+        "Build/game.wasm": "wasm",
+        "Build/a.js": "a();",
+        "Build/game.symbols.json": "{}",
+        "TemplateData/style.css": STYLE,
+        "TemplateData/unity-logo-dark.png": "png",
+        "TemplateData/favicon.ico": "ico",
+        "js/data.js": "data();",
+    })
+    return root
+
+def test_hashes_only_build_files_referenced_by_html(build, tmp_path):
+    dist = str(tmp_path / "dist")
+    files = prepare_webgl_build(build, dist, workers=1)["files"]
+
+    hashed = {relative for relative, entry in files.items() if entry["immutable"]}
+    assert hashed == {"Build/game.loader.js", "Build/game.data", "Build/game.framework.js",
+                      "Build/game.wasm", "Build/a.js"}
+    for relative, entry in files.items():
+        assert os.path.exists(os.path.join(dist, *entry["path"].split("/")))
+        if relative not in hashed:
+            assert entry["path"] == relative
+
+    # El CSS no se reescribe: la imagen que referencia debe seguir con su nombre
+    assert read(dist, "TemplateData/style.css") == STYLE
+    assert os.path.exists(os.path.join(dist, "TemplateData", "unity-logo-dark.png"))
+    assert files["TemplateData/style.css"]["encodings"]
+
+def test_rewrites_html_references_on_path_boundaries(build, tmp_path):
+    dist = str(tmp_path / "dist")
+    files = prepare_webgl_build(build, dist, workers=1)["files"]
+    html = read(dist, "index.html")
+
+    def name(relative):
+        return os.path.basename(files[relative]["path"])
+
+    assert f'buildUrl + "/{name("Build/game.wasm")}"' in html
+    assert f'buildUrl + "/{name("Build/game.loader.js")}"' in html
+    assert f'src="Build/{name("Build/a.js")}?v=1"' in html
+    # "a.js" no se sustituye dentro de "data.js"
+    assert 'src="js/data.js"' in html
+    assert 'href="TemplateData/style.css"' in html
+
+def test_rebuild_replaces_unhashed_files_and_reuses_variants(build, tmp_path):
+    dist = str(tmp_path / "dist")
+    first = prepare_webgl_build(build, dist, workers=1)["files"]
+    write(build, {"TemplateData/style.css": STYLE.replace("center", "top")})
+    second = prepare_webgl_build(build, dist, workers=1)["files"]
+
+    assert read(dist, "TemplateData/style.css") == STYLE.replace("center", "top")
+    assert second["Build/game.framework.js"] == first["Build/game.framework.js"]
+    with open(os.path.join(dist, MANIFEST_NAME)) as f:
+        assert json.load(f)["files"] == second
@@ -1,5 +1,6 @@
 import multiprocessing
 import os
+import shutil
 
 # Configuración básica
 bind = "127.0.0.1:8000"
@@ -12,6 +13,36 @@ keepalive = 5
 accesslog = "/public_html/api/logs/access.log"
 errorlog = "/public_html/api/logs/error.log"
 loglevel = "info"
+# El recolector de métricas del hosting lee este log de forma incremental
+# (agregados en "api_access" de /hosting/status)
+os.environ.setdefault("API_ACCESS_LOG", accesslog)
+
+# Métricas de Prometheus agregadas entre workers: cada worker escribe sus
+# valores en archivos de este directorio y /metrics los suma. Se hereda en
+# los workers porque este archivo se evalúa en el proceso maestro
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/public_html/api/metrics")
+
+# Sockets Unix con los que el hub de WebSockets de Unity de cada worker
+# reenvía las difusiones a los clientes conectados a los demás workers
+os.environ.setdefault("UNITY_HUB_PEER_DIR", "/public_html/api/hub")
+
+def on_starting(server):
+    # Los archivos de una ejecución anterior sumarían valores obsoletos
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+    # Sockets de workers de la ejecución anterior
+    hub_dir = os.environ["UNITY_HUB_PEER_DIR"]
+    shutil.rmtree(hub_dir, ignore_errors=True)
+    os.makedirs(hub_dir, exist_ok=True)
+
+def child_exit(server, worker):
+    # Los gauges de un worker terminado dejan de contar en /metrics
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
 
 # Configuración de procesos
 daemon = True